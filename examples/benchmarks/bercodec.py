@@ -0,0 +1,118 @@
+# Compare generic pyasn1 BER codec against specialised SNMP v1/v2c one.
+#
+# A GET response carrying a handful of typical varbinds is encoded and
+# decoded by pyasn1 and by pysnmp.proto.fastber. The fast codec is
+# timed both with pyasn1 objects (as SNMP engine uses it, see
+# SnmpEngine.setFastCodec()) and with plain Python tuples.
+#
+# Finally, a message carrying out-of-range value is sent to SNMP engine
+# running the fast codec to make sure it is counted as parse error and
+# does not break the engine.
+import sys
+from time import time
+from pysnmp.entity import engine, config
+from pysnmp.entity.rfc3413 import cmdrsp, context
+from pysnmp.carrier.loopback.dispatch import LoopbackDispatcher
+from pysnmp.carrier.loopback.dgram import udp
+from pysnmp.proto import api, fastber
+from pyasn1.codec.ber import encoder, decoder
+
+iterations = 5000
+
+pMod = api.protoModules[api.protoVersion2c]
+
+rspPDU = pMod.GetResponsePDU()
+pMod.apiPDU.setDefaults(rspPDU)
+pMod.apiPDU.setVarBinds(
+    rspPDU, (
+        ((1,3,6,1,2,1,1,1,0), pMod.OctetString('PySNMP engine')),
+        ((1,3,6,1,2,1,1,2,0), pMod.ObjectIdentifier((1,3,6,1,4,1,20408))),
+        ((1,3,6,1,2,1,1,3,0), pMod.TimeTicks(123456)),
+        ((1,3,6,1,2,1,2,2,1,10,1), pMod.Counter32(4294967295)),
+        ((1,3,6,1,2,1,31,1,1,1,6,1), pMod.Counter64(18446744073709551615)),
+        ((1,3,6,1,2,1,4,20,1,1,127,0,0,1), pMod.IpAddress('127.0.0.1'))
+        )
+    )
+rspMsg = pMod.Message()
+pMod.apiMessage.setDefaults(rspMsg)
+pMod.apiMessage.setCommunity(rspMsg, 'public')
+pMod.apiMessage.setPDU(rspMsg, rspPDU)
+
+wholeMsg = encoder.encode(rspMsg)
+
+assert fastber.encodeAsn1Message(rspMsg) == wholeMsg
+assert fastber.encodeMessage(*fastber.decodeMessage(wholeMsg)) == wholeMsg
+
+def timeIt(fun, *args):
+    startedAt = time()
+    for x in range(iterations):
+        fun(*args)
+    return (time() - startedAt) * 1000000 / iterations
+
+msg = fastber.decodeMessage(wholeMsg)
+
+sys.stdout.write('%d octets message\n' % len(wholeMsg))
+sys.stdout.write('decoding: pyasn1 %.2f usec, fastber to pyasn1 objects %.2f usec, fastber to tuples %.2f usec\n' % (timeIt(decoder.decode, wholeMsg, pMod.Message()), timeIt(fastber.decodeAsn1Message, wholeMsg, api.protoVersion2c), timeIt(fastber.decodeMessage, wholeMsg)))
+sys.stdout.write('encoding: pyasn1 %.2f usec, fastber from pyasn1 objects %.2f usec, fastber from tuples %.2f usec\n' % (timeIt(encoder.encode, rspMsg), timeIt(fastber.encodeAsn1Message, rspMsg), timeIt(fastber.encodeMessage, *msg)))
+
+# Malformed value through SNMP engine
+
+agentAddress = ('127.0.0.1', 161)
+
+agentDispatcher = LoopbackDispatcher()
+network = agentDispatcher.getNetwork()
+
+snmpEngine = engine.SnmpEngine()
+snmpEngine.registerTransportDispatcher(agentDispatcher)
+config.addSocketTransport(
+    snmpEngine,
+    udp.domainName,
+    udp.UdpLoopbackTransport(network).openServerMode(agentAddress)
+    )
+config.addV1System(snmpEngine, 'my-area', 'public')
+config.addContext(snmpEngine, '')
+config.addVacmUser(snmpEngine, 2, 'my-area', 'noAuthNoPriv', (1,3,6), (1,3,6))
+cmdrsp.GetCommandResponder(snmpEngine, context.SnmpContext(snmpEngine))
+snmpEngine.setFastCodec()
+
+managerDispatcher = LoopbackDispatcher(network)
+managerDispatcher.registerTransport(
+    udp.domainName, udp.UdpLoopbackTransport(network).openClientMode()
+    )
+
+responses = []
+
+def cbFun(transportDispatcher, transportDomain, transportAddress, wholeMsg):
+    responses.append(fastber.decodeMessage(wholeMsg))
+    transportDispatcher.jobFinished(1)
+
+managerDispatcher.registerRecvCbFun(cbFun)
+
+getRequestPDU = 0xa0  # GetRequest-PDU tag octet
+
+# Counter32 of -1 (ff ff ff ff) violates its value range
+managerDispatcher.sendMessage(
+    fastber.encodeMessage(
+        api.protoVersion2c, 'public'.encode(), getRequestPDU,
+        (1, 0, 0, (((1,3,6,1,2,1,1,1,0), (fastber.COUNTER32, -1)),))
+        ),
+    udp.domainName, agentAddress
+    )
+# well-formed request should still be served
+managerDispatcher.sendMessage(
+    fastber.encodeMessage(
+        api.protoVersion2c, 'public'.encode(), getRequestPDU,
+        (2, 0, 0, (((1,3,6,1,2,1,1,1,0), (fastber.NULL, None)),))
+        ),
+    udp.domainName, agentAddress
+    )
+
+managerDispatcher.jobStarted(1)
+managerDispatcher.runDispatcher()
+
+parseErrors = snmpEngine.msgAndPduDsp.statistics.snmpInASNParseErrs
+sys.stdout.write('malformed message: %d parse error(s), %d response(s) to well-formed request\n' % (parseErrors, len(responses)))
+assert parseErrors == 1 and len(responses) == 1 and responses[0][3][0] == 2
+
+managerDispatcher.closeDispatcher()
+agentDispatcher.closeDispatcher()
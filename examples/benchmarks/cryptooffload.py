@@ -0,0 +1,123 @@
+# Measure SNMPv3 authPriv throughput with crypto offloaded to processes.
+#
+# Manager and Agent SNMP engines run within one process talking over
+# loopback transport. A number of authPriv GET requests is kept in
+# flight until all requests are answered. Inline message processing is
+# compared to authentication & decryption done at a pool of worker
+# processes, one per CPU core, on both engines. Requires Python 3.2+
+# (or "futures" package) and PyCrypto.
+import sys
+from time import time
+from multiprocessing import cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from pysnmp.entity import engine, config
+from pysnmp.entity.rfc3413 import cmdrsp, cmdgen, context
+from pysnmp.carrier.loopback.dispatch import LoopbackDispatcher
+from pysnmp.carrier.loopback.dgram import udp
+from pyasn1.type import univ
+
+requestCount = 5000
+concurrency = 64
+agentAddress = ('127.0.0.1', 161)
+
+def percentile(values, p):
+    return values[min(int(len(values) * p / 100.0), len(values) - 1)]
+
+def runBenchmark(privProtocol, executor):
+    agentDispatcher = LoopbackDispatcher()
+    network = agentDispatcher.getNetwork()
+
+    # Agent side
+
+    agentEngine = engine.SnmpEngine(
+        univ.OctetString(hexValue='8000000001020304')
+        )
+    agentEngine.registerTransportDispatcher(agentDispatcher)
+    config.addSocketTransport(
+        agentEngine,
+        udp.domainName,
+        udp.UdpLoopbackTransport(network).openServerMode(agentAddress)
+        )
+    config.addV3User(
+        agentEngine, 'usr-sha-priv',
+        config.usmHMACSHAAuthProtocol, 'authkey1',
+        privProtocol, 'privkey1'
+        )
+    config.addContext(agentEngine, '')
+    config.addVacmUser(agentEngine, 3, 'usr-sha-priv', 'authPriv', (1,3,6), (1,3,6))
+    snmpContext = context.SnmpContext(agentEngine)
+    cmdrsp.GetCommandResponder(agentEngine, snmpContext)
+
+    # Manager side
+
+    managerEngine = engine.SnmpEngine()
+    managerEngine.registerTransportDispatcher(LoopbackDispatcher(network))
+    config.addSocketTransport(
+        managerEngine,
+        udp.domainName,
+        udp.UdpLoopbackTransport(network).openClientMode()
+        )
+    config.addV3User(
+        managerEngine, 'usr-sha-priv',
+        config.usmHMACSHAAuthProtocol, 'authkey1',
+        privProtocol, 'privkey1'
+        )
+    config.addTargetParams(managerEngine, 'my-creds', 'usr-sha-priv', 'authPriv')
+    config.addTargetAddr(
+        managerEngine, 'my-agent', udp.domainName, agentAddress, 'my-creds'
+        )
+
+    if executor is not None:
+        agentEngine.setCryptoExecutor(executor)
+        managerEngine.setCryptoExecutor(executor)
+
+    getCmdGen = cmdgen.GetCommandGenerator()
+    latencies = []
+    counters = { 'sent': 0, 'errors': 0 }
+
+    def sendRequest():
+        counters['sent'] += 1
+        getCmdGen.sendReq(
+            managerEngine, 'my-agent', ( ((1,3,6,1,2,1,1,1,0), None), ),
+            cbFun, time()
+            )
+
+    def cbFun(sendRequestHandle, errorIndication,
+              errorStatus, errorIndex, varBinds, cbCtx):
+        latencies.append(time() - cbCtx)
+        if errorIndication or errorStatus:
+            counters['errors'] += 1
+        if counters['sent'] < requestCount:
+            sendRequest()
+
+    # SNMPv3 engine discovery should not be measured
+    getCmdGen.sendReq(
+        managerEngine, 'my-agent', ( ((1,3,6,1,2,1,1,1,0), None), ),
+        lambda *args: None
+        )
+    managerEngine.transportDispatcher.runDispatcher()
+
+    for x in range(concurrency):
+        sendRequest()
+
+    startedAt = time()
+    managerEngine.transportDispatcher.runDispatcher()
+    timeSpent = time() - startedAt
+
+    managerEngine.transportDispatcher.closeDispatcher()
+    agentDispatcher.closeDispatcher()
+
+    latencies.sort()
+
+    return len(latencies), counters['errors'], len(latencies) / timeSpent, \
+           percentile(latencies, 50), percentile(latencies, 99)
+
+workers = cpu_count()
+
+for privName, privProtocol in (('DES', config.usmDESPrivProtocol),
+                               ('AES', config.usmAesCfb128Protocol)):
+    for executor in (None, ProcessPoolExecutor(workers)):
+        requests, errors, rate, p50, p99 = runBenchmark(privProtocol, executor)
+        sys.stdout.write('SHA/%s, %s: %d requests (%d failed), %.0f requests/sec, latency p50 %.2f ms, p99 %.2f ms\n' % (privName, executor is None and 'inline' or '%d worker processes' % workers, requests, errors, rate, p50 * 1000, p99 * 1000))
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,58 @@
+# Measure datagram receive rate with and without batched I/O.
+#
+# One UDP transport floods another one over loopback interface for
+# a fixed period of time. Receiver counts datagrams passed to the
+# dispatcher callback. Compare per-datagram I/O (batch size 1) to
+# draining sockets in bursts.
+import sys
+from time import time
+from pysnmp.carrier.asynsock.dispatch import AsynsockDispatcher
+from pysnmp.carrier.asynsock.dgram import udp
+
+runTime = 3
+queueDepth = 256
+message = ' '.encode() * 100
+
+def runBenchmark(ioBatchSize):
+    transportDispatcher = AsynsockDispatcher()
+    counters = { 'rx': 0 }
+
+    def cbRecvFun(transportDispatcher, transportDomain, transportAddress,
+                  wholeMsg):
+        counters['rx'] += 1
+        return wholeMsg
+
+    transportDispatcher.registerRecvCbFun(cbRecvFun)
+
+    receiver = udp.UdpSocketTransport().openServerMode(('127.0.0.1', 0))
+    receiver.setIoBatchSize(ioBatchSize)
+    transportDispatcher.registerTransport(udp.domainName, receiver)
+
+    sender = udp.UdpSocketTransport().openClientMode(('127.0.0.1', 0))
+    sender.setIoBatchSize(ioBatchSize)
+    transportDispatcher.registerTransport(udp.domainName + (1,), sender)
+
+    dstAddress = receiver.socket.getsockname()
+
+    def refill():
+        # keep sender's queue busy while benchmark is running
+        if not sender.writable():
+            for x in range(queueDepth):
+                sender.sendMessage(message, dstAddress)
+        if transportDispatcher.jobsArePending():
+            transportDispatcher.callLater(0, refill)
+
+    transportDispatcher.jobStarted(1)
+    transportDispatcher.callLater(runTime, transportDispatcher.jobFinished, 1)
+    refill()
+
+    startedAt = time()
+    transportDispatcher.runDispatcher()
+    timeSpent = time() - startedAt
+
+    transportDispatcher.closeDispatcher()
+
+    return counters['rx'] / timeSpent
+
+for ioBatchSize in (1, 8, 64):
+    sys.stdout.write('I/O batch size %3d: %8.0f pps received\n' % (ioBatchSize, runBenchmark(ioBatchSize)))
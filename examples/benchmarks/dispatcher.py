@@ -0,0 +1,56 @@
+# Compare asyncore- and selectors-based transport dispatchers.
+#
+# A number of idle UDP sockets is registered with a dispatcher
+# along with a single active transport which exchanges datagrams
+# with itself. Per-message cost should stay flat with the
+# selectors-based dispatcher as the number of idle sockets grows.
+import sys
+from time import time
+from pysnmp.carrier.asynsock.dispatch import AsynsockDispatcher, \
+     SelectorDispatcher
+from pysnmp.carrier.asynsock.dgram import udp
+from pysnmp.carrier.error import CarrierError
+
+messageCount = 5000
+
+def cbRecvFun(transportDispatcher, transportDomain, transportAddress,
+              wholeMsg):
+    transportDispatcher.jobFinished(1)
+    if transportDispatcher.jobsArePending():
+        transportDispatcher.sendMessage(
+            wholeMsg, transportDomain, transportAddress
+            )
+    return wholeMsg
+
+def runBenchmark(dispatcherClass, socketCount):
+    transportDispatcher = dispatcherClass()
+    transportDispatcher.registerRecvCbFun(cbRecvFun)
+    try:
+        for idx in range(socketCount):
+            transportDispatcher.registerTransport(
+                udp.domainName + (idx+1,),
+                udp.UdpSocketTransport().openServerMode(('127.0.0.1', 0))
+                )
+        transport = udp.UdpSocketTransport().openServerMode(
+            ('127.0.0.1', 0)
+            )
+        transportDispatcher.registerTransport(udp.domainName, transport)
+        for idx in range(messageCount):
+            transportDispatcher.jobStarted(1)
+        transportDispatcher.sendMessage(
+            'x'.encode(), udp.domainName, transport.socket.getsockname()
+            )
+        startedAt = time()
+        transportDispatcher.runDispatcher()
+        return time() - startedAt
+    finally:
+        transportDispatcher.closeDispatcher()
+
+for socketCount in (10, 100, 1000):
+    for dispatcherClass in (AsynsockDispatcher, SelectorDispatcher):
+        try:
+            timeSpent = runBenchmark(dispatcherClass, socketCount)
+        except (CarrierError, ValueError):
+            sys.stdout.write('%-20s %5d sockets: failed: %s\n' % (dispatcherClass.__name__, socketCount, sys.exc_info()[1]))
+            continue
+        sys.stdout.write('%-20s %5d sockets: %6.1f usec/msg, %8.0f msg/sec\n' % (dispatcherClass.__name__, socketCount, timeSpent*1000000/messageCount, messageCount/timeSpent))
@@ -0,0 +1,116 @@
+# Measure SNMP engine throughput and latency over in-memory transport.
+#
+# Manager and Agent SNMP engines run within one process talking over
+# loopback transport so that MP, security, VACM and MIB instrumentation
+# layers are measured alone with no kernel noise. A number of GET
+# requests is kept in flight until all requests are answered. Both
+# SNMPv2c and SNMPv3 authPriv setups are measured.
+import sys
+from time import time
+from pysnmp.entity import engine, config
+from pysnmp.entity.rfc3413 import cmdrsp, cmdgen, context
+from pysnmp.carrier.loopback.dispatch import LoopbackDispatcher
+from pysnmp.carrier.loopback.dgram import udp
+from pyasn1.type import univ
+
+requestCount = 5000
+concurrency = 10
+agentAddress = ('127.0.0.1', 161)
+
+def percentile(values, p):
+    return values[min(int(len(values) * p / 100.0), len(values) - 1)]
+
+def runBenchmark(credentials):
+    agentDispatcher = LoopbackDispatcher()
+    network = agentDispatcher.getNetwork()
+
+    # Agent side
+
+    # both engines live in one process, make sure their IDs differ
+    agentEngine = engine.SnmpEngine(
+        univ.OctetString(hexValue='8000000001020304')
+        )
+    agentEngine.registerTransportDispatcher(agentDispatcher)
+    config.addSocketTransport(
+        agentEngine,
+        udp.domainName,
+        udp.UdpLoopbackTransport(network).openServerMode(agentAddress)
+        )
+    config.addV1System(agentEngine, 'my-area', 'public')
+    config.addV3User(
+        agentEngine, 'usr-md5-des',
+        config.usmHMACMD5AuthProtocol, 'authkey1',
+        config.usmDESPrivProtocol, 'privkey1'
+        )
+    config.addContext(agentEngine, '')
+    config.addVacmUser(agentEngine, 2, 'my-area', 'noAuthNoPriv', (1,3,6), (1,3,6))
+    config.addVacmUser(agentEngine, 3, 'usr-md5-des', 'authPriv', (1,3,6), (1,3,6))
+    snmpContext = context.SnmpContext(agentEngine)
+    cmdrsp.GetCommandResponder(agentEngine, snmpContext)
+
+    # Manager side
+
+    managerEngine = engine.SnmpEngine()
+    managerEngine.registerTransportDispatcher(LoopbackDispatcher(network))
+    config.addSocketTransport(
+        managerEngine,
+        udp.domainName,
+        udp.UdpLoopbackTransport(network).openClientMode()
+        )
+    if credentials == 'v2c':
+        config.addV1System(managerEngine, 'my-area', 'public')
+        config.addTargetParams(managerEngine, 'my-creds', 'my-area', 'noAuthNoPriv', 1)
+    else:
+        config.addV3User(
+            managerEngine, 'usr-md5-des',
+            config.usmHMACMD5AuthProtocol, 'authkey1',
+            config.usmDESPrivProtocol, 'privkey1'
+            )
+        config.addTargetParams(managerEngine, 'my-creds', 'usr-md5-des', 'authPriv')
+    config.addTargetAddr(
+        managerEngine, 'my-agent', udp.domainName, agentAddress, 'my-creds'
+        )
+
+    getCmdGen = cmdgen.GetCommandGenerator()
+    latencies = []
+    counters = { 'sent': 0, 'errors': 0 }
+
+    def sendRequest():
+        counters['sent'] += 1
+        getCmdGen.sendReq(
+            managerEngine, 'my-agent', ( ((1,3,6,1,2,1,1,1,0), None), ),
+            cbFun, time()
+            )
+
+    def cbFun(sendRequestHandle, errorIndication,
+              errorStatus, errorIndex, varBinds, cbCtx):
+        latencies.append(time() - cbCtx)
+        if errorIndication or errorStatus:
+            counters['errors'] += 1
+        if counters['sent'] < requestCount:
+            sendRequest()
+
+    # SNMPv3 engine discovery should not be measured
+    if credentials != 'v2c':
+        getCmdGen.sendReq(
+            managerEngine, 'my-agent', ( ((1,3,6,1,2,1,1,1,0), None), ),
+            lambda *args: None
+            )
+        managerEngine.transportDispatcher.runDispatcher()
+
+    for x in range(concurrency):
+        sendRequest()
+
+    startedAt = time()
+    managerEngine.transportDispatcher.runDispatcher()
+    timeSpent = time() - startedAt
+
+    managerEngine.transportDispatcher.closeDispatcher()
+    agentDispatcher.closeDispatcher()
+
+    latencies.sort()
+
+    sys.stdout.write('%s: %d requests (%d failed), %.0f requests/sec, latency p50 %.2f ms, p99 %.2f ms\n' % (credentials, len(latencies), counters['errors'], len(latencies) / timeSpent, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000))
+
+for credentials in ('v2c', 'v3 authPriv'):
+    runBenchmark(credentials)
@@ -0,0 +1,67 @@
+# Measure request ID generator speed and check it across threads.
+#
+# pysnmp.nextid.counter() and nextid.Integer wrapping it are compared
+# to the list-based generator they replaced, which popped IDs off the
+# head of a pre-filled list. Then a number of threads draws IDs from a
+# shared generator and all drawn IDs are checked to be unique.
+import sys, random, threading
+from time import time
+from pysnmp import nextid
+
+iterations = 1000000
+threadCount = 8
+threadIterations = 100000
+
+class BankInteger:
+    def __init__(self, maximum, increment=256):
+        self.__maximum = maximum
+        self.__threshold = increment//2
+        e = random.randrange(maximum - increment)
+        self.__bank = list(range(e, e+increment))
+
+    def __call__(self):
+        v = self.__bank.pop(0)
+        if v % self.__threshold:
+            return v
+        e = self.__bank[-1]+1
+        if e > self.__maximum:
+            e = 0
+        self.__bank.extend(range(e, e+self.__threshold))
+        return v
+
+for name, getNextId in (('list-based', BankInteger(0xffffff)),
+                        ('nextid.Integer', nextid.Integer(0xffffff)),
+                        ('nextid.counter', nextid.counter(0xffffff))):
+    startedAt = time()
+    for x in range(iterations):
+        getNextId()
+    sys.stdout.write('%s: %.3f usec per ID\n' % (name, (time() - startedAt) * 1000000 / iterations))
+
+# Uniqueness across threads
+
+getNextId = nextid.counter(0xffffffff)
+drawnIds = []
+
+def drawIds():
+    ids = [ getNextId() for x in range(threadIterations) ]
+    drawnIds.append(ids)  # list.append is atomic
+
+threads = [ threading.Thread(target=drawIds) for x in range(threadCount) ]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+
+uniqueIds = {}
+for ids in drawnIds:
+    for x in ids:
+        uniqueIds[x] = 1
+
+sys.stdout.write('%d threads drew %d IDs, %d unique\n' % (threadCount, threadCount * threadIterations, len(uniqueIds)))
+assert len(uniqueIds) == threadCount * threadIterations, 'duplicate IDs drawn'
+
+# Wraparound stays in range
+
+getNextId = nextid.counter(10)
+ids = [ getNextId() for x in range(22) ]
+assert sorted(ids[:11]) == list(range(11)) and ids[11:] == ids[:11], ids
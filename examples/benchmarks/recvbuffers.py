@@ -0,0 +1,84 @@
+# Measure memory allocations on datagram receive path.
+#
+# A plain UDP socket floods UDP transport with SNMPv2c traps over
+# loopback interface. The receiving end is driven read event by read
+# event so that tracemalloc could capture the peak of memory allocated
+# while handling each event. Compare default receive path (fresh string
+# per datagram) to receiving into a pool of reusable buffers. Recipient
+# looks at messages in place and copies one in every 100 of them to keep
+# it. Note that SNMP engine copies every message it receives, so it would
+# not benefit from the pool. Requires Python 3.9+ for
+# tracemalloc.reset_peak().
+import sys, socket, tracemalloc
+from time import time
+from pyasn1.codec.ber import encoder
+from pysnmp.carrier.asynsock.dispatch import AsynsockDispatcher
+from pysnmp.carrier.asynsock.dgram import udp
+from pysnmp.proto import api
+
+runTime = 3
+ioBatchSize = 16
+retainEvery = 100
+
+pMod = api.protoModules[api.protoVersion2c]
+trapPDU = pMod.TrapPDU()
+pMod.apiTrapPDU.setDefaults(trapPDU)
+trapMsg = pMod.Message()
+pMod.apiMessage.setDefaults(trapMsg)
+pMod.apiMessage.setCommunity(trapMsg, 'public')
+pMod.apiMessage.setPDU(trapMsg, trapPDU)
+message = encoder.encode(trapMsg)
+
+def runBenchmark(recvBufferPoolSize):
+    transportDispatcher = AsynsockDispatcher()
+    counters = { 'rx': 0 }
+    retained = []
+
+    def cbRecvFun(transportDispatcher, transportDomain, transportAddress,
+                  wholeMsg):
+        counters['rx'] += 1
+        if not counters['rx'] % retainEvery:
+            retained.append(bytes(wholeMsg))
+        return wholeMsg
+
+    transportDispatcher.registerRecvCbFun(cbRecvFun)
+
+    receiver = udp.UdpSocketTransport().openServerMode(('127.0.0.1', 0))
+    receiver.setIoBatchSize(ioBatchSize)
+    if recvBufferPoolSize:
+        receiver.setRecvBufferPool(recvBufferPoolSize)
+    receiver.socket.setblocking(0)
+    transportDispatcher.registerTransport(udp.domainName, receiver)
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    dstAddress = receiver.socket.getsockname()
+
+    readEvents = 0
+    transientPeaks = 0
+
+    tracemalloc.start()
+    startedAt = time()
+    while time() - startedAt < runTime:
+        for x in range(ioBatchSize):
+            sender.sendto(message, dstAddress)
+        tracemalloc.reset_peak()
+        currentSize = tracemalloc.get_traced_memory()[0]
+        receiver.handle_read()
+        transientPeaks += tracemalloc.get_traced_memory()[1] - currentSize
+        readEvents += 1
+        del retained[:]
+    timeSpent = time() - startedAt
+    tracemalloc.stop()
+
+    stats = receiver.getStatistics()
+
+    sender.close()
+    transportDispatcher.closeDispatcher()
+
+    return counters['rx'] / timeSpent, \
+           transientPeaks / readEvents, \
+           stats['retainedRecvBuffers']
+
+for recvBufferPoolSize in (0, ioBatchSize):
+    pps, peak, retainedBuffers = runBenchmark(recvBufferPoolSize)
+    sys.stdout.write('receive buffers pool %3d: %8.0f pps, %8.0f bytes peak allocation per read event, %d buffers retained\n' % (recvBufferPoolSize, pps, peak, retainedBuffers))
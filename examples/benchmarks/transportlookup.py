@@ -0,0 +1,37 @@
+# Measure the cost of incoming message dispatching depending on the
+# number of transports registered with a dispatcher.
+#
+# Messages are injected straight into the dispatcher's receive path
+# on behalf of the last registered transport, no I/O takes place.
+import sys
+from time import time
+from pysnmp.carrier.asynsock.dispatch import AsynsockDispatcher
+from pysnmp.carrier.asynsock.dgram import udp
+
+messageCount = 500000
+
+def cbRecvFun(transportDispatcher, transportDomain, transportAddress,
+              wholeMsg):
+    return wholeMsg
+
+def runBenchmark(transportCount):
+    transportDispatcher = AsynsockDispatcher()
+    transportDispatcher.registerRecvCbFun(cbRecvFun)
+    for idx in range(transportCount):
+        transport = udp.UdpSocketTransport()
+        transportDispatcher.registerTransport(
+            udp.domainName + (idx+1,), transport
+            )
+    cbFun = transport._cbFun
+    transportAddress = ('127.0.0.1', 161)
+    message = ' '.encode()
+    startedAt = time()
+    for x in range(messageCount):
+        cbFun(transport, transportAddress, message)
+    timeSpent = time() - startedAt
+    transportDispatcher.closeDispatcher()
+    return timeSpent
+
+for transportCount in (1, 64):
+    timeSpent = runBenchmark(transportCount)
+    sys.stdout.write('%3d transports: %.3f usec/msg\n' % (transportCount, timeSpent*1000000/messageCount))
@@ -0,0 +1,79 @@
+# Measure Twisted datagram transport latency and CPU use under load.
+#
+# A plain Twisted UDP protocol sends datagrams to UDP transport at
+# about 10k pps over loopback interface, each datagram carries its send
+# time. The receiving end reports delivery latency percentiles and
+# process CPU time spent per 10k datagrams. Compare one timed call per
+# datagram (default) to draining received datagrams in bursts.
+import sys, struct
+from time import time
+try:
+    from time import process_time
+except ImportError:
+    from time import clock as process_time
+from twisted.internet import reactor, task
+from twisted.internet.protocol import DatagramProtocol
+from pysnmp.carrier.twisted.dispatch import TwistedDispatcher
+from pysnmp.carrier.twisted.dgram import udp
+
+runTime = 5
+packetRate = 10000
+ticksPerSecond = 100
+ioBatchSizes = (None, 16, 256)
+
+class Sender(DatagramProtocol):
+    def sendBurst(self, dstAddress, count):
+        for x in range(count):
+            self.transport.write(struct.pack('!d', time()), dstAddress)
+
+def percentile(values, p):
+    return values[min(int(len(values) * p / 100.0), len(values) - 1)]
+
+def runPhase(phases, results):
+    if not phases:
+        for ioBatchSize, latencies, cpuTime in results:
+            latencies.sort()
+            sys.stdout.write('I/O batch size %4s: %7d datagrams, latency p50 %6.2f ms, p99 %6.2f ms, max %6.2f ms, %.3f CPU sec per 10k datagrams\n' % (ioBatchSize or '-', len(latencies), percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, latencies[-1] * 1000, cpuTime * 10000 / len(latencies)))
+        reactor.stop()
+        return
+
+    ioBatchSize = phases.pop(0)
+    latencies = []
+
+    transportDispatcher = TwistedDispatcher()
+
+    def cbRecvFun(transportDispatcher, transportDomain, transportAddress,
+                  wholeMsg):
+        latencies.append(time() - struct.unpack('!d', wholeMsg)[0])
+
+    transportDispatcher.registerRecvCbFun(cbRecvFun)
+
+    receiver = udp.UdpTwistedTransport().openServerMode(('127.0.0.1', 0))
+    if ioBatchSize:
+        receiver.setIoBatchSize(ioBatchSize)
+    transportDispatcher.registerTransport(udp.domainName, receiver)
+
+    sender = Sender()
+    senderPort = reactor.listenUDP(0, sender, '127.0.0.1')
+    dstAddress = ('127.0.0.1', receiver._lport.getHost().port)
+
+    sendCall = task.LoopingCall(
+        sender.sendBurst, dstAddress, packetRate // ticksPerSecond
+        )
+    sendCall.start(1.0 / ticksPerSecond)
+
+    startedAt = process_time()
+
+    def finishPhase():
+        sendCall.stop()
+        results.append((ioBatchSize, latencies, process_time() - startedAt))
+        senderPort.stopListening()
+        receiver._lport.stopListening()
+        transportDispatcher.closeDispatcher()
+        # let in-flight datagrams settle down
+        reactor.callLater(1, runPhase, phases, results)
+
+    reactor.callLater(runTime, finishPhase)
+
+reactor.callWhenRunning(runPhase, list(ioBatchSizes), [])
+reactor.run()
@@ -0,0 +1,77 @@
+# Measure the cost of telling SNMP version of incoming message.
+#
+# BER decoding of message version (decodeMessageVersion) is compared
+# to reading it straight off message header (peekMessageVersion). Full
+# message decoding, which Message Processing module does anyway, is
+# shown for reference.
+import sys
+from time import time
+from pysnmp.proto import api
+from pysnmp.proto.mpmod.rfc3412 import SNMPv3Message
+from pysnmp.proto.secmod.rfc3414.service import UsmSecurityParameters
+from pyasn1.codec.ber import encoder, decoder
+from pyasn1.type import univ
+
+iterations = 10000
+
+def buildV1Message(pMod):
+    reqPDU = pMod.GetRequestPDU()
+    pMod.apiPDU.setDefaults(reqPDU)
+    pMod.apiPDU.setVarBinds(
+        reqPDU, (((1,3,6,1,2,1,1,1,0), pMod.Null('')),)
+        )
+    reqMsg = pMod.Message()
+    pMod.apiMessage.setDefaults(reqMsg)
+    pMod.apiMessage.setCommunity(reqMsg, 'public')
+    pMod.apiMessage.setPDU(reqMsg, reqPDU)
+    return encoder.encode(reqMsg)
+
+def buildV3Message():
+    pMod = api.protoModules[api.protoVersion2c]
+    reqPDU = pMod.GetRequestPDU()
+    pMod.apiPDU.setDefaults(reqPDU)
+    pMod.apiPDU.setVarBinds(
+        reqPDU, (((1,3,6,1,2,1,1,1,0), pMod.Null('')),)
+        )
+    msg = SNMPv3Message()
+    msg.setComponentByPosition(0, 3)
+    headerData = msg.setComponentByPosition(1).getComponentByPosition(1)
+    headerData.setComponentByPosition(0, 12345)
+    headerData.setComponentByPosition(1, 65507)
+    headerData.setComponentByPosition(2, '\x04'.encode())  # reportable
+    headerData.setComponentByPosition(3, 3)
+    securityParameters = UsmSecurityParameters()
+    securityParameters.setComponentByPosition(0, univ.OctetString(hexValue='8000000001020304'))
+    securityParameters.setComponentByPosition(1, 0)
+    securityParameters.setComponentByPosition(2, 0)
+    securityParameters.setComponentByPosition(3, 'usr-none-none')
+    securityParameters.setComponentByPosition(4, '')
+    securityParameters.setComponentByPosition(5, '')
+    msg.setComponentByPosition(2, encoder.encode(securityParameters))
+    scopedPDU = msg.setComponentByPosition(3).getComponentByPosition(3).setComponentByPosition(0).getComponentByPosition(0)
+    scopedPDU.setComponentByPosition(0, univ.OctetString(hexValue='8000000001020304'))
+    scopedPDU.setComponentByPosition(1, '')
+    scopedPDU.setComponentByPosition(2)
+    scopedPDU.getComponentByPosition(2).setComponentByType(
+        reqPDU.getTagSet(), reqPDU, 1, verifyConstraints=False
+        )
+    return encoder.encode(msg)
+
+messages = (
+    ('v1', buildV1Message(api.protoModules[api.protoVersion1]),
+     api.protoModules[api.protoVersion1].Message()),
+    ('v2c', buildV1Message(api.protoModules[api.protoVersion2c]),
+     api.protoModules[api.protoVersion2c].Message()),
+    ('v3', buildV3Message(), SNMPv3Message())
+    )
+
+def timeIt(fun, *args):
+    startedAt = time()
+    for x in range(iterations):
+        fun(*args)
+    return (time() - startedAt) * 1000000 / iterations
+
+for name, wholeMsg, msgSpec in messages:
+    assert api.peekMessageVersion(wholeMsg) == \
+           int(api.decodeMessageVersion(wholeMsg))
+    sys.stdout.write('%s (%d octets): decodeMessageVersion %.2f usec, peekMessageVersion %.2f usec, whole message decoding %.2f usec\n' % (name, len(wholeMsg), timeIt(api.decodeMessageVersion, wholeMsg), timeIt(api.peekMessageVersion, wholeMsg), timeIt(decoder.decode, wholeMsg, msgSpec)))
@@ -0,0 +1,55 @@
+# Command Responder running in several processes sharing one UDP port
+from pysnmp.entity import engine, config, prefork
+from pysnmp.entity.rfc3413 import cmdrsp, context
+from pysnmp.carrier.asynsock.dgram import udp
+from pyasn1.type import univ
+
+# All replicas must share SNMP engine ID for SNMPv3 to work
+snmpEngineID = univ.OctetString(hexValue='8000000001020304')
+
+def engineFactory(workerIndex):
+    # Create SNMP engine instance, one per worker process
+    snmpEngine = engine.SnmpEngine(snmpEngineID)
+
+    # Setup transport endpoint, each worker binds the same UDP port
+    transport = udp.UdpTransport()
+    transport.setReusePort()
+    config.addSocketTransport(
+        snmpEngine,
+        udp.domainName,
+        transport.openServerMode(('127.0.0.1', 161))
+    )
+
+    # v1/2 setup
+    config.addV1System(snmpEngine, 'my-area', 'public')
+
+    # v3 setup
+    config.addV3User(
+        snmpEngine, 'usr-md5-des',
+        config.usmHMACMD5AuthProtocol, 'authkey1',
+        config.usmDESPrivProtocol, 'privkey1'
+    )
+
+    # VACM setup
+    config.addContext(snmpEngine, '')
+    config.addVacmUser(snmpEngine, 1, 'my-area', 'noAuthNoPriv', (1,3,6), (1,3,6))
+    config.addVacmUser(snmpEngine, 2, 'my-area', 'noAuthNoPriv', (1,3,6), (1,3,6))
+    config.addVacmUser(snmpEngine, 3, 'usr-md5-des', 'authPriv', (1,3,6), (1,3,6))
+
+    # Get default SNMP context this SNMP engine serves
+    snmpContext = context.SnmpContext(snmpEngine)
+
+    # Register SNMP Applications at the SNMP engine for particular SNMP context
+    cmdrsp.GetCommandResponder(snmpEngine, snmpContext)
+    cmdrsp.SetCommandResponder(snmpEngine, snmpContext)
+    cmdrsp.NextCommandResponder(snmpEngine, snmpContext)
+    cmdrsp.BulkCommandResponder(snmpEngine, snmpContext)
+
+    return snmpEngine
+
+# Print aggregated statistics every once in a while
+def cbFun(supervisor, counters):
+    print('%s workers, snmpInPkts %s, snmpOutPkts %s' % (len(supervisor.getWorkers()), counters['snmpInPkts'], counters['snmpOutPkts']))
+
+# Run four workers, restart them whenever they crash
+prefork.PreforkSupervisor(4, engineFactory, countersCbFun=cbFun).run()
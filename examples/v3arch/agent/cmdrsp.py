@@ -2,6 +2,7 @@
 from pysnmp.entity import engine, config
 from pysnmp.entity.rfc3413 import cmdrsp, context
 from pysnmp.carrier.asynsock.dgram import udp, udp6, unix
+from pysnmp.carrier.asynsock.stream import tcp
 #from pysnmp import debug
 
 ## Optional debugging ('all' enables full debugging)
@@ -11,6 +12,10 @@ from pysnmp.carrier.asynsock.dgram import udp, udp6, unix
 # to socket transport dispatcher
 snmpEngine = engine.SnmpEngine()
 
+## Optionally process requests at a pool of threads so that slow MIB
+## objects would not stall I/O (Python 3.2+ or "futures" package)
+#from concurrent.futures import ThreadPoolExecutor
+#snmpEngine.setReceiveExecutor(ThreadPoolExecutor(4))
 
 #
 # Transport setup
@@ -23,6 +28,13 @@ config.addSocketTransport(
     udp.UdpTransport().openServerMode(('127.0.0.1', 161))
 )
 
+## Optionally record incoming requests for replaying them later with
+## the pysnmp-replay tool
+#from pysnmp.carrier.replay import MessageRecorder
+#snmpEngine.transportDispatcher.getTransport(udp.domainName).setRecorder(
+#    MessageRecorder('/tmp/snmp-agent.rec'), udp.domainName
+#)
+
 # UDP over IPv6
 config.addSocketTransport(
     snmpEngine,
@@ -37,6 +49,13 @@ config.addSocketTransport(
     unix.UnixTransport().openServerMode('/tmp/snmp-agent')
     )
 
+# TCP over IPv4 (RFC 3430)
+config.addSocketTransport(
+    snmpEngine,
+    tcp.domainName,
+    tcp.TcpTransport().openServerMode(('127.0.0.1', 161))
+    )
+
 #
 # SNMPv1/2c setup (if you need to handle SNMPv1/v2c messages)
 #
@@ -149,6 +168,16 @@ cmdrsp.SetCommandResponder(snmpEngine, snmpContext)
 cmdrsp.NextCommandResponder(snmpEngine, snmpContext)
 cmdrsp.BulkCommandResponder(snmpEngine, snmpContext)
 
+## Optionally time request processing stages, per-stage latency
+## percentiles are then printed every minute
+#from pysnmp.entity.latency import LatencyAggregator
+#latencyAggregator = LatencyAggregator()
+#snmpEngine.registerLatencyObserver(latencyAggregator)
+#def dumpLatencies():
+#    print(latencyAggregator.dump(reset=True))
+#    snmpEngine.transportDispatcher.callLater(60, dumpLatencies)
+#snmpEngine.transportDispatcher.callLater(60, dumpLatencies)
+
 snmpEngine.transportDispatcher.jobStarted(1) # this job would never finish
 
 # Run I/O dispatcher which would receive queries and send responses
@@ -0,0 +1,73 @@
+# GET Command Generator over asyncio
+import asyncio
+from pysnmp.entity import engine, config
+from pysnmp.carrier.asyncio import dispatch
+from pysnmp.carrier.asyncio.dgram import udp
+from pysnmp.entity.rfc3413 import cmdgen
+#from pysnmp import debug
+
+## Optional debugging ('all' enables full debugging)
+#debug.setLogger(debug.Debug('all', '!mibbuild', '!mibinstrum', '!mibview'))
+
+loop = asyncio.get_event_loop()
+
+# Create SNMP engine instance
+snmpEngine = engine.SnmpEngine()
+
+# Instantiate and register asyncio dispatcher at SNMP engine
+snmpEngine.registerTransportDispatcher(dispatch.AsyncioDispatcher(loop=loop))
+
+#
+# SNMPv3/USM setup
+#
+
+# user: usr-md5-des, auth: MD5, priv DES
+config.addV3User(
+    snmpEngine, 'usr-md5-des',
+    config.usmHMACMD5AuthProtocol, 'authkey1',
+    config.usmDESPrivProtocol, 'privkey1'
+)
+config.addTargetParams(snmpEngine, 'my-creds', 'usr-md5-des', 'authPriv')
+
+#
+# Setup transport endpoint and bind it with security settings yielding
+# a target name
+#
+
+# UDP/IPv4
+config.addSocketTransport(
+    snmpEngine,
+    udp.domainName,
+    udp.UdpAsyncioTransport(loop=loop).openClientMode()
+)
+config.addTargetAddr(
+    snmpEngine, 'my-router',
+    udp.domainName, ('127.0.0.1', 161),
+    'my-creds'
+)
+
+# Error/response reciever
+def cbFun(sendRequestHandle, errorIndication,
+          errorStatus, errorIndex, varBinds, cbCtx):
+    if errorIndication:
+        print(errorIndication)
+    elif errorStatus and errorIndex:
+        print('%s at %s' % (errorStatus.prettyPrint(),
+                            varBinds[int(errorIndex)-1]))
+    elif errorStatus:
+        print(errorStatus.prettyPrint())
+    else:
+        for oid, val in varBinds:
+            print('%s = %s' % (oid.prettyPrint(), val.prettyPrint()))
+
+# Prepare request to be sent
+cmdgen.GetCommandGenerator().sendReq(
+    snmpEngine,
+    'my-router',
+    ( ((1,3,6,1,2,1,1,1,0), None),
+      ((1,3,6,1,2,1,1,2,0), None) ),
+    cbFun
+)
+
+# Run asyncio loop till the request is answered or timed out
+snmpEngine.transportDispatcher.runDispatcher()
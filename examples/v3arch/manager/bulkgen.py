@@ -119,6 +119,21 @@ config.addTargetAddr(
 #    'my-creds'
 #)
 
+## TCP/IPv4 (RFC 3430), large PDUs would not get fragmented. Up to
+## two persistent connections are kept to the target.
+#from pysnmp.carrier.asynsock.stream import tcp
+#config.addSocketTransport(
+#    snmpEngine,
+#    tcp.domainName,
+#    tcp.TcpSocketTransport().openClientMode()
+#)
+#snmpEngine.transportDispatcher.getTransport(tcp.domainName).setPoolSize(2)
+#config.addTargetAddr(
+#    snmpEngine, 'my-router',
+#    tcp.domainName, ('127.0.0.1', 161),
+#    'my-creds'
+#)
+
 # Error/response reciever
 def cbFun(sendRequesthandle, errorIndication, errorStatus, errorIndex,
           varBindTable, cbCtx):
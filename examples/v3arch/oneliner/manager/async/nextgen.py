@@ -63,6 +63,10 @@ def cbFun(sendRequestHandle, errorIndication, errorStatus, errorIndex,
 
 cmdGen  = cmdgen.AsynCommandGenerator()
 
+# For high fan-out, requests may be spread over a pool of UDP sockets
+# each having larger kernel buffers
+#cmdGen  = cmdgen.AsynCommandGenerator(socketPoolSize=8, rcvBufSize=1048576)
+
 for authData, transportTarget, varNames in targets:
     cmdGen.nextCmd(
         authData, transportTarget, varNames,
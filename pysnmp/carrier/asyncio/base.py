@@ -0,0 +1,25 @@
+# Defines standard API to asyncio-based transport
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+
+class AbstractAsyncioTransport:
+    """Base asyncio Transport, to be used with AsyncioDispatcher"""
+    def __init__(self, loop=None):
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self.loop = loop
+        self.transport = None
+        self._writeQ = []
+
+    # AbstractAsyncioTransport API
+
+    def registerCbFun(self, cbFun):
+        self._cbFun = cbFun
+
+    def unregisterCbFun(self):
+        self._cbFun = None
+
+    def closeTransport(self):
+        self.unregisterCbFun()
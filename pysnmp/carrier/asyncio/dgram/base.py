@@ -0,0 +1,92 @@
+# Implements asyncio-based generic DGRAM transport
+import sys
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+from pysnmp.carrier.asyncio.base import AbstractAsyncioTransport
+from pysnmp.carrier import error
+from pysnmp import debug
+
+try:
+    ensureFuture = asyncio.ensure_future
+except AttributeError:
+    ensureFuture = getattr(asyncio, 'async')  # Python < 3.4.4
+
+class DgramAsyncioProtocol(asyncio.DatagramProtocol, AbstractAsyncioTransport):
+    """Base asyncio datagram Transport, to be used with AsyncioDispatcher"""
+    sockFamily = None
+    retryCount = 3; retryInterval = 1
+    def __init__(self, loop=None):
+        AbstractAsyncioTransport.__init__(self, loop)
+        self._lport = None
+
+    # asyncio Datagram API
+
+    def connection_made(self, transport):
+        debug.logger & debug.flagIO and debug.logger('connection_made: invoked')
+        self.transport = transport
+        while self._writeQ:
+            outgoingMessage, transportAddress = self._writeQ.pop(0)
+            debug.logger & debug.flagIO and debug.logger('connection_made: transportAddress %r outgoingMessage %s' % (transportAddress, debug.hexdump(outgoingMessage)))
+            try:
+                self.transport.sendto(outgoingMessage, transportAddress)
+            except Exception:
+                raise error.CarrierError('asyncio exception: %s' % (sys.exc_info()[1],))
+
+    def connection_lost(self, exc):
+        debug.logger & debug.flagIO and debug.logger('connection_lost: invoked')
+        self.transport = None
+
+    def datagram_received(self, datagram, transportAddress):
+        if self._cbFun is None:
+            raise error.CarrierError('Unable to call cbFun')
+        else:
+            self._cbFun(self, transportAddress, datagram)
+
+    def error_received(self, exc):
+        # ICMP errors reported for previously sent datagrams
+        debug.logger & debug.flagIO and debug.logger('error_received: %s' % (exc,))
+
+    # AbstractAsyncioTransport API
+
+    def _openEndpoint(self, **kwargs):
+        c = self.loop.create_datagram_endpoint(
+            lambda: self, family=self.sockFamily, **kwargs
+            )
+        self._lport = ensureFuture(c, loop=self.loop)
+        self._lport.add_done_callback(self.__endpointOpened)
+
+    def __endpointOpened(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            debug.logger & debug.flagIO and debug.logger('_openEndpoint: failed: %s' % (future.exception(),))
+            self._writeQ = []
+
+    def openClientMode(self, iface=None):
+        raise error.CarrierError('Method not implemented')
+
+    def openServerMode(self, iface=None):
+        raise error.CarrierError('Method not implemented')
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        debug.logger & debug.flagIO and debug.logger('sendMessage: %s transportAddress %r outgoingMessage %s' % ((self.transport is None and "queuing" or "sending"), transportAddress, debug.hexdump(outgoingMessage)))
+        if self.transport is None:
+            if self._lport is not None and self._lport.done() and \
+                   not self._lport.cancelled() and \
+                   self._lport.exception() is not None:
+                raise error.CarrierError('Transport failed to open: %s' % (self._lport.exception(),))
+            self._writeQ.append((outgoingMessage, transportAddress))
+        else:
+            try:
+                self.transport.sendto(outgoingMessage, transportAddress)
+            except Exception:
+                raise error.CarrierError('asyncio exception: %s' % (sys.exc_info()[1],))
+
+    def closeTransport(self):
+        if self._lport is not None and not self._lport.done():
+            self._lport.cancel()
+        if self.transport is not None:
+            self.transport.close()
+        AbstractAsyncioTransport.closeTransport(self)
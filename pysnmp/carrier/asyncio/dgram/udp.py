@@ -0,0 +1,22 @@
+# Implements asyncio-based UDP transport domain
+from socket import AF_INET
+from pysnmp.carrier.asyncio.dgram.base import DgramAsyncioProtocol
+
+domainName = snmpUDPDomain = (1, 3, 6, 1, 6, 1, 1)
+
+class UdpAsyncioTransport(DgramAsyncioProtocol):
+    sockFamily = AF_INET
+
+    # AbstractAsyncioTransport API
+
+    def openClientMode(self, iface=None):
+        if iface is None:
+            iface = ('0.0.0.0', 0)
+        self._openEndpoint(local_addr=iface)
+        return self
+
+    def openServerMode(self, iface):
+        self._openEndpoint(local_addr=iface)
+        return self
+
+UdpTransport = UdpAsyncioTransport
@@ -0,0 +1,25 @@
+# Implements asyncio-based UDP6 transport domain
+try:
+    from socket import AF_INET6
+except:
+    AF_INET6 = None
+from pysnmp.carrier.asyncio.dgram.base import DgramAsyncioProtocol
+
+domainName = snmpUDP6Domain = (1, 3, 6, 1, 2, 1, 100, 1, 2)
+
+class Udp6AsyncioTransport(DgramAsyncioProtocol):
+    sockFamily = AF_INET6
+
+    # AbstractAsyncioTransport API
+
+    def openClientMode(self, iface=None):
+        if iface is None:
+            iface = ('::', 0)
+        self._openEndpoint(local_addr=iface)
+        return self
+
+    def openServerMode(self, iface):
+        self._openEndpoint(local_addr=iface)
+        return self
+
+Udp6Transport = Udp6AsyncioTransport
@@ -0,0 +1,45 @@
+# Implements asyncio-based UNIX transport domain
+import os
+import random
+try:
+    from socket import AF_UNIX
+except ImportError:
+    AF_UNIX = None
+from pysnmp.carrier.asyncio.dgram.base import DgramAsyncioProtocol
+
+domainName = snmpLocalDomain = (1, 3, 6, 1, 2, 1, 100, 1, 13)
+
+random.seed()
+
+class UnixAsyncioTransport(DgramAsyncioProtocol):
+    sockFamily = AF_UNIX
+
+    # AbstractAsyncioTransport API
+
+    def openClientMode(self, iface=None):
+        if iface is None:
+            # UNIX domain sockets must be explicitly bound
+            iface = ''
+            while len(iface) < 8:
+                iface += chr(random.randrange(65, 91))
+                iface += chr(random.randrange(97, 123))
+            iface = os.path.sep + 'tmp' + os.path.sep + 'pysnmp' + iface
+        if os.path.exists(iface):
+            os.remove(iface)
+        self._openEndpoint(local_addr=iface)
+        self.__iface = iface
+        return self
+
+    def openServerMode(self, iface):
+        self._openEndpoint(local_addr=iface)
+        self.__iface = iface
+        return self
+
+    def closeTransport(self):
+        DgramAsyncioProtocol.closeTransport(self)
+        try:
+            os.remove(self.__iface)
+        except:
+            pass
+
+UnixTransport = UnixAsyncioTransport
@@ -0,0 +1,93 @@
+# Transport dispatcher based on asyncio event loop
+import sys, time
+try:
+    import asyncio
+except ImportError:
+    import trollius as asyncio
+from pysnmp.carrier.base import AbstractTransportDispatcher
+from pysnmp.carrier import error
+
+class AsyncioDispatcher(AbstractTransportDispatcher):
+    """TransportDispatcher based on asyncio event loop"""
+    def __init__(self, *args, **kwargs):
+        AbstractTransportDispatcher.__init__(self)
+        self.__transportCount = 0
+        if 'timeout' in kwargs:
+            self.setTimerResolution(kwargs['timeout'])
+        if 'loop' in kwargs and kwargs['loop'] is not None:
+            self.loop = kwargs['loop']
+        else:
+            self.loop = asyncio.get_event_loop()
+        self.__timerHandle = None
+        self.__timerDeadline = None
+        self.__stopOnJobsDone = False
+
+    def handleTimeout(self):
+        self.__timerHandle = None
+        self.handleTimerTick(time.time())
+        self.__armTimer()
+
+    def __armTimer(self):
+        # wake up by the nearest deadline scheduled at dispatcher
+        if self.__transportCount == 0:
+            return
+        nextDeadline = self.getNextDeadline()
+        if nextDeadline is None:
+            return
+        if self.__timerHandle is not None:
+            if self.__timerDeadline <= nextDeadline:
+                return
+            self.__timerHandle.cancel()
+        self.__timerDeadline = nextDeadline
+        self.__timerHandle = self.loop.call_later(
+            max(nextDeadline - time.time(), 0), self.handleTimeout
+            )
+
+    def _nextDeadlineChanged(self, deadline):
+        self.__armTimer()
+
+    def runDispatcher(self, timeout=0.0):
+        # Embedding applications are expected to run the loop themselves,
+        # otherwise we run it till all pending jobs are done
+        if not self.loop.is_running():
+            self._setDispatcherThread()
+            self.__stopOnJobsDone = self.jobsArePending()
+            try:
+                self.loop.run_forever()
+            except Exception:
+                raise error.CarrierError(sys.exc_info()[1])
+            finally:
+                self.__stopOnJobsDone = False
+
+    def callFromThread(self, cbFun, *args):
+        self.loop.call_soon_threadsafe(cbFun, *args)
+
+    def jobFinished(self, jobId):
+        AbstractTransportDispatcher.jobFinished(self, jobId)
+        # job may be finished just to be started over (e.g. on retry)
+        # by the same callback, so check it once the callback is over
+        if self.__stopOnJobsDone and not self.jobsArePending():
+            self.loop.call_soon(self.__stopIfJobsDone)
+
+    def __stopIfJobsDone(self):
+        if self.__stopOnJobsDone and not self.jobsArePending():
+            self.loop.stop()
+
+    def registerTransport(self, tDomain, transport):
+        AbstractTransportDispatcher.registerTransport(
+            self, tDomain, transport
+            )
+        self.__transportCount = self.__transportCount + 1
+        self.__armTimer()
+
+    def unregisterTransport(self, tDomain):
+        t = AbstractTransportDispatcher.getTransport(self, tDomain)
+        if t is not None:
+            AbstractTransportDispatcher.unregisterTransport(self, tDomain)
+            t.closeTransport()
+            self.__transportCount = self.__transportCount - 1
+
+        # The last transport has been removed, stop the timeout
+        if self.__transportCount == 0 and self.__timerHandle is not None:
+            self.__timerHandle.cancel()
+            self.__timerHandle = None
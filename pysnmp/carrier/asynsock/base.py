@@ -6,6 +6,7 @@ from pysnmp.carrier import error
 class AbstractSocketTransport(asyncore.dispatcher):
     sockFamily = sockType = None
     retryCount = 0; retryInterval = 0
+    _backPressureCbFun = None
     def __init__(self, sock=None, sockMap=None):
         if sock is None:
             if self.sockFamily is None:
@@ -28,10 +29,20 @@ class AbstractSocketTransport(asyncore.dispatcher):
         asyncore.dispatcher.__init__(self, sock, sockMap)
 
     def registerSocket(self, sockMap=None):
+        if sockMap is not None:
+            # remember dispatcher's map so that close() would clean it up
+            self._map = sockMap
         self.add_channel(sockMap)
         
     def unregisterSocket(self, sockMap=None):
         self.del_channel(sockMap)
+
+    def _writeInterestChanged(self):
+        # Event-driven socket maps (see SelectorDispatcher) watch for
+        # write readiness only while transport has something to send
+        updateInterest = getattr(self._map, 'updateInterest', None)
+        if updateInterest is not None:
+            updateInterest(self)
         
     # Public API
     
@@ -40,6 +51,43 @@ class AbstractSocketTransport(asyncore.dispatcher):
 
     def openServerMode(self, iface=None):
         raise error.CarrierError('Method not implemented')
+
+    def setReusePort(self, flag=1):
+        """Allow other sockets to bind the same local address (must be
+           called prior to opening transport). Kernel would then balance
+           incoming traffic among all sockets so bound."""
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise error.CarrierError(
+                'SO_REUSEPORT is not supported at this platform'
+                )
+        try:
+            self.socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_REUSEPORT, flag and 1 or 0
+                )
+        except socket.error:
+            raise error.CarrierError('setsockopt() for SO_REUSEPORT failed: %s' % (sys.exc_info()[1],))
+        
+    def setSocketBufferSizes(self, rcvBufSize=0, sndBufSize=0):
+        """Set kernel socket receive and send buffer sizes in octets
+           (SO_RCVBUF/SO_SNDBUF), zero leaves respective size intact."""
+        for option, size in ((socket.SO_RCVBUF, rcvBufSize),
+                             (socket.SO_SNDBUF, sndBufSize)):
+            if not size:
+                continue
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, option, size)
+            except socket.error:
+                raise error.CarrierError('setsockopt() for buffer size %s failed: %s' % (size, sys.exc_info()[1],))
+
+    def getSocketBufferSizes(self):
+        """Return actual receive and send buffer sizes as set by kernel"""
+        try:
+            return (
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+                )
+        except socket.error:
+            raise error.CarrierError('getsockopt() failed: %s' % (sys.exc_info()[1],))
         
     def sendMessage(self, outgoingMessage, transportAddress):
         raise error.CarrierError('Method not implemented')
@@ -50,8 +98,15 @@ class AbstractSocketTransport(asyncore.dispatcher):
     def unregisterCbFun(self):
         self._cbFun = None
 
+    def registerBackPressureCbFun(self, cbFun):
+        self._backPressureCbFun = cbFun
+
+    def unregisterBackPressureCbFun(self):
+        self._backPressureCbFun = None
+
     def closeTransport(self):
         self.unregisterCbFun()
+        self.unregisterBackPressureCbFun()
         self.close()
         
     # asyncore API
@@ -1,5 +1,6 @@
 # Implements asyncore-based generic DGRAM transport
-import socket, errno, sys
+import socket, errno, struct, sys
+from collections import deque
 from pysnmp.carrier.asynsock.base import AbstractSocketTransport
 from pysnmp.carrier import error
 from pysnmp import debug
@@ -19,11 +20,35 @@ except AttributeError:
     # Windows sockets do not have EBADFD
     pass
 
+# Linux reports receive queue drops with received datagrams
+soRxqOvfl = getattr(socket, 'SO_RXQ_OVFL', None)
+if soRxqOvfl is None and sys.platform.startswith('linux'):
+    soRxqOvfl = 40
+
+try:
+    memoryview
+except NameError:
+    # Python < 2.7
+    memoryview = None
+
 class DgramSocketTransport(AbstractSocketTransport):
     sockType = socket.SOCK_DGRAM
     retryCount = 3; retryInterval = 1
     def __init__(self, sock=None, sockMap=None):
-        self.__outQueue = []
+        self.__outQueue = deque()
+        self.__ioBatchSize = 1
+        self.__maxQueueSize = 0
+        self.__highWatermark = self.__lowWatermark = 0
+        self.__congested = 0
+        self.__queueDrops = 0
+        self.__congestionEvents = 0
+        self.__recvBuffers = None
+        self.__recvBufferPoolSize = 0
+        self.__recvBufferSize = 65535
+        self.__retainedRecvBuffers = 0
+        self.__ancBufSize = 0
+        self.__kernelRecvDrops = 0
+        self.__recorder = self.__recordDomain = None
         AbstractSocketTransport.__init__(self, sock, sockMap)
         
     def openClientMode(self, iface=None):
@@ -42,43 +67,415 @@ class DgramSocketTransport(AbstractSocketTransport):
         return self
 
     def sendMessage(self, outgoingMessage, transportAddress):
+        queueDepth = len(self.__outQueue)
+        if self.__maxQueueSize and queueDepth >= self.__maxQueueSize:
+            self.__queueDrops += 1
+            debug.logger & debug.flagIO and debug.logger('sendMessage: out-queue full (%d), dropping msg to %r' % (queueDepth, transportAddress))
+            return
         self.__outQueue.append(
             (outgoingMessage, transportAddress)
             )
+        if not queueDepth:
+            self._writeInterestChanged()
+        if self.__highWatermark and not self.__congested and \
+                 queueDepth + 1 >= self.__highWatermark:
+            self.__congested = 1
+            self.__congestionEvents += 1
+            self.__reportBackPressure()
+
+    # Out-queue management
+
+    def setOutQueueLimits(self, maxQueueSize=0,
+                          highWatermark=0, lowWatermark=0):
+        """Bound outgoing messages queue and configure back-pressure.
+
+           Messages submitted while maxQueueSize messages are queued are
+           dropped and counted. Once queue grows to highWatermark messages,
+           back-pressure callback is invoked with congestion flag set and
+           then again with flag cleared as soon as queue drains down to
+           lowWatermark messages. Zero disables corresponding limit.
+        """
+        if highWatermark and lowWatermark >= highWatermark or \
+               maxQueueSize and highWatermark > maxQueueSize:
+            raise error.CarrierError(
+                'Inconsistent out-queue limits %s/%s/%s' % (maxQueueSize, highWatermark, lowWatermark)
+                )
+        self.__maxQueueSize = maxQueueSize
+        self.__highWatermark = highWatermark
+        self.__lowWatermark = lowWatermark
+
+    def isCongested(self): return self.__congested
+
+    def getStatistics(self):
+        return {
+            'outQueueDepth': len(self.__outQueue),
+            'outQueueDrops': self.__queueDrops,
+            'congestionEvents': self.__congestionEvents,
+            'retainedRecvBuffers': self.__retainedRecvBuffers,
+            'kernelRecvDrops': self.__kernelRecvDrops
+            }
+
+    def __reportBackPressure(self):
+        debug.logger & debug.flagIO and debug.logger('__reportBackPressure: congested %s, out-queue depth %d' % (self.__congested, len(self.__outQueue)))
+        if self._backPressureCbFun is not None:
+            self._backPressureCbFun(self, self.__congested)
+
+    # Batched I/O
+
+    def setIoBatchSize(self, ioBatchSize):
+        """Handle up to ioBatchSize datagrams per socket readiness event.
+
+           Received datagrams are drained from the socket first and then
+           passed to dispatcher callback one after another as a burst.
+           Default is 1 what means one datagram per event.
+        """
+        if ioBatchSize < 1:
+            raise error.CarrierError('Bad I/O batch size %s' % ioBatchSize)
+        self.__ioBatchSize = ioBatchSize
+
+    def getIoBatchSize(self): return self.__ioBatchSize
+
+    # Kernel drops monitoring
+
+    def setRecvDropsMonitoring(self, flag=1):
+        """Count datagrams dropped by kernel for socket receive buffer
+           overflow (SO_RXQ_OVFL). The count comes with each received
+           datagram and is reported as kernelRecvDrops statistics."""
+        if soRxqOvfl is None or not hasattr(self.socket, 'recvmsg'):
+            raise error.CarrierError(
+                'Receive drops monitoring not supported at this platform'
+                )
+        try:
+            self.socket.setsockopt(
+                socket.SOL_SOCKET, soRxqOvfl, flag and 1 or 0
+                )
+        except socket.error:
+            raise error.CarrierError('setsockopt() for SO_RXQ_OVFL failed: %s' % (sys.exc_info()[1],))
+        if flag:
+            self.__ancBufSize = socket.CMSG_SPACE(4)
+        else:
+            self.__ancBufSize = 0
+
+    def __processAncData(self, ancData):
+        for cmsgLevel, cmsgType, cmsgData in ancData:
+            if cmsgLevel == socket.SOL_SOCKET and cmsgType == soRxqOvfl \
+                   and len(cmsgData) >= 4:
+                self.__kernelRecvDrops, = struct.unpack('=I', cmsgData[:4])
+
+    # Receive buffers pool
+
+    def setRecvBufferPool(self, poolSize, bufferSize=65535):
+        """Receive datagrams into a pool of reusable buffers.
+
+           Dispatcher callback is then passed a memoryview into receive
+           buffer rather than a newly allocated string. The view remains
+           valid for as long as recipient keeps a reference to it, the
+           buffer is only reused once all views into it are gone. As a
+           retained view pins the whole buffer, recipients should rather
+           copy messages they keep. Datagrams longer than bufferSize get
+           truncated. Zero poolSize turns this mode off.
+
+           SnmpEngine keeps parts of every message it processes and thus
+           copies each one on entry, so SNMP engine based applications
+           gain nothing from this mode. It pays off for dispatcher
+           callbacks handling messages in place.
+
+           Whether a buffer is still viewed is probed right after the
+           callback returns. That relies on views being released as soon
+           as they are unreferenced (CPython reference counting). With
+           interpreters collecting garbage later (e.g. PyPy) buffers are
+           mostly found retained, and a new one is then allocated per
+           datagram (see getStatistics()).
+        """
+        if not poolSize:
+            self.__recvBuffers = None
+            self.__recvBufferPoolSize = 0
+            return
+        if memoryview is None or \
+               not hasattr(self.socket, 'recvfrom_into'):
+            raise error.CarrierError(
+                'Receive buffers not supported at this Python'
+                )
+        if poolSize < 0 or bufferSize < 1:
+            raise error.CarrierError(
+                'Bad receive buffers pool parameters %s/%s' % (poolSize, bufferSize)
+                )
+        self.__recvBufferPoolSize = poolSize
+        if self.__recvBufferSize != bufferSize or self.__recvBuffers is None:
+            self.__recvBuffers = []
+        self.__recvBufferSize = bufferSize
+
+    def setRecorder(self, recorder, transportDomain):
+        """Write incoming messages to recorder (such as
+           pysnmp.carrier.replay.MessageRecorder) under transportDomain,
+           None recorder disables recording"""
+        self.__recorder = recorder
+        self.__recordDomain = transportDomain
+
+    def __getRecvBuffer(self):
+        if self.__recvBuffers:
+            return self.__recvBuffers.pop()
+        return bytearray(self.__recvBufferSize)
+
+    def __putRecvBuffer(self, buffer):
+        # bytearray can't be resized while exported to a memoryview
+        try:
+            buffer.append(0)
+        except BufferError:
+            # recipient still holds a view, buffer is left to it
+            self.__retainedRecvBuffers += 1
+            return
+        del buffer[-1]
+        if len(self.__recvBuffers) < self.__recvBufferPoolSize:
+            self.__recvBuffers.append(buffer)
 
     # asyncore API
     def handle_connect(self): pass
     def writable(self): return self.__outQueue
     def handle_write(self):
-        outgoingMessage, transportAddress = self.__outQueue.pop()
-        debug.logger & debug.flagIO and debug.logger('handle_write: transportAddress %r -> %r outgoingMessage %s' % (self.socket.getsockname(), transportAddress, debug.hexdump(outgoingMessage)))
-        if not transportAddress:
-            debug.logger & debug.flagIO and debug.logger('handle_write: missing dst address, loosing outgoing msg')
-            return
-        try:
-            self.socket.sendto(outgoingMessage, transportAddress)
-        except socket.error:
-            if sys.exc_info()[1].args[0] in sockErrors:
-                debug.logger & debug.flagIO and debug.logger('handle_write: ignoring socket error %s' % (sys.exc_info()[1],))
-            else:
-                raise error.CarrierError('sendto() failed for %s: %s' % (transportAddress, sys.exc_info()[1]))
+        outQueue = self.__outQueue
+        for x in range(self.__ioBatchSize):
+            if not outQueue:
+                break
+            outgoingMessage, transportAddress = outQueue.popleft()
+            debug.logger & debug.flagIO and debug.logger('handle_write: transportAddress %r -> %r outgoingMessage %s' % (self.socket.getsockname(), transportAddress, debug.hexdump(outgoingMessage)))
+            if not transportAddress:
+                debug.logger & debug.flagIO and debug.logger('handle_write: missing dst address, loosing outgoing msg')
+                continue
+            try:
+                self.socket.sendto(outgoingMessage, transportAddress)
+            except socket.error:
+                if sys.exc_info()[1].args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    # socket buffer is full, retry on next write event
+                    outQueue.appendleft((outgoingMessage, transportAddress))
+                    break
+                if sys.exc_info()[1].args[0] in sockErrors:
+                    debug.logger & debug.flagIO and debug.logger('handle_write: ignoring socket error %s' % (sys.exc_info()[1],))
+                else:
+                    raise error.CarrierError('sendto() failed for %s: %s' % (transportAddress, sys.exc_info()[1]))
+        if self.__congested and len(outQueue) <= self.__lowWatermark:
+            self.__congested = 0
+            self.__reportBackPressure()
+        if not outQueue:
+            self._writeInterestChanged()
             
     def readable(self): return 1
     def handle_read(self):
-        try:
-            incomingMessage, transportAddress = self.socket.recvfrom(65535)
-            debug.logger & debug.flagIO and debug.logger('handle_read: transportAddress %r -> %r incomingMessage %s' % (transportAddress, self.socket.getsockname(), debug.hexdump(incomingMessage)))
-            if not incomingMessage:
-                self.handle_close()
-                return
-            else:
-                self._cbFun(self, transportAddress, incomingMessage)
-                return
-        except socket.error:
-            if sys.exc_info()[1].args[0] in sockErrors:
-                debug.logger & debug.flagIO and debug.logger('handle_read: known socket error %s' % (sys.exc_info()[1],))
-                sockErrors[sys.exc_info()[1].args[0]] and self.handle_close()
-                return
+        burst = []
+        buffer = None
+        for x in range(self.__ioBatchSize):
+            try:
+                if self.__recvBuffers is None:
+                    if self.__ancBufSize:
+                        incomingMessage, ancData, flags, transportAddress = self.socket.recvmsg(65535, self.__ancBufSize)
+                        self.__processAncData(ancData)
+                    else:
+                        incomingMessage, transportAddress = self.socket.recvfrom(65535)
+                else:
+                    buffer = self.__getRecvBuffer()
+                    if self.__ancBufSize:
+                        size, ancData, flags, transportAddress = self.socket.recvmsg_into([buffer], self.__ancBufSize)
+                        self.__processAncData(ancData)
+                    else:
+                        size, transportAddress = self.socket.recvfrom_into(buffer)
+                    incomingMessage = buffer, size
+            except socket.error:
+                if buffer is not None:
+                    self.__recvBuffers.append(buffer)
+                    buffer = None
+                if sys.exc_info()[1].args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break  # socket drained
+                if sys.exc_info()[1].args[0] in sockErrors:
+                    debug.logger & debug.flagIO and debug.logger('handle_read: known socket error %s' % (sys.exc_info()[1],))
+                    if sockErrors[sys.exc_info()[1].args[0]]:
+                        self.__deliver(burst)
+                        self.handle_close()
+                        return
+                    continue
+                else:
+                    raise error.CarrierError('recvfrom() failed: %s' % (sys.exc_info()[1],))
+            if buffer is not None:
+                buffer = None
+                debug.logger & debug.flagIO and debug.logger('handle_read: transportAddress %r -> %r incomingMessage %s' % (transportAddress, self.socket.getsockname(), debug.hexdump(incomingMessage[0][:incomingMessage[1]])))
+                if not incomingMessage[1]:
+                    self.__recvBuffers.append(incomingMessage[0])
+                    self.__deliver(burst)
+                    self.handle_close()
+                    return
             else:
-                raise error.CarrierError('recvfrom() failed: %s' % (sys.exc_info()[1],))
+                debug.logger & debug.flagIO and debug.logger('handle_read: transportAddress %r -> %r incomingMessage %s' % (transportAddress, self.socket.getsockname(), debug.hexdump(incomingMessage)))
+                if not incomingMessage:
+                    self.__deliver(burst)
+                    self.handle_close()
+                    return
+            burst.append((transportAddress, incomingMessage))
+        self.__deliver(burst)
+
+    def __deliver(self, burst):
+        # whole burst is delivered even if callback fails on some of
+        # its messages, the first failure is re-raised after that
+        failure = None
+        if self.__recvBuffers is None:
+            for transportAddress, incomingMessage in burst:
+                try:
+                    if self.__recorder is not None:
+                        self.__recorder.record(
+                            self.__recordDomain, transportAddress,
+                            incomingMessage
+                            )
+                    self._cbFun(self, transportAddress, incomingMessage)
+                except Exception:
+                    if failure is None:
+                        failure = sys.exc_info()[1]
+        else:
+            # view is not bound here so that it goes away on return
+            # unless recipient has retained it
+            for transportAddress, (buffer, size) in burst:
+                try:
+                    try:
+                        if self.__recorder is not None:
+                            self.__recorder.record(
+                                self.__recordDomain, transportAddress,
+                                memoryview(buffer)[:size]
+                                )
+                        self._cbFun(
+                            self, transportAddress, memoryview(buffer)[:size]
+                            )
+                    except Exception:
+                        if failure is None:
+                            failure = sys.exc_info()[1]
+                finally:
+                    self.__putRecvBuffer(buffer)
+        if failure is not None:
+            raise failure
+
     def handle_close(self): pass # no datagram connection
+
+class DgramSocketPoolTransport:
+    """Client mode transport spreading outgoing messages over a pool of
+       datagram sockets.
+
+       Each socket has source port and kernel buffers of its own, so that
+       responses from many peers would not overflow a single receive
+       buffer. Outgoing messages are assigned to sockets in round-robin
+       order, messages received by any socket are reported on behalf of
+       the pool so that responses get matched to requests the usual way.
+    """
+    protoTransport = DgramSocketTransport
+    def __init__(self, poolSize=4):
+        if poolSize < 1:
+            raise error.CarrierError('Bad socket pool size %s' % poolSize)
+        self.__transports = [ self.protoTransport() for x in range(poolSize) ]
+        self.__nextIndex = 0
+        self.__congested = {}
+        self._cbFun = None
+        self._backPressureCbFun = None
+
+    def getTransports(self): return tuple(self.__transports)
+
+    def openClientMode(self, iface=None):
+        if iface is not None and iface[1] and len(self.__transports) > 1:
+            raise error.CarrierError(
+                'Pooled sockets can not share port %s' % (iface[1],)
+                )
+        for transport in self.__transports:
+            transport.openClientMode(iface)
+        return self
+
+    def openServerMode(self, iface=None):
+        raise error.CarrierError('Socket pool is for client mode only')
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        transport = self.__transports[self.__nextIndex]
+        self.__nextIndex = (self.__nextIndex + 1) % len(self.__transports)
+        transport.sendMessage(outgoingMessage, transportAddress)
+
+    # pooled transports configuration
+
+    def setSocketBufferSizes(self, rcvBufSize=0, sndBufSize=0):
+        for transport in self.__transports:
+            transport.setSocketBufferSizes(rcvBufSize, sndBufSize)
+
+    def getSocketBufferSizes(self):
+        return self.__transports[0].getSocketBufferSizes()
+
+    def setIoBatchSize(self, ioBatchSize):
+        for transport in self.__transports:
+            transport.setIoBatchSize(ioBatchSize)
+
+    def setOutQueueLimits(self, maxQueueSize=0,
+                          highWatermark=0, lowWatermark=0):
+        for transport in self.__transports:
+            transport.setOutQueueLimits(
+                maxQueueSize, highWatermark, lowWatermark
+                )
+
+    def setRecvBufferPool(self, poolSize, bufferSize=65535):
+        for transport in self.__transports:
+            transport.setRecvBufferPool(poolSize, bufferSize)
+
+    def setRecvDropsMonitoring(self, flag=1):
+        for transport in self.__transports:
+            transport.setRecvDropsMonitoring(flag)
+
+    def setRecorder(self, recorder, transportDomain):
+        for transport in self.__transports:
+            transport.setRecorder(recorder, transportDomain)
+
+    def getStatistics(self):
+        """Statistics summed up over pooled transports"""
+        statistics = {}
+        for transport in self.__transports:
+            for k, v in transport.getStatistics().items():
+                statistics[k] = statistics.get(k, 0) + v
+        return statistics
+
+    # AsynsockDispatcher API
+
+    def registerSocket(self, sockMap=None):
+        for transport in self.__transports:
+            transport.registerSocket(sockMap)
+
+    def unregisterSocket(self, sockMap=None):
+        for transport in self.__transports:
+            transport.unregisterSocket(sockMap)
+
+    def registerCbFun(self, cbFun):
+        self._cbFun = cbFun
+        for transport in self.__transports:
+            transport.registerCbFun(self.__recvCbFun)
+
+    def unregisterCbFun(self):
+        self._cbFun = None
+        for transport in self.__transports:
+            transport.unregisterCbFun()
+
+    def __recvCbFun(self, transport, transportAddress, incomingMessage):
+        self._cbFun(self, transportAddress, incomingMessage)
+
+    def registerBackPressureCbFun(self, cbFun):
+        self._backPressureCbFun = cbFun
+        for transport in self.__transports:
+            transport.registerBackPressureCbFun(self.__backPressureCbFun)
+
+    def unregisterBackPressureCbFun(self):
+        self._backPressureCbFun = None
+        for transport in self.__transports:
+            transport.unregisterBackPressureCbFun()
+
+    # pool is congested while any of its sockets is
+    def __backPressureCbFun(self, transport, congested):
+        wasCongested = self.__congested and 1 or 0
+        if congested:
+            self.__congested[id(transport)] = 1
+        elif id(transport) in self.__congested:
+            del self.__congested[id(transport)]
+        isCongested = self.__congested and 1 or 0
+        if isCongested != wasCongested and \
+               self._backPressureCbFun is not None:
+            self._backPressureCbFun(self, isCongested)
+
+    def closeTransport(self):
+        self._cbFun = self._backPressureCbFun = None
+        for transport in self.__transports:
+            transport.closeTransport()
@@ -1,10 +1,14 @@
 # Implements asyncore-based UDP transport domain
 from socket import AF_INET
-from pysnmp.carrier.asynsock.dgram.base import DgramSocketTransport
+from pysnmp.carrier.asynsock.dgram.base import DgramSocketTransport, \
+     DgramSocketPoolTransport
 
 domainName = snmpUDPDomain = (1, 3, 6, 1, 6, 1, 1)
 
 class UdpSocketTransport(DgramSocketTransport):
     sockFamily = AF_INET
 
+class UdpSocketPoolTransport(DgramSocketPoolTransport):
+    protoTransport = UdpSocketTransport
+
 UdpTransport = UdpSocketTransport
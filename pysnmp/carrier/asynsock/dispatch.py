@@ -1,13 +1,47 @@
 # Implements I/O over asynchronous sockets
+import socket
 from time import time
 from select import select
-from asyncore import socket_map
+from asyncore import socket_map, dispatcher
 from pysnmp.carrier.base import AbstractTransportDispatcher
+from pysnmp.carrier import error
 from asyncore import poll
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+class Waker(dispatcher):
+    """Socket pair making dispatcher return from select() when other
+       thread has something for it to do"""
+    def __init__(self, sockMap):
+        rsock, self.__wsock = socket.socketpair()
+        self.__wsock.setblocking(0)
+        dispatcher.__init__(self, rsock, sockMap)
+
+    def writable(self): return 0
+
+    def handle_read(self):
+        try:
+            self.recv(4096)
+        except socket.error:
+            pass
+
+    def wakeup(self):
+        try:
+            self.__wsock.send('\x00'.encode())
+        except socket.error:
+            pass  # already pending wakeup
+
+    def close(self):
+        dispatcher.close(self)
+        self.__wsock.close()
 
 class AsynsockDispatcher(AbstractTransportDispatcher):
     def __init__(self):
         self.__sockMap = {} # use own map for MT safety
+        self.__waker = None
+        self.__eventDriven = 0
         self.timeout = 0.5
         AbstractTransportDispatcher.__init__(self)
 
@@ -16,10 +50,13 @@ class AsynsockDispatcher(AbstractTransportDispatcher):
     
     def registerTransport(self, tDomain, t):
         AbstractTransportDispatcher.registerTransport(self, tDomain, t)
+        t.registerBackPressureCbFun(self._backPressureCbFun)
         t.registerSocket(self.__sockMap)
 
     def unregisterTransport(self, tDomain):
-        self.getTransport(tDomain).unregisterSocket(self.__sockMap)
+        t = self.getTransport(tDomain)
+        t.unregisterSocket(self.__sockMap)
+        t.unregisterBackPressureCbFun()
         AbstractTransportDispatcher.unregisterTransport(self, tDomain)
 
     def transportsAreWorking(self):
@@ -27,8 +64,164 @@ class AsynsockDispatcher(AbstractTransportDispatcher):
             if transport.writable():
                 return 1
         return 0
+
+    def prepareThreadedCalls(self):
+        AbstractTransportDispatcher.prepareThreadedCalls(self)
+        if self.__waker is None:
+            self.__waker = Waker(self.__sockMap)
+
+    def _wakeupDispatcher(self):
+        if self.__waker is not None:
+            self.__waker.wakeup()
     
+    def setEventDrivenMode(self, flag=1):
+        """In event-driven mode runDispatcher() sleeps until I/O event,
+           nearest timer deadline or call from other thread rather than
+           waking up every self.timeout seconds. Jobs finished by other
+           threads wake dispatcher up so that it returns right after the
+           last job is done.
+
+           Callbacks registered by registerTimerCbFun() are deadlines
+           too: while any is registered, dispatcher still wakes up every
+           timer resolution to run them. SNMP engine registers one, so
+           with an engine attached this mode mostly changes how soon
+           dispatcher reacts to other threads and finished jobs."""
+        self.__eventDriven = flag and 1 or 0
+
+    def isEventDriven(self): return self.__eventDriven
+
+    def _startDispatcher(self, timeout):
+        # returns the longest time to block for I/O
+        self._setDispatcherThread()
+        if self.__eventDriven:
+            self.prepareThreadedCalls()
+            # pick up calls made by other threads while not running
+            self._runThreadCalls()
+            return timeout or None
+        return timeout and timeout or self.timeout
+
     def runDispatcher(self, timeout=0.0):
+        maxTimeout = self._startDispatcher(timeout)
         while self.jobsArePending() or self.transportsAreWorking():
-            poll(timeout and timeout or self.timeout, self.__sockMap)
+            poll(self.getTimerTimeout(time(), maxTimeout), self.__sockMap)
             self.handleTimerTick(time())
+
+    def closeDispatcher(self):
+        AbstractTransportDispatcher.closeDispatcher(self)
+        if self.__waker is not None:
+            self.__waker.close()
+            self.__waker = None
+
+class SelectorSocketMap(dict):
+    """asyncore-compatible socket map mirrored into a selector.
+
+       Sockets are watched for readability as long as they are in the
+       map, write readiness is only watched for while transport has
+       something to send (see AbstractSocketTransport._writeInterestChanged).
+    """
+    def __init__(self, selector):
+        dict.__init__(self)
+        self.__selector = selector
+        self.__writers = {}
+
+    def __events(self, obj):
+        events = 0
+        if obj.readable():
+            events |= selectors.EVENT_READ
+        if obj.writable():
+            events |= selectors.EVENT_WRITE
+            self.__writers[obj._fileno] = 1
+        elif obj._fileno in self.__writers:
+            del self.__writers[obj._fileno]
+        return events
+
+    def __setitem__(self, fd, obj):
+        if fd in self:
+            del self[fd]
+        dict.__setitem__(self, fd, obj)
+        events = self.__events(obj)
+        if events:
+            self.__selector.register(fd, events, obj)
+
+    def __delitem__(self, fd):
+        dict.__delitem__(self, fd)
+        if fd in self.__writers:
+            del self.__writers[fd]
+        try:
+            self.__selector.unregister(fd)
+        except KeyError:
+            pass  # never had any events of interest
+
+    def updateInterest(self, obj):
+        fd = obj._fileno
+        if fd not in self:
+            return
+        events = self.__events(obj)
+        try:
+            key = self.__selector.get_key(fd)
+        except KeyError:
+            if events:
+                self.__selector.register(fd, events, obj)
+            return
+        if events != key.events:
+            if events:
+                self.__selector.modify(fd, events, obj)
+            else:
+                self.__selector.unregister(fd)
+
+    def hasWriters(self): return self.__writers and 1 or 0
+
+    def select(self, timeout):
+        return self.__selector.select(timeout)
+
+    def close(self):
+        self.__selector.close()
+
+class SelectorDispatcher(AsynsockDispatcher):
+    """Event-driven dispatcher for asyncore-based transports.
+
+       Drives the same transports as AsynsockDispatcher does but relies
+       upon the best readiness notification mechanism available at the
+       platform (epoll, kqueue, devpoll or poll) through the selectors
+       module. The cost of each wakeup is proportional to the number of
+       ready sockets rather than to the number of sockets registered.
+    """
+    def __init__(self, selector=None):
+        if selectors is None:
+            raise error.CarrierError(
+                'selectors module not available at this Python'
+                )
+        AsynsockDispatcher.__init__(self)
+        if selector is None:
+            selector = selectors.DefaultSelector()
+        AsynsockDispatcher.setSocketMap(self, SelectorSocketMap(selector))
+
+    def setSocketMap(self, sockMap=socket_map):
+        raise error.CarrierError(
+            'Socket map is managed by %s' % self.__class__.__name__
+            )
+
+    def transportsAreWorking(self):
+        return self.getSocketMap().hasWriters()
+
+    def runDispatcher(self, timeout=0.0):
+        sockMap = self.getSocketMap()
+        maxTimeout = self._startDispatcher(timeout)
+        while self.jobsArePending() or self.transportsAreWorking():
+            for key, events in sockMap.select(
+                    self.getTimerTimeout(time(), maxTimeout)
+                    ):
+                transport = key.data
+                # previous handler might have closed the socket
+                if sockMap.get(key.fd) is not transport:
+                    continue
+                if events & selectors.EVENT_READ:
+                    transport.handle_read_event()
+                if events & selectors.EVENT_WRITE and \
+                       sockMap.get(key.fd) is transport:
+                    transport.handle_write_event()
+            self.handleTimerTick(time())
+
+    def closeDispatcher(self):
+        AsynsockDispatcher.closeDispatcher(self)
+        self.getSocketMap().close()
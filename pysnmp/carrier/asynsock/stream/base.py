@@ -0,0 +1,231 @@
+# Implements asyncore-based generic STREAM transport
+import socket, sys
+import asyncore
+from pysnmp.carrier.asynsock.base import AbstractSocketTransport
+from pysnmp.carrier.framing import splitMessages
+from pysnmp.carrier import error
+from pysnmp import debug
+
+class StreamConnection(asyncore.dispatcher):
+    """Single stream connection owned by StreamSocketTransport"""
+    def __init__(self, transport, transportAddress, sock=None, sockMap=None):
+        self.__transport = transport
+        self.__transportAddress = transportAddress
+        self.__inBuffer = ''.encode()
+        self.__outBuffer = []
+        self.__outSize = 0
+        asyncore.dispatcher.__init__(self, sock, sockMap)
+
+    def getTransportAddress(self): return self.__transportAddress
+
+    def getOutSize(self): return self.__outSize
+
+    def connectTo(self, iface=None):
+        self.create_socket(self.__transport.sockFamily, socket.SOCK_STREAM)
+        try:
+            if iface is not None:
+                self.socket.bind(iface)
+            self.connect(self.__transportAddress)
+        except socket.error:
+            raise error.CarrierError('connect() to %s failed: %s' % (self.__transportAddress, sys.exc_info()[1]))
+        self.__writeInterestChanged()
+
+    def __writeInterestChanged(self):
+        updateInterest = getattr(self._map, 'updateInterest', None)
+        if updateInterest is not None:
+            updateInterest(self)
+
+    def sendMessage(self, outgoingMessage):
+        self.__outBuffer.append(outgoingMessage)
+        self.__outSize += len(outgoingMessage)
+        if len(self.__outBuffer) == 1:
+            self.__writeInterestChanged()
+
+    # asyncore API
+
+    def readable(self): return 1
+    def writable(self): return self.connecting or self.__outSize
+
+    # socket errors terminate this connection only
+    def handle_read_event(self):
+        try:
+            asyncore.dispatcher.handle_read_event(self)
+        except socket.error:
+            self.__failed()
+
+    def handle_write_event(self):
+        try:
+            asyncore.dispatcher.handle_write_event(self)
+        except socket.error:
+            self.__failed()
+
+    def handle_connect(self):
+        debug.logger & debug.flagIO and debug.logger('handle_connect: connected to %r' % (self.__transportAddress,))
+
+    def handle_write(self):
+        outBuffer = self.__outBuffer
+        if not outBuffer:
+            self.__writeInterestChanged()  # just connected
+            return
+        if len(outBuffer) > 1:
+            outBuffer[:] = [ ''.encode().join(outBuffer) ]
+        sent = self.send(outBuffer[0])
+        debug.logger & debug.flagIO and debug.logger('handle_write: transportAddress %r sent %d of %d octets' % (self.__transportAddress, sent, self.__outSize))
+        if sent:
+            self.__outSize -= sent
+            if self.__outSize:
+                outBuffer[0] = outBuffer[0][sent:]
+            else:
+                del outBuffer[:]
+                self.__writeInterestChanged()
+
+    def handle_read(self):
+        data = self.recv(65536)
+        if not data:
+            return  # connection closed
+        self.__inBuffer += data
+        try:
+            messages, self.__inBuffer = splitMessages(
+                self.__inBuffer, self.__transport.maxMessageSize
+                )
+        except error.CarrierError:
+            debug.logger & debug.flagIO and debug.logger('handle_read: bad stream from %r: %s' % (self.__transportAddress, sys.exc_info()[1]))
+            self.__transport._framingError(self)
+            self.handle_close()
+            return
+        for incomingMessage in messages:
+            debug.logger & debug.flagIO and debug.logger('handle_read: transportAddress %r incomingMessage %s' % (self.__transportAddress, debug.hexdump(incomingMessage)))
+            self.__transport._cbFun(
+                self.__transport, self.__transportAddress, incomingMessage
+                )
+
+    def __failed(self):
+        debug.logger & debug.flagIO and debug.logger('__failed: connection to %r failed: %s' % (self.__transportAddress, sys.exc_info()[1]))
+        self.handle_close()
+
+    def handle_close(self):
+        if self.__outSize:
+            debug.logger & debug.flagIO and debug.logger('handle_close: loosing %d octets to %r' % (self.__outSize, self.__transportAddress))
+        self.__outBuffer = []
+        self.__outSize = 0
+        self.close()
+        self.__transport._connectionClosed(self)
+
+    def handle_error(self): raise
+
+class StreamSocketTransport(AbstractSocketTransport):
+    """Stream transport keeping persistent connections to its peers.
+
+       In server mode, connections accepted from peers are used for
+       responding. Messages to other destinations (e.g. notifications
+       or client mode requests) go through a pool of connections to
+       each destination. Connections are opened on demand, the least
+       loaded connection is used and new ones are added to the pool
+       while all existing ones are busy sending, up to pool size.
+    """
+    sockType = socket.SOCK_STREAM
+    maxMessageSize = 0x10000 * 16
+    listenBacklog = 64
+    def __init__(self, sock=None, sockMap=None):
+        self.__pool = {}  # transportAddress -> [ StreamConnection ]
+        self.__poolSize = 1
+        self.__iface = None
+        self.__openedConnections = 0
+        self.__closedConnections = 0
+        self.__framingErrors = 0
+        AbstractSocketTransport.__init__(self, sock, sockMap)
+
+    def openClientMode(self, iface=None):
+        self.__iface = iface
+        return self
+
+    def openServerMode(self, iface):
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.bind(iface)
+            self.listen(self.listenBacklog)
+        except socket.error:
+            raise error.CarrierError('bind()/listen() for %s failed: %s' % (iface, sys.exc_info()[1],))
+        return self
+
+    def setPoolSize(self, poolSize):
+        """Keep up to poolSize connections to each destination"""
+        if poolSize < 1:
+            raise error.CarrierError('Bad connection pool size %s' % poolSize)
+        self.__poolSize = poolSize
+
+    def getPoolSize(self): return self.__poolSize
+
+    def getStatistics(self):
+        return {
+            'activeConnections': sum([ len(x) for x in self.__pool.values() ]),
+            'openedConnections': self.__openedConnections,
+            'closedConnections': self.__closedConnections,
+            'framingErrors': self.__framingErrors
+            }
+
+    def __addConnection(self, conn):
+        transportAddress = conn.getTransportAddress()
+        if transportAddress in self.__pool:
+            self.__pool[transportAddress].append(conn)
+        else:
+            self.__pool[transportAddress] = [ conn ]
+        self.__openedConnections += 1
+        debug.logger & debug.flagIO and debug.logger('__addConnection: %r, %d connection(s) to peer' % (transportAddress, len(self.__pool[transportAddress])))
+
+    def _connectionClosed(self, conn):
+        transportAddress = conn.getTransportAddress()
+        conns = self.__pool.get(transportAddress, ())
+        if conn in conns:
+            conns.remove(conn)
+            if not conns:
+                del self.__pool[transportAddress]
+            self.__closedConnections += 1
+
+    def _framingError(self, conn):
+        self.__framingErrors += 1
+
+    def __getConnection(self, transportAddress):
+        conns = self.__pool.get(transportAddress)
+        if conns:
+            conn = conns[0]
+            for c in conns[1:]:
+                if c.getOutSize() < conn.getOutSize():
+                    conn = c
+            if not conn.getOutSize() or len(conns) >= self.__poolSize:
+                return conn
+        conn = StreamConnection(self, transportAddress, sockMap=self._map)
+        conn.connectTo(self.__iface)
+        self.__addConnection(conn)
+        return conn
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        debug.logger & debug.flagIO and debug.logger('sendMessage: transportAddress %r outgoingMessage %s' % (transportAddress, debug.hexdump(outgoingMessage)))
+        if not transportAddress:
+            debug.logger & debug.flagIO and debug.logger('sendMessage: missing dst address, loosing outgoing msg')
+            return
+        self.__getConnection(transportAddress).sendMessage(outgoingMessage)
+
+    def closeTransport(self):
+        for conns in list(self.__pool.values()):
+            for conn in conns[:]:
+                conn.handle_close()
+        AbstractSocketTransport.closeTransport(self)
+
+    # asyncore API
+    def readable(self): return self.accepting
+    def writable(self): return 0
+
+    def handle_accept(self):
+        try:
+            pair = self.accept()
+        except socket.error:
+            debug.logger & debug.flagIO and debug.logger('handle_accept: accept() failed: %s' % (sys.exc_info()[1],))
+            return
+        if pair is None:
+            return
+        sock, transportAddress = pair
+        debug.logger & debug.flagIO and debug.logger('handle_accept: connection from %r' % (transportAddress,))
+        self.__addConnection(
+            StreamConnection(self, transportAddress, sock, self._map)
+            )
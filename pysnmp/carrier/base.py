@@ -1,4 +1,12 @@
 # Abstract I/O dispatcher. Defines standard dispatcher API
+import heapq
+from time import time
+from collections import deque
+try:
+    from threading import get_ident
+except ImportError:
+    from thread import get_ident
+from pysnmp.carrier.pacing import MessagePacer
 from pysnmp.carrier import error
 
 class TimerCallable:
@@ -18,27 +26,104 @@ class TimerCallable:
     def __le__(self, cbFun): return self.__cbFun <= cbFun
     def __gt__(self, cbFun): return self.__cbFun > cbFun
     def __ge__(self, cbFun): return self.__cbFun >= cbFun
+
+class TimerHandle:
+    """Cancellable reference to a call scheduled at dispatcher"""
+    def __init__(self, deadline, cbFun, args):
+        self.__deadline = deadline
+        self.__cbFun = cbFun
+        self.__args = args
+        self.__active = 1
+
+    def __repr__(self):
+        return '%s(%s, %r)' % (
+            self.__class__.__name__, self.__deadline, self.__cbFun
+            )
+
+    def getDeadline(self): return self.__deadline
+
+    def isActive(self): return self.__active
+
+    def cancel(self):
+        # a single store so any thread may cancel, entry is left
+        # for dispatcher thread to drop
+        self.__active = 0
+
+    def __call__(self):
+        if self.__active:
+            self.__active = 0
+            self.__cbFun(*self.__args)
+
+class TimerQueue:
+    """Deadline-ordered heap of scheduled calls.
+
+       Cancelled entries are left in the heap and skipped once they
+       reach its top. As handles may be cancelled from any thread,
+       cancellations are not counted; the heap is swept of cancelled
+       entries whenever it doubles in size instead.
+    """
+    def __init__(self):
+        self.__heap = []
+        self.__seq = 0
+        self.__sweepSize = 64
+
+    def add(self, deadline, cbFun, args):
+        timerHandle = TimerHandle(deadline, cbFun, args)
+        self.push(timerHandle)
+        return timerHandle
+
+    def push(self, timerHandle):
+        heap = self.__heap
+        if len(heap) >= self.__sweepSize:
+            # in-place as expire() may be iterating the heap
+            heap[:] = [ x for x in heap if x[2].isActive() ]
+            heapq.heapify(heap)
+            self.__sweepSize = max(64, len(heap) * 2)
+        self.__seq += 1
+        # sequence number keeps same-deadline calls in FIFO order
+        heapq.heappush(
+            heap, (timerHandle.getDeadline(), self.__seq, timerHandle)
+            )
+
+    def getNextDeadline(self):
+        heap = self.__heap
+        while heap and not heap[0][2].isActive():
+            heapq.heappop(heap)
+        if heap:
+            return heap[0][0]
+
+    def expire(self, timeNow):
+        heap = self.__heap
+        # calls scheduled by expiring ones are postponed till next run
+        lastSeq = self.__seq
+        while heap and heap[0][0] <= timeNow and heap[0][1] <= lastSeq:
+            heapq.heappop(heap)[2]()
     
 class AbstractTransportDispatcher:
     def __init__(self):
         self.__transports = {}
+        self.__transportDomains = {}  # id(transport) -> tDomain
         self.__jobs = {}
         self.__recvCbFun = None
+        self.__backPressureCbFun = None
         self.__timerCallables = []
         self.__ticks = 0
         self.__timerResolution = 0.5
-        self.__nextTime = 0
+        self.__timerQueue = TimerQueue()
+        self.__pacer = None
+        self.__ioThreadId = None   # set while marshalling thread calls
+        self.__runThreadId = None  # thread running the dispatcher
+        self.__threadCalls = deque()
+        self.__tickHandle = None  # armed while timer callbacks exist
         
     def _cbFun(self, incomingTransport, transportAddress, incomingMessage):
-        for name, transport in self.__transports.items():
-            if transport is incomingTransport:
-                transportDomain = name
-                break
-        else:
+        try:
+            transportDomain = self.__transportDomains[id(incomingTransport)]
+        except KeyError:
             raise error.CarrierError(
                 'Unregistered transport %s' % (incomingTransport,)
                 )
-       
+
         if self.__recvCbFun:
             self.__recvCbFun(
                 self, transportDomain, transportAddress, incomingMessage
@@ -60,16 +145,43 @@ class AbstractTransportDispatcher:
     def unregisterRecvCbFun(self):
         self.__recvCbFun = None
 
+    def _backPressureCbFun(self, transport, congested):
+        if self.__backPressureCbFun is None:
+            return
+        if id(transport) in self.__transportDomains:
+            self.__backPressureCbFun(
+                self, self.__transportDomains[id(transport)], congested
+                )
+
+    def registerBackPressureCbFun(self, backPressureCbFun):
+        """Get notified of transports out-queues crossing their watermarks
+           by backPressureCbFun(dispatcher, transportDomain, congested)"""
+        if self.__backPressureCbFun:
+            raise error.CarrierError(
+                'Back-pressure callback already registered'
+                )
+        self.__backPressureCbFun = backPressureCbFun
+
+    def unregisterBackPressureCbFun(self):
+        self.__backPressureCbFun = None
+
     def registerTimerCbFun(self, timerCbFun, tickInterval=None):
         if not tickInterval:
             tickInterval = self.__timerResolution
         self.__timerCallables.append(TimerCallable(timerCbFun, tickInterval))
+        if self.__tickHandle is None:
+            self.__tickHandle = self.callLater(
+                self.__timerResolution, self.__handleTick
+                )
 
     def unregisterTimerCbFun(self, timerCbFun=None):
         if timerCbFun:
             self.__timerCallables.remove(timerCbFun)
         else:
             self.__timerCallables = []
+        if not self.__timerCallables and self.__tickHandle is not None:
+            self.__tickHandle.cancel()
+            self.__tickHandle = None
 
     def registerTransport(self, tDomain, transport):
         if tDomain in self.__transports:
@@ -78,14 +190,18 @@ class AbstractTransportDispatcher:
                 )
         transport.registerCbFun(self._cbFun)
         self.__transports[tDomain] = transport
+        self.__transportDomains.setdefault(id(transport), tDomain)
 
     def unregisterTransport(self, tDomain):
         if tDomain not in self.__transports:
             raise error.CarrierError(
                 'Transport %s not registered' % (tDomain,)
                 )
-        self.__transports[tDomain].unregisterCbFun()
+        transport = self.__transports[tDomain]
+        transport.unregisterCbFun()
         del self.__transports[tDomain]
+        if self.__transportDomains.get(id(transport)) == tDomain:
+            del self.__transportDomains[id(transport)]
 
     def getTransport(self, transportDomain):
         if transportDomain in self.__transports:
@@ -94,47 +210,195 @@ class AbstractTransportDispatcher:
             'Transport %s not registered' % (transportDomain,)
             )
         
+    def getTransportStatistics(self):
+        """Statistics summed up over registered transports"""
+        statistics = {}
+        for transport in self.__transports.values():
+            if not hasattr(transport, 'getStatistics'):
+                continue
+            for k, v in transport.getStatistics().items():
+                statistics[k] = statistics.get(k, 0) + v
+        return statistics
+
     def sendMessage(
         self, outgoingMessage, transportDomain, transportAddress
         ):
-        if transportDomain in self.__transports:
+        if self._isForeignThread():
+            self.callFromThread(
+                self.sendMessage,
+                outgoingMessage, transportDomain, transportAddress
+                )
+            return
+        if transportDomain not in self.__transports:
+            raise error.CarrierError(
+                'No suitable transport domain for %s' % (transportDomain,)
+                )
+        if self.__pacer is None:
             self.__transports[transportDomain].sendMessage(
                 outgoingMessage, transportAddress
                 )
         else:
-            raise error.CarrierError(
-                'No suitable transport domain for %s' % (transportDomain,)
+            self.__pacer.sendMessage(
+                outgoingMessage, transportDomain, transportAddress
+                )
+
+    def __sendPacedMessage(
+        self, outgoingMessage, transportDomain, transportAddress
+        ):
+        if transportDomain in self.__transports:
+            self.__transports[transportDomain].sendMessage(
+                outgoingMessage, transportAddress
                 )
 
+    # Outgoing messages pacing
+
+    def setPacing(self, destinationRate=0, destinationBurst=1,
+                  globalRate=0, globalBurst=1):
+        """Limit outgoing messages rate to destinationRate messages per
+           second per destination and to globalRate messages per second
+           overall, allowing bursts of up to destinationBurst/globalBurst
+           messages. Messages over the limits are queued, not dropped.
+           Zero rates turn pacing off, queued messages are then sent."""
+        if self.__pacer is not None:
+            self.__pacer.flush()
+            self.__pacer = None
+        if destinationRate or globalRate:
+            self.__pacer = MessagePacer(
+                self, self.__sendPacedMessage,
+                destinationRate, destinationBurst, globalRate, globalBurst
+                )
+
+    def getPacingStatistics(self):
+        """Per (transportDomain, transportAddress) pacing queue stats"""
+        if self.__pacer is None:
+            return {}
+        return self.__pacer.getStatistics()
+
     def getTimerResolution(self):
         return self.__timerResolution
     def setTimerResolution(self, timerResolution):
         if timerResolution < 0.01 or timerResolution > 10:
             raise error.CarrierError('Impossible timer resolution')
         self.__timerResolution = timerResolution
+        if self.__tickHandle is not None:
+            self.__tickHandle.cancel()
+            self.__tickHandle = self.callLater(
+                timerResolution, self.__handleTick
+                )
     
     def getTimerTicks(self): return self.__ticks
-    
-    def handleTimerTick(self, timeNow):
-        if self.__nextTime == 0:   # initial initialization
-            self.__nextTime = timeNow + self.__timerResolution
 
-        if self.__nextTime > timeNow:
-            return
-        
-        self.__ticks += 1
-        self.__nextTime = timeNow + self.__timerResolution
+    # Deadline-based scheduler API
+
+    def callAt(self, deadline, cbFun, *args):
+        """Schedule cbFun(*args) to be called at or shortly after deadline
+           (wall-clock time). Returns TimerHandle that can be cancelled."""
+        timerHandle = TimerHandle(deadline, cbFun, args)
+        if self._isForeignThread():
+            self.callFromThread(self.__pushTimer, timerHandle)
+        else:
+            self.__pushTimer(timerHandle)
+        return timerHandle
+
+    def __pushTimer(self, timerHandle):
+        nextDeadline = self.__timerQueue.getNextDeadline()
+        self.__timerQueue.push(timerHandle)
+        deadline = timerHandle.getDeadline()
+        if nextDeadline is None or deadline < nextDeadline:
+            self._nextDeadlineChanged(deadline)
+
+    def callLater(self, delay, cbFun, *args):
+        return self.callAt(time() + delay, cbFun, *args)
 
+    def getNextDeadline(self):
+        return self.__timerQueue.getNextDeadline()
+
+    def getTimerTimeout(self, timeNow, maxTimeout=None):
+        """Time to sleep until the nearest scheduled call is due"""
+        nextDeadline = self.__timerQueue.getNextDeadline()
+        if nextDeadline is None:
+            return maxTimeout
+        timeout = max(nextDeadline - timeNow, 0)
+        if maxTimeout is not None and timeout > maxTimeout:
+            return maxTimeout
+        return timeout
+
+    def _nextDeadlineChanged(self, deadline):
+        # Event loop based dispatchers re-arm their wakeup here
+        pass
+
+    def __handleTick(self):
+        # legacy tick runs only while someone is listening to it
+        self.__tickHandle = self.callLater(
+            self.__timerResolution, self.__handleTick
+            )
+        self.__ticks += 1
+        timeNow = time()
+        # legacy periodic callbacks driven by resolution-sized ticks
         for timerCallable in self.__timerCallables:
             timerCallable(timeNow)
 
+    def handleTimerTick(self, timeNow):
+        if self.__threadCalls:
+            self._runThreadCalls()
+        self.__timerQueue.expire(timeNow)
+
+    # Calls from other threads
+
+    def prepareThreadedCalls(self):
+        """Get ready to accept callFromThread() calls. From now on
+           messages sent, calls scheduled and jobs started or finished by
+           threads other than the one running the dispatcher are
+           marshalled to it.
+
+           Dispatcher thread is the one running runDispatcher() or, for
+           event loops run by application, the one calls are first run
+           at. Until known, calling thread is taken for it."""
+        if self.__runThreadId is None:
+            self.__ioThreadId = get_ident()
+        else:
+            self.__ioThreadId = self.__runThreadId
+        self.callFromThread(self._setDispatcherThread)
+
+    def _setDispatcherThread(self):
+        # called from the thread running the dispatcher
+        self.__runThreadId = get_ident()
+        if self.__ioThreadId is not None:
+            self.__ioThreadId = self.__runThreadId
+
+    def callFromThread(self, cbFun, *args):
+        """Schedule cbFun(*args) to be called from dispatcher thread.
+           Safe to use from any thread."""
+        self.__threadCalls.append((cbFun, args))
+        self._wakeupDispatcher()
+
+    def _runThreadCalls(self):
+        threadCalls = self.__threadCalls
+        while threadCalls:
+            cbFun, args = threadCalls.popleft()
+            cbFun(*args)
+
+    def _wakeupDispatcher(self):
+        # Dispatchers blocking on I/O should return from it shortly
+        pass
+
+    def _isForeignThread(self):
+        return self.__ioThreadId is not None and \
+               self.__ioThreadId != get_ident()
+
     def jobStarted(self, jobId):
+        if self._isForeignThread():
+            self.callFromThread(self.jobStarted, jobId)
+            return
         if jobId in self.__jobs:
             self.__jobs[jobId] = self.__jobs[jobId] + 1
         else:
             self.__jobs[jobId] = 1
 
     def jobFinished(self, jobId):
+        if self._isForeignThread():
+            self.callFromThread(self.jobFinished, jobId)
+            return
         self.__jobs[jobId] = self.__jobs[jobId] - 1
         if self.__jobs[jobId] == 0:
             del self.__jobs[jobId]
@@ -152,5 +416,9 @@ class AbstractTransportDispatcher:
         for tDomain in list(self.__transports):
             self.__transports[tDomain].closeTransport()
             self.unregisterTransport(tDomain)
+        if self.__pacer is not None:
+            self.__pacer.close()  # queued messages are lost
+            self.__pacer = None
         self.unregisterRecvCbFun()
+        self.unregisterBackPressureCbFun()
         self.unregisterTimerCbFun()
@@ -0,0 +1,48 @@
+# SNMP message framing over stream transports (RFC 3430). Messages
+# are sent back-to-back, each one delimited by its own BER header.
+from pyasn1.compat.octets import oct2int
+from pysnmp.carrier import error
+
+def splitMessages(buffer, maxMessageSize=0):
+    """Split stream buffer into whole BER-encoded SNMP messages.
+
+       Returns a tuple of messages list and remaining bytes belonging
+       to a message not yet received in full. CarrierError is raised
+       on malformed or oversized message header.
+    """
+    messages = []
+    offset = 0
+    bufferSize = len(buffer)
+    while bufferSize - offset >= 2:
+        if oct2int(buffer[offset]) != 0x30:
+            raise error.CarrierError(
+                'Not a SEQUENCE tag at stream offset %d' % offset
+                )
+        length = oct2int(buffer[offset+1])
+        headerSize = 2
+        if length & 0x80:
+            lengthSize = length & 0x7f
+            if not lengthSize:
+                raise error.CarrierError(
+                    'Indefinite length encoding not allowed on stream'
+                    )
+            if lengthSize > 4:
+                raise error.CarrierError(
+                    'Length field too long (%d octets)' % lengthSize
+                    )
+            if bufferSize - offset < 2 + lengthSize:
+                break
+            length = 0
+            for x in range(lengthSize):
+                length = length << 8 | oct2int(buffer[offset+2+x])
+            headerSize += lengthSize
+        messageSize = headerSize + length
+        if maxMessageSize and messageSize > maxMessageSize:
+            raise error.CarrierError(
+                'Message size %d exceeds limit %d' % (messageSize, maxMessageSize)
+                )
+        if bufferSize - offset < messageSize:
+            break
+        messages.append(buffer[offset:offset+messageSize])
+        offset += messageSize
+    return messages, buffer[offset:]
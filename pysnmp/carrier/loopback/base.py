@@ -0,0 +1,127 @@
+# In-process transport passing messages through memory queues
+from collections import deque
+from threading import Event
+from pysnmp.carrier import error
+from pysnmp import debug
+
+class LoopbackNetwork:
+    """Memory-backed network connecting loopback transports.
+
+       Transports bound to the network exchange messages through a
+       FIFO queue which is run by LoopbackDispatcher.runDispatcher()
+       on behalf of all the dispatchers attached to the same network.
+    """
+    firstEphemeralPort = 49152
+    def __init__(self):
+        self.__endpoints = {}   # transportAddress -> transport
+        self.__dispatchers = []
+        self.__queue = deque()
+        self.__nextPort = self.firstEphemeralPort
+        self.__delivered = 0
+        self.__dropped = 0
+        self.__wakeupEvent = Event()
+
+    def bind(self, transport, transportAddress):
+        if transportAddress in self.__endpoints:
+            raise error.CarrierError(
+                'Address %s already in use' % (transportAddress,)
+                )
+        self.__endpoints[transportAddress] = transport
+
+    def unbind(self, transportAddress):
+        if transportAddress in self.__endpoints:
+            del self.__endpoints[transportAddress]
+
+    def getEphemeralAddress(self, host):
+        while (host, self.__nextPort) in self.__endpoints:
+            self.__nextPort += 1
+        return host, self.__nextPort
+
+    def registerDispatcher(self, dispatcher):
+        if dispatcher not in self.__dispatchers:
+            self.__dispatchers.append(dispatcher)
+
+    def unregisterDispatcher(self, dispatcher):
+        if dispatcher in self.__dispatchers:
+            self.__dispatchers.remove(dispatcher)
+
+    def getDispatchers(self): return tuple(self.__dispatchers)
+
+    def sendMessage(self, outgoingMessage, srcAddress, dstAddress):
+        transport = self.__endpoints.get(dstAddress)
+        if transport is None:
+            self.__dropped += 1
+            debug.logger & debug.flagIO and debug.logger('sendMessage: no endpoint at %r, loosing outgoing msg' % (dstAddress,))
+            return
+        self.__queue.append((transport, srcAddress, outgoingMessage))
+
+    def hasPendingMessages(self): return self.__queue and 1 or 0
+
+    def deliverMessages(self):
+        """Deliver messages queued so far, replies go next round"""
+        queue = self.__queue
+        for x in range(len(queue)):
+            transport, srcAddress, incomingMessage = queue.popleft()
+            if transport._cbFun is None:
+                self.__dropped += 1
+                continue
+            debug.logger & debug.flagIO and debug.logger('deliverMessages: transportAddress %r -> %r incomingMessage %s' % (srcAddress, transport.getLocalAddress(), debug.hexdump(incomingMessage)))
+            self.__delivered += 1
+            transport._cbFun(transport, srcAddress, incomingMessage)
+
+    def wakeup(self): self.__wakeupEvent.set()
+
+    def sleep(self, timeout):
+        """Wait for timeout seconds or until woken up by other thread"""
+        self.__wakeupEvent.wait(timeout)
+        self.__wakeupEvent.clear()
+
+    def getStatistics(self):
+        return {
+            'queueDepth': len(self.__queue),
+            'deliveredMessages': self.__delivered,
+            'droppedMessages': self.__dropped
+            }
+
+class AbstractLoopbackTransport:
+    """Base loopback transport, to be used with LoopbackDispatcher"""
+    defaultHost = None
+    def __init__(self, network):
+        self.__network = network
+        self.__localAddress = None
+        self._cbFun = None
+
+    def getLocalAddress(self): return self.__localAddress
+
+    # Public API
+
+    def openClientMode(self, iface=None):
+        if iface is None:
+            iface = self.__network.getEphemeralAddress(self.defaultHost)
+        return self.openServerMode(iface)
+
+    def openServerMode(self, iface):
+        if self.__localAddress is not None:
+            raise error.CarrierError('Transport already bound')
+        self.__network.bind(self, iface)
+        self.__localAddress = iface
+        return self
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        if self.__localAddress is None:
+            raise error.CarrierError('Transport not bound')
+        self.__network.sendMessage(
+            outgoingMessage, self.__localAddress, transportAddress
+            )
+
+    def registerCbFun(self, cbFun):
+        self._cbFun = cbFun
+
+    def unregisterCbFun(self):
+        self._cbFun = None
+
+    def closeTransport(self):
+        self.unregisterCbFun()
+        if self.__localAddress is not None:
+            self.__network.unbind(self.__localAddress)
+            self.__localAddress = None
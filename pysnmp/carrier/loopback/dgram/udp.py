@@ -0,0 +1,10 @@
+# Implements in-process loopback transport emulating UDP/IPv4. Sharing
+# UDP domain and address syntax, it's configured at LCD just as UDP is.
+from pysnmp.carrier.loopback.base import AbstractLoopbackTransport
+
+domainName = snmpUDPDomain = (1, 3, 6, 1, 6, 1, 1)
+
+class UdpLoopbackTransport(AbstractLoopbackTransport):
+    defaultHost = '127.0.0.1'
+
+UdpTransport = UdpLoopbackTransport
@@ -0,0 +1,47 @@
+# Transport dispatcher running loopback transports in one process
+from time import time
+from pysnmp.carrier.base import AbstractTransportDispatcher
+from pysnmp.carrier.loopback.base import LoopbackNetwork
+
+class LoopbackDispatcher(AbstractTransportDispatcher):
+    """TransportDispatcher for in-process loopback transports.
+
+       Dispatchers sharing the same LoopbackNetwork are run together so
+       that e.g. Manager and Agent SNMP engines, each having dispatcher
+       of its own, could talk to each other within single process with
+       no sockets and kernel involved.
+    """
+    def __init__(self, network=None):
+        if network is None:
+            network = LoopbackNetwork()
+        self.__network = network
+        self.timeout = 0.5
+        AbstractTransportDispatcher.__init__(self)
+        network.registerDispatcher(self)
+
+    def getNetwork(self): return self.__network
+
+    def transportsAreWorking(self):
+        return self.__network.hasPendingMessages()
+
+    def runDispatcher(self, timeout=0.0):
+        network = self.__network
+        for dispatcher in network.getDispatchers():
+            dispatcher._setDispatcherThread()
+        while network.hasPendingMessages() or \
+                  [ x for x in network.getDispatchers() if x.jobsArePending() ]:
+            network.deliverMessages()
+            timeNow = time()
+            nextTimeout = timeout and timeout or self.timeout
+            for dispatcher in network.getDispatchers():
+                dispatcher.handleTimerTick(timeNow)
+                nextTimeout = dispatcher.getTimerTimeout(timeNow, nextTimeout)
+            if not network.hasPendingMessages() and nextTimeout > 0:
+                network.sleep(nextTimeout)
+
+    def _wakeupDispatcher(self):
+        self.__network.wakeup()
+
+    def closeDispatcher(self):
+        AbstractTransportDispatcher.closeDispatcher(self)
+        self.__network.unregisterDispatcher(self)
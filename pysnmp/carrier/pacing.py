@@ -0,0 +1,243 @@
+# Outgoing messages pacing for transport dispatcher
+from collections import deque
+from time import time
+from pysnmp.carrier import error
+from pysnmp import debug
+
+class TokenBucket:
+    def __init__(self, rate, burst, timeNow):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.timeStamp = timeNow
+
+    def refill(self, timeNow):
+        if self.tokens < self.burst:
+            self.tokens = min(
+                self.burst,
+                self.tokens + (timeNow - self.timeStamp) * self.rate
+                )
+        self.timeStamp = timeNow
+
+    def consume(self):
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 1
+        return 0
+
+    # time till next token is available
+    def getDelay(self):
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class Destination:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.queue = deque()
+        self.sentMessages = 0
+        self.delayedMessages = 0
+        self.maxQueueDepth = 0
+
+class MessagePacer:
+    """Token bucket shaping of messages sent through transport dispatcher.
+
+       Each (transportDomain, transportAddress) destination gets a bucket
+       of its own refilled at destinationRate messages per second and up
+       to destinationBurst messages deep. Optional global bucket caps the
+       total rate. Messages over the limits are queued per destination
+       and sent in round-robin order as tokens become available. While
+       anything is queued, pacer holds a dispatcher job so that dispatcher
+       would not exit prematurely.
+    """
+    maxIdleDestinations = 10000
+    def __init__(self, transportDispatcher, sendFun,
+                 destinationRate=0, destinationBurst=1,
+                 globalRate=0, globalBurst=1):
+        if destinationRate < 0 or globalRate < 0 or \
+               destinationBurst < 1 or globalBurst < 1:
+            raise error.CarrierError(
+                'Bad pacing parameters %s/%s %s/%s' % (destinationRate, destinationBurst, globalRate, globalBurst)
+                )
+        self.__transportDispatcher = transportDispatcher
+        self.__sendFun = sendFun
+        self.__destinationRate = destinationRate
+        self.__destinationBurst = destinationBurst
+        timeNow = time()
+        if globalRate:
+            self.__globalBucket = TokenBucket(globalRate, globalBurst, timeNow)
+        else:
+            self.__globalBucket = None
+        self.__destinations = {}  # (tDomain, tAddress) -> Destination
+        self.__pending = deque()  # destinations having messages queued
+        self.__queueDepth = 0
+        self.__timerHandle = None
+
+    def __getDestination(self, key, timeNow):
+        destination = self.__destinations.get(key)
+        if destination is None:
+            if len(self.__destinations) >= self.maxIdleDestinations:
+                self.__pruneDestinations(timeNow)
+            if self.__destinationRate:
+                bucket = TokenBucket(
+                    self.__destinationRate, self.__destinationBurst, timeNow
+                    )
+            else:
+                bucket = None
+            destination = self.__destinations[key] = Destination(bucket)
+        return destination
+
+    def __pruneDestinations(self, timeNow):
+        # forget destinations whose buckets would be full by now
+        for key, destination in list(self.__destinations.items()):
+            if destination.queue:
+                continue
+            bucket = destination.bucket
+            if bucket is not None:
+                bucket.refill(timeNow)
+                if bucket.tokens < bucket.burst:
+                    continue
+            del self.__destinations[key]
+
+    def __consume(self, destination):
+        if destination.bucket is not None and \
+               destination.bucket.tokens < 1:
+            return 0
+        if self.__globalBucket is not None and \
+               not self.__globalBucket.consume():
+            return 0
+        if destination.bucket is not None:
+            destination.bucket.consume()
+        return 1
+
+    def sendMessage(self, outgoingMessage, transportDomain, transportAddress):
+        timeNow = time()
+        key = transportDomain, transportAddress
+        destination = self.__getDestination(key, timeNow)
+        if not destination.queue:
+            if destination.bucket is not None:
+                destination.bucket.refill(timeNow)
+            if self.__globalBucket is not None:
+                self.__globalBucket.refill(timeNow)
+            if self.__consume(destination):
+                destination.sentMessages += 1
+                self.__sendFun(
+                    outgoingMessage, transportDomain, transportAddress
+                    )
+                return
+            self.__pending.append(key)
+        destination.queue.append(outgoingMessage)
+        destination.delayedMessages += 1
+        if len(destination.queue) > destination.maxQueueDepth:
+            destination.maxQueueDepth = len(destination.queue)
+        if not self.__queueDepth:
+            self.__transportDispatcher.jobStarted(id(self))
+        self.__queueDepth += 1
+        debug.logger & debug.flagIO and debug.logger('sendMessage: pacing msg to %r, %d msg(s) queued for destination' % (key, len(destination.queue)))
+        self.__armTimer(timeNow)
+
+    def __armTimer(self, timeNow):
+        if not self.__pending:
+            return
+        if self.__globalBucket is not None:
+            delay = self.__globalBucket.getDelay()
+        else:
+            delay = 0
+        if self.__destinationRate:
+            destinationDelay = min(
+                [ self.__destinations[x].bucket.getDelay() for x in self.__pending ]
+                )
+            if destinationDelay > delay:
+                delay = destinationDelay
+        deadline = timeNow + delay
+        if self.__timerHandle is not None:
+            if self.__timerHandle.isActive() and \
+                   self.__timerHandle.getDeadline() <= deadline:
+                return
+            self.__timerHandle.cancel()
+        self.__timerHandle = self.__transportDispatcher.callAt(
+            deadline, self.__drain
+            )
+
+    def __drain(self):
+        self.__timerHandle = None
+        timeNow = time()
+        if self.__globalBucket is not None:
+            self.__globalBucket.refill(timeNow)
+        pending = self.__pending
+        # round-robin over backlogged destinations, one message each
+        idleRun = 0
+        try:
+            while pending and idleRun < len(pending):
+                key = pending.popleft()
+                destination = self.__destinations[key]
+                if destination.bucket is not None:
+                    destination.bucket.refill(timeNow)
+                if not self.__consume(destination):
+                    pending.append(key)
+                    if self.__globalBucket is not None and \
+                           self.__globalBucket.tokens < 1:
+                        break
+                    idleRun += 1
+                    continue
+                idleRun = 0
+                outgoingMessage = destination.queue.popleft()
+                destination.sentMessages += 1
+                self.__queueDepth -= 1
+                if destination.queue:
+                    pending.append(key)
+                self.__sendFun(outgoingMessage, key[0], key[1])
+        finally:
+            # failed send leaves the rest queued
+            if self.__queueDepth:
+                self.__armTimer(timeNow)
+            else:
+                self.__transportDispatcher.jobFinished(id(self))
+
+    def flush(self):
+        """Send all queued messages right away"""
+        if self.__timerHandle is not None:
+            self.__timerHandle.cancel()
+            self.__timerHandle = None
+        if not self.__queueDepth:
+            return
+        try:
+            while self.__pending:
+                key = self.__pending[0]
+                destination = self.__destinations[key]
+                while destination.queue:
+                    outgoingMessage = destination.queue.popleft()
+                    destination.sentMessages += 1
+                    self.__queueDepth -= 1
+                    self.__sendFun(outgoingMessage, key[0], key[1])
+                self.__pending.popleft()
+        finally:
+            if self.__queueDepth:
+                self.__armTimer(time())
+            else:
+                self.__transportDispatcher.jobFinished(id(self))
+
+    def close(self):
+        """Drop queued messages and release dispatcher job"""
+        if self.__timerHandle is not None:
+            self.__timerHandle.cancel()
+            self.__timerHandle = None
+        for destination in self.__destinations.values():
+            destination.queue.clear()
+        self.__pending.clear()
+        if self.__queueDepth:
+            self.__queueDepth = 0
+            self.__transportDispatcher.jobFinished(id(self))
+
+    def getQueueDepth(self): return self.__queueDepth
+
+    def getStatistics(self):
+        statistics = {}
+        for key, destination in self.__destinations.items():
+            statistics[key] = {
+                'queueDepth': len(destination.queue),
+                'maxQueueDepth': destination.maxQueueDepth,
+                'sentMessages': destination.sentMessages,
+                'delayedMessages': destination.delayedMessages
+                }
+        return statistics
@@ -0,0 +1,235 @@
+# Record incoming transport messages into a file and replay them later
+import struct, sys
+from time import time
+from pysnmp.carrier import error
+from pysnmp import debug
+from pyasn1.compat.octets import str2octs, octs2str
+
+# File layout: magic, then records of fixed header followed by domain
+# sub-identifiers, transport address and message octets.
+#
+# Record header: timestamp (double), number of domain sub-ids (byte),
+# address length (short), message length (int). Transport address is a
+# type octet ('T' for tuple, 'S' for string) followed by NUL-separated
+# address items.
+
+fileMagic = str2octs('PSNMPREC\x01')
+recordHeader = struct.Struct('!dBHI')
+
+def encodeAddress(transportAddress):
+    if isinstance(transportAddress, tuple):
+        return str2octs(
+            'T' + '\x00'.join([ str(x) for x in transportAddress ])
+            )
+    else:
+        return str2octs('S' + str(transportAddress))
+
+def decodeAddress(octets):
+    text = octs2str(octets)
+    if text[:1] == 'T':
+        transportAddress = []
+        for x in text[1:].split('\x00'):
+            if x.isdigit():
+                x = int(x)
+            transportAddress.append(x)
+        return tuple(transportAddress)
+    elif text[:1] == 'S':
+        return text[1:]
+    raise error.CarrierError('Bad transport address %r' % (octets,))
+
+class MessageRecorder:
+    """Writes (timestamp, transportDomain, transportAddress, message)
+       records into a file, see DgramSocketTransport.setRecorder()"""
+    def __init__(self, fileName):
+        try:
+            self.__file = open(fileName, 'wb')
+            self.__file.write(fileMagic)
+        except IOError:
+            raise error.CarrierError('Can\'t create %s: %s' % (fileName, sys.exc_info()[1]))
+        self.__recordedMessages = 0
+
+    def record(self, transportDomain, transportAddress, message,
+               timestamp=None):
+        if self.__file is None:
+            return
+        if timestamp is None:
+            timestamp = time()
+        address = encodeAddress(transportAddress)
+        self.__file.write(
+            recordHeader.pack(
+                timestamp, len(transportDomain), len(address), len(message)
+                )
+            )
+        self.__file.write(
+            struct.pack('!%dI' % len(transportDomain), *transportDomain)
+            )
+        self.__file.write(address)
+        self.__file.write(message)
+        self.__recordedMessages += 1
+
+    def getRecordedMessages(self): return self.__recordedMessages
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+class MessageReader:
+    """Iterates over (timestamp, transportDomain, transportAddress, message)
+       records of a file written by MessageRecorder"""
+    def __init__(self, fileName):
+        try:
+            self.__file = open(fileName, 'rb')
+        except IOError:
+            raise error.CarrierError('Can\'t open %s: %s' % (fileName, sys.exc_info()[1]))
+        if self.__file.read(len(fileMagic)) != fileMagic:
+            self.__file.close()
+            raise error.CarrierError('Not a message record file: %s' % fileName)
+        self.__fileName = fileName
+
+    def __iter__(self): return self
+
+    def __next__(self):
+        header = self.__file.read(recordHeader.size)
+        if not header:
+            raise StopIteration()
+        try:
+            timestamp, domainLen, addressLen, messageLen = recordHeader.unpack(header)
+            transportDomain = struct.unpack(
+                '!%dI' % domainLen, self.__file.read(4 * domainLen)
+                )
+        except struct.error:
+            raise error.CarrierError('Truncated record at %s' % self.__fileName)
+        transportAddress = decodeAddress(self.__file.read(addressLen))
+        message = self.__file.read(messageLen)
+        if len(message) != messageLen:
+            raise error.CarrierError('Truncated record at %s' % self.__fileName)
+        return timestamp, transportDomain, transportAddress, message
+
+    next = __next__  # Python 2
+
+    def close(self):
+        self.__file.close()
+
+class ReplayTransport:
+    """Receive-only transport messages are replayed through by
+       MessagePlayer. Outgoing messages are counted and discarded.
+       Works with LoopbackDispatcher and AsynsockDispatcher."""
+    def __init__(self):
+        self._cbFun = None
+        self.__sentMessages = 0
+
+    def openClientMode(self, iface=None): return self
+    def openServerMode(self, iface=None): return self
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        self.__sentMessages += 1
+        debug.logger & debug.flagIO and debug.logger('sendMessage: discarding replay response to %r' % (transportAddress,))
+
+    def registerCbFun(self, cbFun):
+        self._cbFun = cbFun
+
+    def unregisterCbFun(self):
+        self._cbFun = None
+
+    # AsynsockDispatcher API
+
+    def registerSocket(self, sockMap=None): pass
+    def unregisterSocket(self, sockMap=None): pass
+    def registerBackPressureCbFun(self, cbFun): pass
+    def unregisterBackPressureCbFun(self): pass
+
+    def getStatistics(self):
+        return { 'sentMessages': self.__sentMessages }
+
+    def closeTransport(self):
+        self.unregisterCbFun()
+
+class MessagePlayer:
+    """Feeds recorded messages into transport dispatcher.
+
+       Each record is passed to dispatcher as if received by the
+       ReplayTransport registered under record's transport domain.
+       Records are replayed at their original pace sped up by speed
+       times or, with speed of zero, as fast as possible in batches of
+       batchSize messages. Time spent in dispatcher callback is
+       collected per message. While replaying, player holds dispatcher
+       job.
+    """
+    batchSize = 100
+    def __init__(self, transportDispatcher, fileName, speed=1.0):
+        if speed < 0:
+            raise error.CarrierError('Bad replay speed %s' % speed)
+        self.__transportDispatcher = transportDispatcher
+        self.__reader = MessageReader(fileName)
+        self.__speed = speed
+        self.__record = None
+        self.__firstTimestamp = self.__startedAt = None
+        self.__replayedMessages = 0
+        self.__skippedMessages = 0
+        self.__latencies = []
+        self.__timeSpent = 0
+
+    def startReplay(self):
+        self.__transportDispatcher.jobStarted(id(self))
+        self.__startedAt = time()
+        self.__transportDispatcher.callLater(0, self.__replay)
+
+    def __nextRecord(self):
+        if self.__record is None:
+            try:
+                self.__record = next(self.__reader)
+            except StopIteration:
+                return
+            if self.__firstTimestamp is None:
+                self.__firstTimestamp = self.__record[0]
+        return self.__record
+
+    def __replay(self):
+        for x in range(self.batchSize):
+            record = self.__nextRecord()
+            if record is None:
+                self.__stopReplay()
+                return
+            if self.__speed:
+                deadline = self.__startedAt + \
+                    (record[0] - self.__firstTimestamp) / self.__speed
+                if deadline > time():
+                    self.__transportDispatcher.callAt(deadline, self.__replay)
+                    return
+            self.__record = None
+            self.__deliver(record)
+        self.__transportDispatcher.callLater(0, self.__replay)
+
+    def __deliver(self, record):
+        timestamp, transportDomain, transportAddress, message = record
+        try:
+            transport = self.__transportDispatcher.getTransport(
+                transportDomain
+                )
+        except error.CarrierError:
+            transport = None
+        if transport is None or transport._cbFun is None:
+            self.__skippedMessages += 1
+            debug.logger & debug.flagIO and debug.logger('__deliver: no transport for domain %s, skipping message' % (transportDomain,))
+            return
+        startedAt = time()
+        transport._cbFun(transport, transportAddress, message)
+        self.__latencies.append(time() - startedAt)
+        self.__replayedMessages += 1
+
+    def __stopReplay(self):
+        self.__timeSpent = time() - self.__startedAt
+        self.__reader.close()
+        self.__transportDispatcher.jobFinished(id(self))
+
+    def getLatencies(self):
+        """Seconds spent processing each replayed message"""
+        return self.__latencies
+
+    def getStatistics(self):
+        return {
+            'replayedMessages': self.__replayedMessages,
+            'skippedMessages': self.__skippedMessages,
+            'timeSpent': self.__timeSpent
+            }
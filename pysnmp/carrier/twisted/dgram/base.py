@@ -1,5 +1,6 @@
 # Implements twisted-based generic DGRAM transport
 import sys
+from collections import deque
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet import reactor
 from pysnmp.carrier.twisted.base import AbstractTwistedTransport
@@ -8,17 +9,56 @@ from pysnmp import debug
 
 class DgramTwistedTransport(DatagramProtocol, AbstractTwistedTransport):
     """Base Twisted datagram Transport, to be used with TwistedDispatcher"""
+    _ioBatchSize = 0
+    _recvQ = None
+    _drainCall = None
+
+    def setIoBatchSize(self, ioBatchSize):
+        """Pass up to ioBatchSize queued datagrams to dispatcher per
+           reactor iteration through a single timed call. By default
+           each datagram is scheduled with a timed call of its own."""
+        if ioBatchSize < 1:
+            raise error.CarrierError('Bad I/O batch size %s' % ioBatchSize)
+        self._ioBatchSize = ioBatchSize
+        if self._recvQ is None:
+            self._recvQ = deque()
+
+    def getIoBatchSize(self): return self._ioBatchSize
+
+    def __drainRecvQ(self):
+        self._drainCall = None
+        recvQ = self._recvQ
+        for x in range(self._ioBatchSize):
+            if not recvQ or self._cbFun is None:
+                break
+            transportAddress, datagram = recvQ.popleft()
+            self._cbFun(self, transportAddress, datagram)
+        if recvQ and self._cbFun is not None:
+            # leave the rest for the next reactor iteration
+            self._drainCall = reactor.callLater(0, self.__drainRecvQ)
 
     # Twisted Datagram API
     
     def datagramReceived(self, datagram, transportAddress):
         if self._cbFun is None:
             raise error.CarrierError('Unable to call cbFun')
+        elif self._ioBatchSize:
+            self._recvQ.append((transportAddress, datagram))
+            if self._drainCall is None:
+                self._drainCall = reactor.callLater(0, self.__drainRecvQ)
         else:
             # Callback fun is called through callLater() in attempt
             # to make Twisted timed calls work under high load.
             reactor.callLater(0, self._cbFun, self, transportAddress, datagram)
 
+    def closeTransport(self):
+        if self._drainCall is not None:
+            self._drainCall.cancel()
+            self._drainCall = None
+        if self._recvQ:
+            self._recvQ.clear()
+        AbstractTwistedTransport.closeTransport(self)
+
     def startProtocol(self):
         debug.logger & debug.flagIO and debug.logger('startProtocol: invoked')
         while self._writeQ:
@@ -9,7 +9,7 @@
 # Description: Transport dispatcher based on twisted.internet.reactor
 #
 import sys, time
-from twisted.internet import reactor, task
+from twisted.internet import reactor
 from pysnmp.carrier.base import AbstractTransportDispatcher
 from pysnmp.carrier import error
 
@@ -22,27 +22,48 @@ class TwistedDispatcher(AbstractTransportDispatcher):
             self.setTimerResolution(kwargs['timeout'])
         else:
             self.setTimerResolution(1.0)            
-        self.loopingcall = task.LoopingCall(self.handleTimeout)
+        self.__timerCall = None
 
     def handleTimeout(self):
+        self.__timerCall = None
         self.handleTimerTick(time.time())
+        self.__armTimer()
+
+    def __armTimer(self):
+        # wake up by the nearest deadline scheduled at dispatcher
+        if self.__transportCount == 0:
+            return
+        nextDeadline = self.getNextDeadline()
+        if nextDeadline is None:
+            return
+        delay = max(nextDeadline - time.time(), 0)
+        if self.__timerCall is None:
+            self.__timerCall = reactor.callLater(delay, self.handleTimeout)
+        elif self.__timerCall.getTime() > nextDeadline:
+            self.__timerCall.reset(delay)
+
+    def _nextDeadlineChanged(self, deadline):
+        self.__armTimer()
 
     def runDispatcher(self, timeout=0.0):
         if not reactor.running:
+            self._setDispatcherThread()
             try:
                 reactor.run()
             except Exception:
                 raise error.CarrierError(sys.exc_info()[1])
 
+    def callFromThread(self, cbFun, *args):
+        reactor.callFromThread(cbFun, *args)
+
     # jobstarted/jobfinished might be okay as-is
 
     def registerTransport(self, tDomain, transport):
-        if not self.loopingcall.running and self.getTimerResolution() > 0:
-            self.loopingcall.start(self.getTimerResolution(), now = False)
         AbstractTransportDispatcher.registerTransport(
             self, tDomain, transport
             )
         self.__transportCount = self.__transportCount + 1
+        self.__armTimer()
 
     def unregisterTransport(self, tDomain):
         t = AbstractTransportDispatcher.getTransport(self, tDomain)
@@ -52,5 +73,6 @@ class TwistedDispatcher(AbstractTransportDispatcher):
             self.__transportCount = self.__transportCount - 1
 
         # The last transport has been removed, stop the timeout
-        if self.__transportCount == 0 and self.loopingcall.running:
-            self.loopingcall.stop()
+        if self.__transportCount == 0 and self.__timerCall is not None:
+            self.__timerCall.cancel()
+            self.__timerCall = None
@@ -0,0 +1,174 @@
+# Implements twisted-based generic STREAM transport
+import sys
+from twisted.internet.protocol import Protocol, Factory, ClientFactory
+from pysnmp.carrier.twisted.base import AbstractTwistedTransport
+from pysnmp.carrier.framing import splitMessages
+from pysnmp.carrier import error
+from pysnmp import debug
+
+class StreamTwistedProtocol(Protocol):
+    """Single stream connection owned by StreamTwistedTransport"""
+    def __init__(self, snmpTransport, transportAddress):
+        self.__snmpTransport = snmpTransport
+        self.__transportAddress = transportAddress
+        self.__inBuffer = ''.encode()
+        self.__writeQ = []
+        self.__inFlight = 0
+
+    def getTransportAddress(self): return self.__transportAddress
+
+    # Messages sent and not yet answered, used for load balancing
+    def getLoad(self): return self.__inFlight
+
+    def sendMessage(self, outgoingMessage):
+        self.__inFlight += 1
+        if self.transport is None:
+            self.__writeQ.append(outgoingMessage)
+        else:
+            try:
+                self.transport.write(outgoingMessage)
+            except Exception:
+                raise error.CarrierError('Twisted exception: %s' % (sys.exc_info()[1],))
+
+    # Twisted Protocol API
+
+    def connectionMade(self):
+        debug.logger & debug.flagIO and debug.logger('connectionMade: %r, %d queued message(s)' % (self.__transportAddress, len(self.__writeQ)))
+        if self.__writeQ:
+            self.transport.write(''.encode().join(self.__writeQ))
+            self.__writeQ = []
+
+    def dataReceived(self, data):
+        self.__inBuffer += data
+        try:
+            messages, self.__inBuffer = splitMessages(
+                self.__inBuffer, self.__snmpTransport.maxMessageSize
+                )
+        except error.CarrierError:
+            debug.logger & debug.flagIO and debug.logger('dataReceived: bad stream from %r: %s' % (self.__transportAddress, sys.exc_info()[1]))
+            self.__snmpTransport._framingError(self)
+            self.transport.loseConnection()
+            return
+        for incomingMessage in messages:
+            debug.logger & debug.flagIO and debug.logger('dataReceived: transportAddress %r incomingMessage %s' % (self.__transportAddress, debug.hexdump(incomingMessage)))
+            if self.__inFlight:
+                self.__inFlight -= 1
+            self.__snmpTransport._cbFun(
+                self.__snmpTransport, self.__transportAddress, incomingMessage
+                )
+
+    def connectionLost(self, reason):
+        debug.logger & debug.flagIO and debug.logger('connectionLost: %r: %s' % (self.__transportAddress, reason))
+        self.__writeQ = []
+        self.__snmpTransport._connectionClosed(self)
+
+class StreamServerFactory(Factory):
+    def __init__(self, snmpTransport):
+        self.__snmpTransport = snmpTransport
+
+    def buildProtocol(self, addr):
+        protocol = StreamTwistedProtocol(
+            self.__snmpTransport, (addr.host, addr.port)
+            )
+        self.__snmpTransport._addConnection(protocol)
+        return protocol
+
+class StreamClientFactory(ClientFactory):
+    def __init__(self, snmpTransport, protocol):
+        self.__snmpTransport = snmpTransport
+        self.__protocol = protocol
+
+    def buildProtocol(self, addr):
+        return self.__protocol
+
+    def clientConnectionFailed(self, connector, reason):
+        debug.logger & debug.flagIO and debug.logger('clientConnectionFailed: %r: %s' % (self.__protocol.getTransportAddress(), reason))
+        self.__snmpTransport._connectionClosed(self.__protocol)
+
+class StreamTwistedTransport(AbstractTwistedTransport):
+    """Base Twisted stream Transport, to be used with TwistedDispatcher.
+
+       Works the same way as asyncore-based StreamSocketTransport does:
+       peer connections are pooled per destination, new connections
+       are added while all existing ones have requests in flight.
+    """
+    maxMessageSize = 0x10000 * 16
+    def __init__(self):
+        AbstractTwistedTransport.__init__(self)
+        self.__pool = {}  # transportAddress -> [ StreamTwistedProtocol ]
+        self.__poolSize = 1
+        self.__openedConnections = 0
+        self.__closedConnections = 0
+        self.__framingErrors = 0
+        self._iface = None
+        self._lport = None
+
+    def setPoolSize(self, poolSize):
+        """Keep up to poolSize connections to each destination"""
+        if poolSize < 1:
+            raise error.CarrierError('Bad connection pool size %s' % poolSize)
+        self.__poolSize = poolSize
+
+    def getPoolSize(self): return self.__poolSize
+
+    def getStatistics(self):
+        return {
+            'activeConnections': sum([ len(x) for x in self.__pool.values() ]),
+            'openedConnections': self.__openedConnections,
+            'closedConnections': self.__closedConnections,
+            'framingErrors': self.__framingErrors
+            }
+
+    def _addConnection(self, protocol):
+        transportAddress = protocol.getTransportAddress()
+        if transportAddress in self.__pool:
+            self.__pool[transportAddress].append(protocol)
+        else:
+            self.__pool[transportAddress] = [ protocol ]
+        self.__openedConnections += 1
+
+    def _connectionClosed(self, protocol):
+        transportAddress = protocol.getTransportAddress()
+        protocols = self.__pool.get(transportAddress, ())
+        if protocol in protocols:
+            protocols.remove(protocol)
+            if not protocols:
+                del self.__pool[transportAddress]
+            self.__closedConnections += 1
+
+    def _framingError(self, protocol):
+        self.__framingErrors += 1
+
+    def _connect(self, protocol):
+        raise error.CarrierError('Method not implemented')
+
+    def __getConnection(self, transportAddress):
+        protocols = self.__pool.get(transportAddress)
+        if protocols:
+            protocol = protocols[0]
+            for p in protocols[1:]:
+                if p.getLoad() < protocol.getLoad():
+                    protocol = p
+            if not protocol.getLoad() or len(protocols) >= self.__poolSize:
+                return protocol
+        protocol = StreamTwistedProtocol(self, transportAddress)
+        try:
+            self._connect(protocol)
+        except Exception:
+            raise error.CarrierError('Twisted exception: %s' % (sys.exc_info()[1],))
+        self._addConnection(protocol)
+        return protocol
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        debug.logger & debug.flagIO and debug.logger('sendMessage: transportAddress %r outgoingMessage %s' % (transportAddress, debug.hexdump(outgoingMessage)))
+        self.__getConnection(transportAddress).sendMessage(outgoingMessage)
+
+    def closeTransport(self):
+        for protocols in list(self.__pool.values()):
+            for protocol in protocols:
+                if protocol.transport is not None:
+                    protocol.transport.loseConnection()
+        if self._lport is not None:
+            self._lport.stopListening()
+            self._lport = None
+        AbstractTwistedTransport.closeTransport(self)
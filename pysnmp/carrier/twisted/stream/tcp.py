@@ -0,0 +1,34 @@
+# Implements twisted-based TCP transport (RFC 3430)
+import sys
+from twisted.internet import reactor
+from pysnmp.carrier.twisted.stream.base import StreamTwistedTransport, \
+     StreamServerFactory, StreamClientFactory
+from pysnmp.carrier import error
+
+# transportDomainTcpIpv4 of TRANSPORT-ADDRESS-MIB
+domainName = snmpTCPDomain = (1, 3, 6, 1, 2, 1, 100, 1, 5)
+
+class TcpTwistedTransport(StreamTwistedTransport):
+    # AbstractTwistedTransport API
+
+    def openClientMode(self, iface=None):
+        self._iface = iface
+        return self
+
+    def openServerMode(self, iface=None):
+        try:
+            self._lport = reactor.listenTCP(
+                iface[1], StreamServerFactory(self), interface=iface[0]
+                )
+        except Exception:
+            raise error.CarrierError(sys.exc_info()[1])
+        return self
+
+    def _connect(self, protocol):
+        host, port = protocol.getTransportAddress()
+        reactor.connectTCP(
+            host, port, StreamClientFactory(self, protocol),
+            bindAddress=self._iface
+            )
+
+TcpTransport = TcpTwistedTransport
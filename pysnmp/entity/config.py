@@ -3,6 +3,7 @@
 from pyasn1.compat.octets import null
 from pysnmp.carrier.asynsock import dispatch
 from pysnmp.carrier.asynsock.dgram import udp, udp6, unix
+from pysnmp.carrier.asynsock.stream import tcp
 from pysnmp.proto import rfc3412
 from pysnmp.entity import engine
 from pysnmp.proto.secmod.rfc3414.auth import hmacmd5, hmacsha, noauth
@@ -18,6 +19,7 @@ from pysnmp import error
 snmpUDPDomain = udp.snmpUDPDomain
 snmpUDP6Domain = udp6.snmpUDP6Domain
 snmpLocalDomain = unix.snmpLocalDomain
+snmpTCPDomain = tcp.snmpTCPDomain
 
 # Auth protocol
 usmHMACMD5AuthProtocol = hmacmd5.HmacMd5.serviceID
@@ -254,6 +256,9 @@ def addTargetAddr(
     elif transportDomain[:len(snmpUDP6Domain)] == snmpUDP6Domain:
         TransportAddressIPv6, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('TRANSPORT-ADDRESS-MIB', 'TransportAddressIPv6')
         transportAddress = TransportAddressIPv6(transportAddress)
+    elif transportDomain[:len(snmpTCPDomain)] == snmpTCPDomain:
+        TransportAddressIPv4, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('TRANSPORT-ADDRESS-MIB', 'TransportAddressIPv4')
+        transportAddress = TransportAddressIPv4(transportAddress)
 
     snmpEngine.msgAndPduDsp.mibInstrumController.writeVars(
         ((snmpTargetAddrEntry.name + (9,) + tblIdx, 'destroy'),)
@@ -1,4 +1,5 @@
 # SNMP engine
+import sys
 from pysnmp.proto.rfc3412 import MsgAndPduDispatcher
 from pysnmp.proto.mpmod.rfc2576 import SnmpV1MessageProcessingModel, \
      SnmpV2cMessageProcessingModel
@@ -6,8 +7,9 @@ from pysnmp.proto.mpmod.rfc3412 import SnmpV3MessageProcessingModel
 from pysnmp.proto.secmod.rfc2576 import SnmpV1SecurityModel, \
      SnmpV2cSecurityModel
 from pysnmp.proto.secmod.rfc3414 import SnmpUSMSecurityModel
+from pysnmp.proto.secmod.rfc3414.offload import CryptoOffload
 from pysnmp.proto.acmod import rfc3415, void
-from pysnmp import error
+from pysnmp import error, debug
 
 class SnmpEngine:
     def __init__(self, snmpEngineID=None, maxMessageSize=65507,
@@ -37,6 +39,9 @@ class SnmpEngine:
             }
         
         self.transportDispatcher = None
+        self.latencyObserver = None
+        self.__receiveExecutor = None
+        self.__cryptoOffload = None
         
         if self.msgAndPduDsp.mibInstrumController is None:
             raise error.PySnmpError(
@@ -59,16 +64,161 @@ class SnmpEngine:
         transportAddress,
         wholeMsg
         ):
-        self.msgAndPduDsp.receiveMessage(
-            self, transportDomain, transportAddress, wholeMsg
-            )
-                                         
+        if hasattr(wholeMsg, 'tobytes'):
+            # a view into transport's receive buffer, engine keeps
+            # parts of message so it's copied here (thus pooled receive
+            # buffers save nothing to engine users)
+            wholeMsg = wholeMsg.tobytes()
+        if self.__cryptoOffload is not None and \
+               self.__cryptoOffload.processMessage(
+                   transportDispatcher, transportDomain, transportAddress,
+                   wholeMsg
+                   ):
+            return
+        if self.__receiveExecutor is None:
+            self.msgAndPduDsp.receiveMessage(
+                self, transportDomain, transportAddress, wholeMsg
+                )
+        else:
+            # keep dispatcher running till message is processed
+            transportDispatcher.jobStarted(id(self))
+            self.__receiveExecutor.submit(
+                self.__receiveMessageJob, transportDispatcher,
+                transportDomain, transportAddress, wholeMsg
+                )
+
+    def __receiveMessageJob(
+        self,
+        transportDispatcher,
+        transportDomain,
+        transportAddress,
+        wholeMsg
+        ):
+        try:
+            try:
+                self.msgAndPduDsp.receiveMessage(
+                    self, transportDomain, transportAddress, wholeMsg
+                    )
+            except Exception:
+                debug.logger & debug.flagDsp and debug.logger('__receiveMessageJob: message from %s:%s processing failed: %s' % (transportDomain, transportAddress, sys.exc_info()[1]))
+                # fail at dispatcher thread as inline processing would
+                transportDispatcher.callFromThread(
+                    self.__raiseJobError, sys.exc_info()[1]
+                    )
+        finally:
+            # marshalled to dispatcher thread behind messages sent above
+            transportDispatcher.jobFinished(id(self))
+
     def __receiveTimerTickCbFun(self, timeNow):
+        if self.__receiveExecutor is None:
+            self.__receiveTimerTick(timeNow)
+        else:
+            self.__receiveExecutor.submit(
+                self.__receiveTimerTickJob, self.transportDispatcher, timeNow
+                )
+
+    def __receiveTimerTickJob(self, transportDispatcher, timeNow):
+        try:
+            self.__receiveTimerTick(timeNow)
+        except Exception:
+            debug.logger & debug.flagDsp and debug.logger('__receiveTimerTickJob: timer tick processing failed: %s' % (sys.exc_info()[1],))
+            transportDispatcher.callFromThread(
+                self.__raiseJobError, sys.exc_info()[1]
+                )
+
+    def __raiseJobError(self, exc): raise exc
+
+    def __receiveTimerTick(self, timeNow):
         self.msgAndPduDsp.receiveTimerTick(self, timeNow)
         for mpHandler in self.messageProcessingSubsystems.values():
             mpHandler.receiveTimerTick(self, timeNow)
         for smHandler in self.securityModels.values():
             smHandler.receiveTimerTick(self, timeNow)
+
+    def setReceiveExecutor(self, executor):
+        """Process incoming messages and timer ticks at executor (such
+           as concurrent.futures.ThreadPoolExecutor) rather than inline
+           at transport dispatcher's thread, None gets back to inline
+           processing.
+
+           Messages sent by worker threads are handed over to dispatcher
+           thread. Engine caches (MsgAndPduDispatcher's and message
+           processing models' ones, USM timeline) guard themselves with
+           locks. MIB instrumentation is not locked: MIB objects backends
+           and applications callbacks are invoked from worker threads
+           and should be MT-safe, concurrent updates of statistics
+           counters may occasionally be lost.
+        """
+        self.__receiveExecutor = executor
+        if executor is not None and self.transportDispatcher is not None:
+            self.transportDispatcher.prepareThreadedCalls()
+
+    def getReceiveExecutor(self): return self.__receiveExecutor
+
+    def setCryptoExecutor(self, executor):
+        """Authenticate and decrypt incoming SNMPv3 USM messages at
+           executor (such as concurrent.futures.ProcessPoolExecutor)
+           to let CPU-bound crypto scale over CPU cores. None turns it
+           off. Offloaded messages are then processed inline at
+           dispatcher thread."""
+        if executor is None:
+            self.__cryptoOffload = None
+        else:
+            self.__cryptoOffload = CryptoOffload(self, executor)
+            if self.transportDispatcher is not None:
+                self.transportDispatcher.prepareThreadedCalls()
+
+    def setFastCodec(self, flag=1):
+        """Encode and decode SNMP v1/v2c messages with specialised BER
+           codec (see pysnmp.proto.fastber) rather than generic pyasn1
+           one, messages it does not handle still go through pyasn1"""
+        for handler in list(self.messageProcessingSubsystems.values()) + \
+                list(self.securityModels.values()):
+            if hasattr(handler, 'setFastCodec'):
+                handler.setFastCodec(flag)
+
+    def registerLatencyObserver(self, cbFun):
+        """Have cbFun(snmpEngine, stage, startedAt, finishedAt) called
+           as incoming message passes pipeline stages. Stages reported
+           are receiveMessage, prepareDataElements, processIncomingMsg,
+           isAccessAllowed, flipFlopFsm and returnResponsePdu (named
+           after the methods timed), they nest into one another and are
+           reported on failure as well. Timestamps come from time.time().
+           See pysnmp.entity.latency.LatencyAggregator."""
+        if self.latencyObserver is not None:
+            raise error.PySnmpError('Latency observer already registered')
+        self.latencyObserver = cbFun
+
+    def unregisterLatencyObserver(self):
+        self.latencyObserver = None
+
+    def setMessageCacheLifetimes(self, stateReferenceLifetime=None,
+                                 msgIdLifetime=None):
+        """Set time (in timer ticks) message processing models keep
+           incoming (stateReference) and outgoing (msgId) requests
+           information for"""
+        for mpHandler in self.messageProcessingSubsystems.values():
+            mpHandler.setCacheLifetimes(stateReferenceLifetime, msgIdLifetime)
+
+    def setMessageCacheMaxEntries(self, maxEntries):
+        """Limit the number of entries each message processing model
+           caches, oldest entries are evicted first. None means no
+           limit."""
+        for mpHandler in self.messageProcessingSubsystems.values():
+            mpHandler.setCacheMaxEntries(maxEntries)
+
+    def getMessageCacheStatistics(self):
+        """Return message processing models caches statistics keyed
+           by message processing model ID"""
+        statistics = {}
+        for k, mpHandler in self.messageProcessingSubsystems.items():
+            statistics[k] = mpHandler.getCacheStatistics()
+        return statistics
+
+    def getCryptoStatistics(self):
+        if self.__cryptoOffload is None:
+            return {}
+        return self.__cryptoOffload.getStatistics()
         
     def registerTransportDispatcher(self, transportDispatcher):
         if self.transportDispatcher is not None:
@@ -82,6 +232,11 @@ class SnmpEngine:
             self.__receiveTimerTickCbFun
             )        
         self.transportDispatcher = transportDispatcher
+        if self.__receiveExecutor is not None or \
+               self.__cryptoOffload is not None:
+            transportDispatcher.prepareThreadedCalls()
+        pysnmpInKernelDrops, = self.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__PYSNMP-MIB', 'pysnmpInKernelDrops')
+        pysnmpInKernelDrops.transportDispatcher = transportDispatcher
 
     def unregisterTransportDispatcher(self):
         if self.transportDispatcher is None:
@@ -91,3 +246,5 @@ class SnmpEngine:
         self.transportDispatcher.unregisterRecvCbFun()
         self.transportDispatcher.unregisterTimerCbFun()
         self.transportDispatcher = None
+        pysnmpInKernelDrops, = self.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__PYSNMP-MIB', 'pysnmpInKernelDrops')
+        pysnmpInKernelDrops.transportDispatcher = None
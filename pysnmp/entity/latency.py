@@ -0,0 +1,123 @@
+# Per-stage latency histograms of SNMP engine pipeline
+from threading import Lock
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of durations.
+
+       Durations are recorded in microseconds. Values below
+       2 ** subBucketBits are counted exactly, larger ones fall into
+       buckets 2 ** (subBucketBits - 1) per power of two wide, which
+       keeps relative error under 2 ** (1 - subBucketBits) while taking
+       memory proportional to the number of distinct buckets hit.
+    """
+    subBucketBits = 7
+    def __init__(self):
+        self.__counts = {}
+        self.__totalCount = 0
+        self.__totalTime = 0
+        self.__minValue = self.__maxValue = None
+
+    def record(self, duration):
+        value = int(duration * 1000000)
+        if value < 0:
+            value = 0
+        shift = value.bit_length() - self.subBucketBits
+        if shift < 0:
+            shift = 0
+        key = shift, value >> shift
+        self.__counts[key] = self.__counts.get(key, 0) + 1
+        self.__totalCount += 1
+        self.__totalTime += duration
+        if self.__minValue is None or value < self.__minValue:
+            self.__minValue = value
+        if self.__maxValue is None or value > self.__maxValue:
+            self.__maxValue = value
+
+    def getCount(self): return self.__totalCount
+
+    def getMean(self):
+        """Return mean duration in seconds"""
+        return self.__totalCount and self.__totalTime / self.__totalCount or 0
+
+    def getMin(self): return (self.__minValue or 0) / 1000000.0
+
+    def getMax(self): return (self.__maxValue or 0) / 1000000.0
+
+    def getPercentile(self, percentile):
+        """Return duration (in seconds) percentile per cent of recorded
+           durations do not exceed, up to histogram precision"""
+        if not self.__totalCount:
+            return 0
+        threshold = self.__totalCount * percentile / 100.0
+        count = 0
+        keys = list(self.__counts.keys())
+        keys.sort()
+        for shift, subBucket in keys:
+            count += self.__counts[(shift, subBucket)]
+            if count >= threshold:
+                break
+        # highest value equivalent to the bucket, capped by recorded max
+        value = min(((subBucket + 1) << shift) - 1, self.__maxValue)
+        return value / 1000000.0
+
+class LatencyAggregator:
+    """SNMP engine latency observer keeping LatencyHistogram per stage.
+
+       Register with SnmpEngine.registerLatencyObserver(), then call
+       dump() or getHistograms() whenever statistics is needed.
+    """
+    percentiles = (50, 90, 99, 99.9)
+    def __init__(self):
+        self.__histograms = {}
+        self.__lock = Lock()  # engine may run stages at worker threads
+
+    def __call__(self, snmpEngine, stage, startedAt, finishedAt):
+        self.__lock.acquire()
+        try:
+            if stage not in self.__histograms:
+                self.__histograms[stage] = LatencyHistogram()
+            self.__histograms[stage].record(finishedAt - startedAt)
+        finally:
+            self.__lock.release()
+
+    def getHistograms(self):
+        """Return stage name to LatencyHistogram map, the histograms
+           are taken away from aggregator which starts over"""
+        self.__lock.acquire()
+        try:
+            histograms = self.__histograms
+            self.__histograms = {}
+        finally:
+            self.__lock.release()
+        return histograms
+
+    def reset(self):
+        self.getHistograms()
+
+    def dump(self, reset=False):
+        """Return per-stage latency summary (in milliseconds) as text"""
+        if reset:
+            histograms = self.getHistograms()
+        else:
+            self.__lock.acquire()
+            try:
+                histograms = self.__histograms.copy()
+            finally:
+                self.__lock.release()
+        stages = list(histograms.keys())
+        stages.sort()
+        text = []
+        for stage in stages:
+            histogram = histograms[stage]
+            text.append(
+                '%s: count %d, mean %.3f, min %.3f, %s, max %.3f' % (
+                    stage, histogram.getCount(), histogram.getMean() * 1000,
+                    histogram.getMin() * 1000,
+                    ', '.join(
+                        [ 'p%s %.3f' % (x, histogram.getPercentile(x) * 1000)
+                          for x in self.percentiles ]
+                        ),
+                    histogram.getMax() * 1000
+                    )
+                )
+        return '\n'.join(text)
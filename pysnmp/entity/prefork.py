@@ -0,0 +1,251 @@
+# Multi-process SNMP engine runner. Each worker process runs its own
+# SNMP engine replica serving SO_REUSEPORT-bound transports.
+import os, sys, struct, select, signal, errno, traceback
+from time import time
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from pysnmp import error, debug
+
+# LCD counters collected from workers and summed up at supervisor
+defaultCounters = (
+    ('__SNMPv2-MIB', 'snmpInPkts'),
+    ('__SNMPv2-MIB', 'snmpOutPkts'),
+    ('__SNMPv2-MIB', 'snmpInBadVersions'),
+    ('__SNMPv2-MIB', 'snmpInBadCommunityNames'),
+    ('__SNMPv2-MIB', 'snmpInBadCommunityUses'),
+    ('__SNMPv2-MIB', 'snmpInASNParseErrs'),
+    ('__SNMPv2-MIB', 'snmpInTooBigs'),
+    ('__SNMPv2-MIB', 'snmpInGetRequests'),
+    ('__SNMPv2-MIB', 'snmpInGetNexts'),
+    ('__SNMPv2-MIB', 'snmpInSetRequests'),
+    ('__SNMPv2-MIB', 'snmpInGetResponses'),
+    ('__SNMPv2-MIB', 'snmpInTraps'),
+    ('__SNMPv2-MIB', 'snmpOutGetResponses'),
+    ('__SNMPv2-MIB', 'snmpOutTraps'),
+    ('__SNMPv2-MIB', 'snmpSilentDrops'),
+    ('__SNMPv2-MIB', 'snmpProxyDrops'),
+    ('__SNMP-MPD-MIB', 'snmpUnknownSecurityModels'),
+    ('__SNMP-MPD-MIB', 'snmpInvalidMsgs'),
+    ('__SNMP-MPD-MIB', 'snmpUnknownPDUHandlers'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsUnsupportedSecLevels'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsNotInTimeWindows'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsUnknownUserNames'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsUnknownEngineIDs'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsWrongDigests'),
+    ('__SNMP-USER-BASED-SM-MIB', 'usmStatsDecryptionErrors')
+    )
+
+def readCounters(snmpEngine, counters=defaultCounters):
+    mibBuilder = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder
+    values = {}
+    for modName, symName in counters:
+        mibInstance, = mibBuilder.importSymbols(modName, symName)
+        values[symName] = int(mibInstance.getValue())
+    return values
+
+class _Worker:
+    def __init__(self, workerIndex, pid, fd):
+        self.workerIndex = workerIndex
+        self.pid = pid
+        self.fd = fd
+        self.buffer = ''.encode()
+        self.counters = {}
+        self.startedAt = time()
+
+class PreforkSupervisor:
+    """Runs a number of SNMP engine replicas in forked worker processes.
+
+       The engineFactory(workerIndex) callable is invoked in each worker
+       process to build and configure its SnmpEngine instance. Server
+       transports should be bound with SO_REUSEPORT enabled (see
+       AbstractSocketTransport.setReusePort()) so that kernel would spread
+       incoming requests among workers. For SNMPv3 to work consistently,
+       all replicas should be configured with the same snmpEngineID.
+
+       Crashed workers are restarted. LCD counters periodically reported
+       by workers are summed up and available through getCounters().
+    """
+    def __init__(self, workerCount, engineFactory, statsInterval=5,
+                 restartDelay=1, countersCbFun=None,
+                 counters=defaultCounters):
+        if not hasattr(os, 'fork'):
+            raise error.PySnmpError(
+                'Multi-process mode is not supported at this platform'
+                )
+        if workerCount < 1:
+            raise error.PySnmpError('Bad worker count %s' % workerCount)
+        self.__workerCount = workerCount
+        self.__engineFactory = engineFactory
+        self.__statsInterval = statsInterval
+        self.__restartDelay = restartDelay
+        self.__countersCbFun = countersCbFun
+        self.__counters = counters
+        self.__workers = {}       # pid -> _Worker
+        self.__retired = {}       # counters of workers gone
+        self.__pendingRestarts = []
+        self.__running = 0
+
+    # Worker process side
+
+    def __runWorker(self, workerIndex, fd):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        snmpEngine = self.__engineFactory(workerIndex)
+        transportDispatcher = snmpEngine.transportDispatcher
+        if transportDispatcher is None:
+            raise error.PySnmpError(
+                'SNMP engine of worker #%s has no transports' % workerIndex
+                )
+
+        def reportCounters():
+            data = pickle.dumps(readCounters(snmpEngine, self.__counters), 2)
+            try:
+                os.write(fd, struct.pack('!L', len(data)) + data)
+            except OSError:
+                # supervisor is gone
+                transportDispatcher.jobFinished(1)
+                return
+            transportDispatcher.callLater(
+                self.__statsInterval, reportCounters
+                )
+
+        reportCounters()
+
+        transportDispatcher.jobStarted(1) # finishes with supervisor
+        try:
+            transportDispatcher.runDispatcher()
+        finally:
+            transportDispatcher.closeDispatcher()
+
+    def __spawnWorker(self, workerIndex):
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            exitCode = 0
+            try:
+                try:
+                    os.close(rfd)
+                    for w in self.__workers.values():
+                        os.close(w.fd)
+                    self.__runWorker(workerIndex, wfd)
+                except Exception:
+                    traceback.print_exc()
+                    exitCode = 1
+            finally:
+                os._exit(exitCode)
+        os.close(wfd)
+        self.__workers[pid] = _Worker(workerIndex, pid, rfd)
+        debug.logger & debug.flagDsp and debug.logger('__spawnWorker: worker #%s started as pid %s' % (workerIndex, pid))
+
+    # Supervisor process side
+
+    def __readCounters(self, worker):
+        try:
+            data = os.read(worker.fd, 65536)
+        except OSError:
+            return
+        worker.buffer += data
+        while len(worker.buffer) >= 4:
+            size, = struct.unpack('!L', worker.buffer[:4])
+            if len(worker.buffer) < size + 4:
+                break
+            worker.counters = pickle.loads(worker.buffer[4:size+4])
+            worker.buffer = worker.buffer[size+4:]
+
+    def __retireWorker(self, pid):
+        worker = self.__workers.pop(pid)
+        self.__readCounters(worker)
+        os.close(worker.fd)
+        # keep counters of the gone worker so that totals never go down
+        for k, v in worker.counters.items():
+            self.__retired[k] = self.__retired.get(k, 0) + v
+        return worker
+
+    def __reapWorkers(self):
+        while self.__workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError:
+                if sys.exc_info()[1].errno == errno.EINTR:
+                    continue
+                break
+            if not pid:
+                break
+            if pid not in self.__workers:
+                continue
+            worker = self.__retireWorker(pid)
+            if not self.__running:
+                continue
+            debug.logger & debug.flagDsp and debug.logger('__reapWorkers: worker #%s (pid %s) exited with status %s, restarting' % (worker.workerIndex, pid, status))
+            # do not spin on workers failing right on startup
+            restartAt = time()
+            if restartAt - worker.startedAt < self.__restartDelay:
+                restartAt += self.__restartDelay
+            self.__pendingRestarts.append((restartAt, worker.workerIndex))
+
+    def getCounters(self):
+        """Return counters summed up over all (past and present) workers"""
+        counters = self.__retired.copy()
+        for worker in self.__workers.values():
+            for k, v in worker.counters.items():
+                counters[k] = counters.get(k, 0) + v
+        return counters
+
+    def getWorkers(self):
+        return [ (w.workerIndex, w.pid) for w in self.__workers.values() ]
+
+    def run(self):
+        self.__running = 1
+        sigTermHandler = signal.signal(
+            signal.SIGTERM, lambda signum, frame: self.stop()
+            )
+        for workerIndex in range(self.__workerCount):
+            self.__spawnWorker(workerIndex)
+        nextReport = time() + self.__statsInterval
+        try:
+            while self.__running:
+                fds = [ w.fd for w in self.__workers.values() ]
+                try:
+                    r, w, x = select.select(fds, [], [], 0.5)
+                except (select.error, OSError):
+                    if sys.exc_info()[1].args[0] == errno.EINTR:
+                        continue
+                    raise
+                for worker in list(self.__workers.values()):
+                    if worker.fd in r:
+                        self.__readCounters(worker)
+                self.__reapWorkers()
+                timeNow = time()
+                for restartAt, workerIndex in self.__pendingRestarts[:]:
+                    if restartAt <= timeNow and self.__running:
+                        self.__pendingRestarts.remove((restartAt, workerIndex))
+                        self.__spawnWorker(workerIndex)
+                if self.__countersCbFun is not None and timeNow >= nextReport:
+                    nextReport = timeNow + self.__statsInterval
+                    self.__countersCbFun(self, self.getCounters())
+        finally:
+            self.__running = 0
+            self.__stopWorkers()
+            signal.signal(signal.SIGTERM, sigTermHandler)
+
+    def stop(self):
+        self.__running = 0
+
+    def __stopWorkers(self):
+        for pid in list(self.__workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        while self.__workers:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except OSError:
+                if sys.exc_info()[1].errno == errno.EINTR:
+                    continue
+                break
+            if pid in self.__workers:
+                self.__retireWorker(pid)
+        self.__pendingRestarts = []
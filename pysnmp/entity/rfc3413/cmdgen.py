@@ -5,7 +5,7 @@ from pysnmp.proto.proxy import rfc2576
 from pysnmp import error, nextid, debug
 from pyasn1.type import univ
 
-getNextHandle = nextid.Integer(0x7fffffff)
+getNextHandle = nextid.counter(0x7fffffff)
                              
 def getVersionSpecifics(snmpVersion):
     if snmpVersion == 0:
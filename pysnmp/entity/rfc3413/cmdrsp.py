@@ -1,4 +1,5 @@
 import sys
+from time import time
 from pysnmp.proto import rfc1157, rfc1902, rfc1905, rfc3411, errind, error
 from pysnmp.proto.api import v2c  # backend is always SMIv2 compliant
 from pysnmp.proto.proxy import rfc2576
@@ -68,14 +69,26 @@ class CommandResponderBase:
                 )
         except error.StatusInformation:
             debug.logger & debug.flagApp and debug.logger('sendRsp: stateReference %s, statusInformation %s' % (stateReference, sys.exc_info()[1]))
-            snmpSilentDrops, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpSilentDrops')
-            snmpSilentDrops.syntax = snmpSilentDrops.syntax + 1
+            snmpEngine.msgAndPduDsp.statistics.snmpSilentDrops += 1
 
     _getRequestType = rfc1905.GetRequestPDU.tagSet
     _getNextRequestType = rfc1905.GetNextRequestPDU.tagSet
     _setRequestType = rfc1905.SetRequestPDU.tagSet
     _counter64Type = rfc1902.Counter64.tagSet
 
+    def _getMgmtFun(self, snmpEngine, mgmtFun):
+        # MIB instrumentation call reporting to engine latency observer
+        latencyObserver = snmpEngine.latencyObserver
+        if not latencyObserver:
+            return mgmtFun
+        def observedMgmtFun(varBinds, acInfo):
+            startedAt = time()
+            try:
+                return mgmtFun(varBinds, acInfo)
+            finally:
+                latencyObserver(snmpEngine, 'flipFlopFsm', startedAt, time())
+        return observedMgmtFun
+
     def releaseStateInformation(self, stateReference):
         if stateReference in self.__pendingReqs:
             del self.__pendingReqs[stateReference]
@@ -193,10 +206,15 @@ class CommandResponderBase:
         (snmpEngine, securityModel, securityName, securityLevel,
          contextName, pduType) = acCtx
         try:
-            snmpEngine.accessControlModel[self.acmID].isAccessAllowed(
-                snmpEngine, securityModel, securityName,
-                securityLevel, viewType, contextName, name
-                )
+            latencyObserver = snmpEngine.latencyObserver
+            startedAt = latencyObserver and time()
+            try:
+                snmpEngine.accessControlModel[self.acmID].isAccessAllowed(
+                    snmpEngine, securityModel, securityName,
+                    securityLevel, viewType, contextName, name
+                    )
+            finally:
+                latencyObserver and latencyObserver(snmpEngine, 'isAccessAllowed', startedAt, time())
         # Map ACM errors onto SMI ones
         except error.StatusInformation:
             statusInformation = sys.exc_info()[1]
@@ -244,7 +262,9 @@ class GetCommandResponder(CommandResponderBase):
         ):
         (acFun, acCtx) = acInfo
         # rfc1905: 4.2.1.1
-        mgmtFun = self.snmpContext.getMibInstrum(contextName).readVars
+        mgmtFun = self._getMgmtFun(
+            snmpEngine, self.snmpContext.getMibInstrum(contextName).readVars
+            )
         self.sendRsp(
             snmpEngine, stateReference, 0, 0, mgmtFun(
                 v2c.apiPDU.getVarBinds(PDU), (acFun, acCtx)
@@ -261,7 +281,9 @@ class NextCommandResponder(CommandResponderBase):
         ):
         (acFun, acCtx) = acInfo
         # rfc1905: 4.2.2.1
-        mgmtFun = self.snmpContext.getMibInstrum(contextName).readNextVars
+        mgmtFun = self._getMgmtFun(
+            snmpEngine, self.snmpContext.getMibInstrum(contextName).readNextVars
+            )
         varBinds = v2c.apiPDU.getVarBinds(PDU)
         while 1:
             rspVarBinds = mgmtFun(varBinds, (acFun, acCtx))
@@ -300,7 +322,9 @@ class BulkCommandResponder(CommandResponderBase):
 
         debug.logger & debug.flagApp and debug.logger('handleMgmtOperation: N %d, M %d, R %d' % (N, M, R))
 
-        mgmtFun = self.snmpContext.getMibInstrum(contextName).readNextVars
+        mgmtFun = self._getMgmtFun(
+            snmpEngine, self.snmpContext.getMibInstrum(contextName).readNextVars
+            )
         
         if N:
             rspVarBinds = mgmtFun(reqVarBinds[:N], (acFun, acCtx))
@@ -331,7 +355,9 @@ class SetCommandResponder(CommandResponderBase):
         self, snmpEngine, stateReference, contextName, PDU, acInfo
         ):
         (acFun, acCtx) = acInfo
-        mgmtFun = self.snmpContext.getMibInstrum(contextName).writeVars
+        mgmtFun = self._getMgmtFun(
+            snmpEngine, self.snmpContext.getMibInstrum(contextName).writeVars
+            )
         # rfc1905: 4.2.5.1-13
         try:
             self.sendRsp(
@@ -64,6 +64,11 @@ def getTargetAddr(snmpEngine, snmpTargetAddrName):
             snmpTargetAddrTAddress = tuple(
                 TransportAddressIPv6(snmpTargetAddrTAddress)
             )
+        elif snmpTargetAddrTDomain[:len(config.snmpTCPDomain)] == config.snmpTCPDomain:
+            TransportAddressIPv4, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('TRANSPORT-ADDRESS-MIB', 'TransportAddressIPv4')
+            snmpTargetAddrTAddress = tuple(
+                TransportAddressIPv4(snmpTargetAddrTAddress)
+            )
         elif snmpTargetAddrTDomain[:len(config.snmpLocalDomain)] == config.snmpLocalDomain:
             snmpTargetAddrTAddress = str(snmpTargetAddrTAddress)
 
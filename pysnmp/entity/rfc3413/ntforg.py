@@ -7,7 +7,7 @@ from pysnmp.smi import error
 from pysnmp import nextid
 from pysnmp import debug
 
-getNextHandle = nextid.Integer(0x7fffffff)
+getNextHandle = nextid.counter(0x7fffffff)
 
 class NotificationOriginator:
     acmID = 3  # default MIB access control method to use
@@ -23,11 +23,17 @@ usmAesCfb192Protocol = config.usmAesCfb192Protocol
 usmAesCfb256Protocol = config.usmAesCfb256Protocol
 usmNoPrivProtocol = config.usmNoPrivProtocol
 
-nextID = nextid.Integer(0xffffffff)
+nextID = nextid.counter(0xffffffff)
 
 class AsynCommandGenerator:
     _null = univ.Null('')
-    def __init__(self, snmpEngine=None):
+    def __init__(self, snmpEngine=None, socketPoolSize=0,
+                 rcvBufSize=0, sndBufSize=0):
+        # client transports may use a pool of socketPoolSize sockets
+        # each having its kernel buffers of rcvBufSize/sndBufSize
+        self.__socketPoolSize = socketPoolSize
+        self.__rcvBufSize = rcvBufSize
+        self.__sndBufSize = sndBufSize
         self.__knownAuths = {}
         self.__knownParams = {}
         self.__knownTransports = {}
@@ -78,7 +84,9 @@ class AsynCommandGenerator:
             self.__knownParams[k] = paramsName
 
         if transportTarget.transportDomain not in self.__knownTransports:
-            transport = transportTarget.openClientMode()
+            transport = transportTarget.openClientMode(
+                self.__socketPoolSize, self.__rcvBufSize, self.__sndBufSize
+                )
             config.addSocketTransport(
                 self.snmpEngine,
                 transportTarget.transportDomain,
@@ -21,7 +21,7 @@ usmAesCfb192Protocol = config.usmAesCfb192Protocol
 usmAesCfb256Protocol = config.usmAesCfb256Protocol
 usmNoPrivProtocol = config.usmNoPrivProtocol
 
-nextID = nextid.Integer(0xffffffff)
+nextID = nextid.counter(0xffffffff)
 
 class AsynNotificationOriginator(cmdgen.AsynCommandGenerator):
     def __init__(self, snmpEngine=None, snmpContext=None):
@@ -1,9 +1,10 @@
 import socket, sys
 from pysnmp.carrier.asynsock.dgram import udp, udp6, unix
 from pyasn1.compat.octets import null
+from pysnmp import error
 
 class _AbstractTransportTarget:
-    transportDomain = protoTransport = None
+    transportDomain = protoTransport = protoTransportPool = None
     def __init__(self, transportAddr, timeout=1, retries=5, tagList=null):
         self.transportAddr = transportAddr
         self.timeout = timeout
@@ -24,13 +25,25 @@ class _AbstractTransportTarget:
     def __gt__(self, other): return self.transportAddr > other
     def __ge__(self, other): return self.transportAddr >= other
     
-    def openClientMode(self):
-        self.transport = self.protoTransport().openClientMode()
+    def openClientMode(self, socketPoolSize=0, rcvBufSize=0, sndBufSize=0):
+        if socketPoolSize:
+            if self.protoTransportPool is None:
+                raise error.PySnmpError(
+                    'Socket pool not supported by %s' % self.__class__.__name__
+                    )
+            self.transport = self.protoTransportPool(
+                socketPoolSize
+                ).openClientMode()
+        else:
+            self.transport = self.protoTransport().openClientMode()
+        if rcvBufSize or sndBufSize:
+            self.transport.setSocketBufferSizes(rcvBufSize, sndBufSize)
         return self.transport
  
 class UdpTransportTarget(_AbstractTransportTarget):
     transportDomain = udp.domainName
     protoTransport = udp.UdpSocketTransport
+    protoTransportPool = udp.UdpSocketPoolTransport
     def __init__(self, transportAddr, timeout=1, retries=5, tagList=null):
         _AbstractTransportTarget.__init__(self, transportAddr, timeout,
                                           retries, tagList)
@@ -46,6 +59,7 @@ class UdpTransportTarget(_AbstractTransportTarget):
 class Udp6TransportTarget(_AbstractTransportTarget):
     transportDomain = udp6.domainName
     protoTransport = udp6.Udp6SocketTransport
+    protoTransportPool = udp6.Udp6SocketPoolTransport
     def __init__(self, transportAddr, timeout=1, retries=5, tagList=null):
         _AbstractTransportTarget.__init__(self, transportAddr, timeout,
                                           retries, tagList)
@@ -1,17 +1,37 @@
-# Return a next value in a reasonably MT-safe manner
-import random
+# Return a next value in a MT-safe manner
+import itertools, operator, random
+try:
+    from itertools import imap
+except ImportError:
+    imap = map  # Python 3
 
 random.seed()
 
+def counter(maximum):
+    """Return callable generating integers in [0, maximum] range in a
+       cycle, starting at random point.
+
+       Values come out of a chain of C-level iterators which steps
+       atomically for Python threads so no locking is needed. Returned
+       callable is a built-in method, it takes no Python frame to call
+       and may be kept as class attribute (it is never bound).
+    """
+    iterator = imap(
+        operator.mod,
+        itertools.count(random.randrange(maximum)),
+        itertools.repeat(maximum + 1)
+        )
+    try:
+        return iterator.__next__
+    except AttributeError:
+        return iterator.next  # Python 2
+
 class Integer:
+    """Callable generating integers, see counter()"""
     def __init__(self, maximum, increment=256):
         self.__maximum = maximum
-        if increment >= maximum:
-            increment = maximum
-        self.__increment = increment
-        self.__threshold = increment//2
-        e = random.randrange(self.__maximum - self.__increment)
-        self.__bank = list(range(e, e+self.__increment))
+        self.__increment = increment  # unused, kept for compatibility
+        self.__next = counter(maximum)
 
     def __repr__(self):
         return '%s(%d, %d)' % (
@@ -21,14 +41,4 @@ class Integer:
             )
         
     def __call__(self):
-        v = self.__bank.pop(0)
-        if v % self.__threshold:
-            return v
-        else:
-            # this is MT-safe unless too many (~ increment/2) threads
-            # bump into this code simultaneously
-            e = self.__bank[-1]+1
-            if e > self.__maximum:
-                e = 0
-            self.__bank.extend(range(e, e+self.__threshold))
-            return v
+        return self.__next()
@@ -6,3 +6,4 @@ protoVersion2c = 1
 protoModules = { protoVersion1: v1, protoVersion2c: v2c }
 
 decodeMessageVersion = verdec.decodeMessageVersion
+peekMessageVersion = verdec.peekMessageVersion
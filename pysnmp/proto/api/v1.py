@@ -38,7 +38,7 @@ class VarBindAPI:
 
 apiVarBind = VarBindAPI()
 
-getNextRequestID = nextid.Integer(0xffffff)
+getNextRequestID = nextid.counter(0xffffff)
 
 class PDUAPI:
     _errorStatus = rfc1157._errorStatus.clone(0)
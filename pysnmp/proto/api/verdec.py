@@ -1,4 +1,5 @@
 from pyasn1.codec.ber import decoder
+from pyasn1.compat.octets import oct2int
 from pyasn1.error import PyAsn1Error
 from pysnmp.proto.error import ProtocolError
 
@@ -9,3 +10,34 @@ def decodeMessageVersion(wholeMsg):
         return ver
     except PyAsn1Error:
         raise ProtocolError('Invalid BER at SNMP version component')
+
+def peekMessageVersion(wholeMsg):
+    """Read SNMP version off BER header of the message as Python integer.
+       Unlike decodeMessageVersion(), no ASN.1 objects get created and
+       the rest of the message is not looked at."""
+    try:
+        if oct2int(wholeMsg[0]) != 0x30:
+            raise ProtocolError('Invalid BER at SNMP message header')
+        idx = oct2int(wholeMsg[1])
+        if idx & 0x80:
+            # skip long form (or indefinite) length octets
+            idx = (idx & 0x7f) + 2
+        else:
+            idx = 2
+        if oct2int(wholeMsg[idx]) != 0x02:
+            raise ProtocolError('Invalid BER at SNMP version component')
+        size = oct2int(wholeMsg[idx+1])
+        if size < 1 or size > 4:
+            raise ProtocolError('Invalid BER at SNMP version component')
+        idx += 2
+        ver = oct2int(wholeMsg[idx])
+        if ver & 0x80:
+            ver -= 0x100
+        end = idx + size
+        idx += 1
+        while idx < end:
+            ver = ver << 8 | oct2int(wholeMsg[idx])
+            idx += 1
+        return ver
+    except IndexError:
+        raise ProtocolError('Short SNMP message header')
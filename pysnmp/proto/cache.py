@@ -1,31 +1,57 @@
+from threading import RLock
 from pysnmp.proto import error
 
 class Cache:
+    """Pending requests cache of MsgAndPduDispatcher.
+
+       All operations are serialized by a re-entrant lock so that cache
+       could be shared by dispatcher thread and engine worker threads
+       (see SnmpEngine.setReceiveExecutor()). The lock is held while
+       expire() runs its callback, the callback is thus free to call
+       back into this cache but must not wait on other threads doing so.
+    """
     def __init__(self):
         self.__cacheRepository = {}
+        self.__lock = RLock()
 
     def add(self, index, **kwargs):
-        self.__cacheRepository[index] = kwargs
+        self.__lock.acquire()
+        try:
+            self.__cacheRepository[index] = kwargs
+        finally:
+            self.__lock.release()
         return index
 
     def pop(self, index):
-        if index in self.__cacheRepository:
-            cachedParams = self.__cacheRepository[index]
-        else:
-            return
-        del self.__cacheRepository[index]
+        self.__lock.acquire()
+        try:
+            if index in self.__cacheRepository:
+                cachedParams = self.__cacheRepository[index]
+            else:
+                return
+            del self.__cacheRepository[index]
+        finally:
+            self.__lock.release()
         return cachedParams
 
     def update(self, index, **kwargs):
-        if index not in self.__cacheRepository:
-            raise error.ProtocolError(
-                'Cache miss on update for %s' % kwargs
-                )
-        self.__cacheRepository[index].update(kwargs)
+        self.__lock.acquire()
+        try:
+            if index not in self.__cacheRepository:
+                raise error.ProtocolError(
+                    'Cache miss on update for %s' % kwargs
+                    )
+            self.__cacheRepository[index].update(kwargs)
+        finally:
+            self.__lock.release()
 
     def expire(self, cbFun, cbCtx):
-        for index, cachedParams in list(self.__cacheRepository.items()):
-            if cbFun:
-                if cbFun(index, cachedParams, cbCtx):
-                    del self.__cacheRepository[index]                    
-
+        self.__lock.acquire()
+        try:
+            for index, cachedParams in list(self.__cacheRepository.items()):
+                if cbFun:
+                    if cbFun(index, cachedParams, cbCtx):
+                        if index in self.__cacheRepository:
+                            del self.__cacheRepository[index]
+        finally:
+            self.__lock.release()
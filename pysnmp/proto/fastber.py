@@ -0,0 +1,554 @@
+# Specialised BER codec for SNMP v1/v2c messages
+#
+# Message is represented by plain Python values:
+#
+#   ( version, community, pduType, pduData )
+#
+# where pduType is PDU tag octet (e.g. 0xa0 for GetRequest-PDU) and
+# pduData is
+#
+#   ( requestId, errorStatus, errorIndex, varBinds )
+#
+# for all but SNMPv1 Trap-PDU, which is
+#
+#   ( enterprise, agentAddr, genericTrap, specificTrap, timeStamp, varBinds )
+#
+# varBinds is a sequence of ( name, ( valueType, value ) ) where valueType
+# is value tag octet and value is int, octets, OID tuple or None (for
+# NULL and exception values). Anything outside of this grammar raises
+# ProtocolError so that caller could fall back to generic pyasn1 codec.
+#
+# SNMPv3 message header, USM security parameters and scopedPDU can be
+# decoded into plain values as well (see decodeV3Message() and below).
+import sys
+from pyasn1.type import univ
+from pysnmp.proto import rfc1155, rfc1157, rfc1902, rfc1905, rfc1901, error
+
+try:
+    memoryview
+except NameError:
+    # Python < 2.7
+    memoryview = None
+
+if sys.version_info[0] <= 2:
+    toOctets = str
+else:
+    toOctets = bytes
+
+# Value types
+
+INTEGER = 0x02
+OCTET_STRING = 0x04
+NULL = 0x05
+OBJECT_IDENTIFIER = 0x06
+IP_ADDRESS = 0x40
+COUNTER32 = 0x41
+GAUGE32 = 0x42
+TIME_TICKS = 0x43
+OPAQUE = 0x44
+COUNTER64 = 0x46
+NO_SUCH_OBJECT = 0x80
+NO_SUCH_INSTANCE = 0x81
+END_OF_MIB_VIEW = 0x82
+
+intTypes = {
+    INTEGER: 1, COUNTER32: 1, GAUGE32: 1, TIME_TICKS: 1, COUNTER64: 1
+    }
+octetsTypes = { OCTET_STRING: 1, IP_ADDRESS: 1, OPAQUE: 1 }
+nullTypes = {
+    NULL: 1, NO_SUCH_OBJECT: 1, NO_SUCH_INSTANCE: 1, END_OF_MIB_VIEW: 1
+    }
+
+# PDU types
+
+V1_TRAP = 0xa4
+pduTypes = { 0: (0xa0, 0xa1, 0xa2, 0xa3, 0xa4),
+             1: (0xa0, 0xa1, 0xa2, 0xa3, 0xa5, 0xa6, 0xa7, 0xa8) }
+
+# Decoder
+
+def _decodeHeader(data, idx, end):
+    # returns tag, payload start and end indices
+    if idx + 2 > end:
+        raise error.ProtocolError('Short BER header')
+    tag = data[idx]
+    if tag & 0x1f == 0x1f:
+        raise error.ProtocolError('Long form tag not supported')
+    length = data[idx+1]
+    idx += 2
+    if length & 0x80:
+        size = length & 0x7f
+        if not size or size > 4:
+            raise error.ProtocolError('Unsupported BER length')
+        if idx + size > end:
+            raise error.ProtocolError('Short BER length')
+        length = 0
+        for x in range(size):
+            length = length << 8 | data[idx]
+            idx += 1
+    if idx + length > end:
+        raise error.ProtocolError('Short BER payload')
+    return tag, idx, idx + length
+
+def _decodeInt(data, idx, end):
+    if idx == end:
+        raise error.ProtocolError('Empty INTEGER')
+    value = data[idx]
+    if value & 0x80:
+        value -= 0x100
+    idx += 1
+    while idx < end:
+        value = value << 8 | data[idx]
+        idx += 1
+    return value
+
+def _decodeOid(data, idx, end):
+    if idx == end:
+        raise error.ProtocolError('Empty OBJECT IDENTIFIER')
+    oid = []
+    subId = 0
+    while idx < end:
+        octet = data[idx]
+        subId = subId << 7 | octet & 0x7f
+        if not octet & 0x80:
+            oid.append(subId)
+            subId = 0
+        idx += 1
+    if octet & 0x80:
+        raise error.ProtocolError('Short OBJECT IDENTIFIER')
+    first = oid[0]
+    if first < 40:
+        return (0, first) + tuple(oid[1:])
+    elif first < 80:
+        return (1, first - 40) + tuple(oid[1:])
+    else:
+        return (2, first - 80) + tuple(oid[1:])
+
+def _decodeExpected(data, idx, end, expectedTag):
+    tag, start, stop = _decodeHeader(data, idx, end)
+    if tag != expectedTag:
+        raise error.ProtocolError('Unexpected tag 0x%x' % tag)
+    return start, stop
+
+def _decodeValue(data, octets, idx, end):
+    tag, start, stop = _decodeHeader(data, idx, end)
+    if tag in intTypes:
+        return (tag, _decodeInt(data, start, stop)), stop
+    elif tag in octetsTypes:
+        return (tag, octets[start:stop]), stop
+    elif tag in nullTypes:
+        if start != stop:
+            raise error.ProtocolError('Non-empty NULL')
+        return (tag, None), stop
+    elif tag == OBJECT_IDENTIFIER:
+        return (tag, _decodeOid(data, start, stop)), stop
+    raise error.ProtocolError('Unsupported value type 0x%x' % tag)
+
+def _decodeVarBinds(data, octets, idx, end):
+    start, stop = _decodeExpected(data, idx, end, 0x30)
+    varBinds = []
+    idx = start
+    while idx < stop:
+        start, end = _decodeExpected(data, idx, stop, 0x30)
+        nameStart, nameEnd = _decodeExpected(
+            data, start, end, OBJECT_IDENTIFIER
+            )
+        value, idx = _decodeValue(data, octets, nameEnd, end)
+        if idx != end:
+            raise error.ProtocolError('Trailing junk at variable binding')
+        varBinds.append((_decodeOid(data, nameStart, nameEnd), value))
+    return varBinds, stop
+
+def _decodePdu(data, octets, idx, end, version):
+    pduType, idx, stop = _decodeHeader(data, idx, end)
+    if pduType not in pduTypes[version]:
+        raise error.ProtocolError('Unsupported PDU type 0x%x' % pduType)
+    if pduType == V1_TRAP:
+        start, idx = _decodeExpected(data, idx, stop, OBJECT_IDENTIFIER)
+        enterprise = _decodeOid(data, start, idx)
+        start, idx = _decodeExpected(data, idx, stop, IP_ADDRESS)
+        agentAddr = octets[start:idx]
+        pduData = [ enterprise, agentAddr ]
+        for tag in (INTEGER, INTEGER, TIME_TICKS):
+            start, idx = _decodeExpected(data, idx, stop, tag)
+            pduData.append(_decodeInt(data, start, idx))
+    else:
+        pduData = []
+        for x in range(3):
+            start, idx = _decodeExpected(data, idx, stop, INTEGER)
+            pduData.append(_decodeInt(data, start, idx))
+    varBinds, idx = _decodeVarBinds(data, octets, idx, stop)
+    if idx != stop:
+        raise error.ProtocolError('Trailing junk at PDU')
+    pduData.append(varBinds)
+    return pduType, tuple(pduData), stop
+
+def _toBytes(wholeMsg):
+    if memoryview is not None and isinstance(wholeMsg, memoryview):
+        wholeMsg = wholeMsg.tobytes()
+    return wholeMsg
+
+def decodeMessage(wholeMsg):
+    """Decode SNMP v1/v2c message into Python values, trailing octets
+       past the message are ignored"""
+    wholeMsg = _toBytes(wholeMsg)
+    data = bytearray(wholeMsg)
+    start, end = _decodeExpected(data, 0, len(data), 0x30)
+    start, stop = _decodeExpected(data, start, end, INTEGER)
+    version = _decodeInt(data, start, stop)
+    if version not in pduTypes:
+        raise error.ProtocolError('Unsupported SNMP version %s' % version)
+    start, stop = _decodeExpected(data, stop, end, OCTET_STRING)
+    community = wholeMsg[start:stop]
+    pduType, pduData, stop = _decodePdu(data, wholeMsg, stop, end, version)
+    return version, community, pduType, pduData
+
+# SNMPv3 message parts. These are decoded one by one as security
+# model processing goes.
+
+def decodeV3Message(wholeMsg):
+    """Decode SNMPv3 message leaving security parameters and scopedPDU
+       as octets. Returns ( msgID, msgMaxSize, msgFlags, msgSecurityModel,
+       msgSecurityParameters, ( msgDataTag, msgData ) ) where msgData is
+       either the whole plaintext scopedPDU (SEQUENCE tag) or
+       encryptedPDU contents (OCTET STRING tag)"""
+    wholeMsg = _toBytes(wholeMsg)
+    data = bytearray(wholeMsg)
+    start, end = _decodeExpected(data, 0, len(data), 0x30)
+    start, idx = _decodeExpected(data, start, end, INTEGER)
+    version = _decodeInt(data, start, idx)
+    if version != 3:
+        raise error.ProtocolError('Unsupported SNMP version %s' % version)
+    idx, stop = _decodeExpected(data, idx, end, 0x30)
+    headerData = []
+    for tag in (INTEGER, INTEGER, OCTET_STRING, INTEGER):
+        start, idx = _decodeExpected(data, idx, stop, tag)
+        if tag == OCTET_STRING:
+            headerData.append(wholeMsg[start:idx])
+        else:
+            headerData.append(_decodeInt(data, start, idx))
+    if idx != stop:
+        raise error.ProtocolError('Trailing junk at message header')
+    start, idx = _decodeExpected(data, stop, end, OCTET_STRING)
+    headerData.append(wholeMsg[start:idx])
+    tag, start, stop = _decodeHeader(data, idx, end)
+    if tag == 0x30:
+        headerData.append((tag, wholeMsg[idx:stop]))
+    elif tag == OCTET_STRING:
+        headerData.append((tag, wholeMsg[start:stop]))
+    else:
+        raise error.ProtocolError('Unexpected tag 0x%x at msgData' % tag)
+    if stop != end:
+        raise error.ProtocolError('Trailing junk at message')
+    return tuple(headerData)
+
+def decodeUsmSecurityParameters(octets):
+    """Decode USM security parameters into ( msgAuthoritativeEngineID,
+       msgAuthoritativeEngineBoots, msgAuthoritativeEngineTime,
+       msgUserName, msgAuthenticationParameters, msgPrivacyParameters )"""
+    octets = _toBytes(octets)
+    data = bytearray(octets)
+    idx, end = _decodeExpected(data, 0, len(data), 0x30)
+    securityParameters = []
+    for tag in (OCTET_STRING, INTEGER, INTEGER,
+                OCTET_STRING, OCTET_STRING, OCTET_STRING):
+        start, idx = _decodeExpected(data, idx, end, tag)
+        if tag == OCTET_STRING:
+            securityParameters.append(octets[start:idx])
+        else:
+            securityParameters.append(_decodeInt(data, start, idx))
+    if idx != end:
+        raise error.ProtocolError('Trailing junk at security parameters')
+    return tuple(securityParameters)
+
+def decodeScopedPdu(octets):
+    """Decode scopedPDU into ( contextEngineId, contextName, pduType,
+       pduData ) and the size of its encoding as scopedPDU may be
+       followed by cipher padding"""
+    octets = _toBytes(octets)
+    data = bytearray(octets)
+    idx, end = _decodeExpected(data, 0, len(data), 0x30)
+    start, idx = _decodeExpected(data, idx, end, OCTET_STRING)
+    contextEngineId = octets[start:idx]
+    start, idx = _decodeExpected(data, idx, end, OCTET_STRING)
+    contextName = octets[start:idx]
+    pduType, pduData, idx = _decodePdu(data, octets, idx, end, 1)
+    if idx != end:
+        raise error.ProtocolError('Trailing junk at scopedPDU')
+    return (contextEngineId, contextName, pduType, pduData), end
+
+# Encoder
+
+def _encodeLength(octets, length):
+    if length < 0x80:
+        octets.append(length)
+    else:
+        lengthOctets = bytearray()
+        while length:
+            lengthOctets.insert(0, length & 0xff)
+            length >>= 8
+        octets.append(0x80 | len(lengthOctets))
+        octets.extend(lengthOctets)
+
+def _encodeTlv(tag, payload):
+    octets = bytearray((tag,))
+    _encodeLength(octets, len(payload))
+    octets.extend(payload)
+    return octets
+
+def _encodeInt(tag, value):
+    payload = bytearray()
+    while 1:
+        payload.insert(0, value & 0xff)
+        if -0x80 <= value < 0x80:
+            break
+        value >>= 8
+    return _encodeTlv(tag, payload)
+
+def _encodeOid(tag, oid):
+    if len(oid) < 2 or oid[0] > 2 or oid[0] < 2 and oid[1] > 39:
+        raise error.ProtocolError('Unsupported OBJECT IDENTIFIER %s' % (oid,))
+    payload = bytearray()
+    for subId in (oid[0] * 40 + oid[1],) + tuple(oid[2:]):
+        if subId < 0:
+            raise error.ProtocolError('Negative sub-OID %s' % subId)
+        elif subId < 0x80:
+            payload.append(subId)
+        else:
+            subIdOctets = bytearray((subId & 0x7f,))
+            subId >>= 7
+            while subId:
+                subIdOctets.insert(0, 0x80 | subId & 0x7f)
+                subId >>= 7
+            payload.extend(subIdOctets)
+    return _encodeTlv(tag, payload)
+
+def _encodeValue(tag, value):
+    if tag in intTypes:
+        return _encodeInt(tag, value)
+    elif tag in octetsTypes:
+        return _encodeTlv(tag, value)
+    elif tag in nullTypes:
+        return bytearray((tag, 0))
+    elif tag == OBJECT_IDENTIFIER:
+        return _encodeOid(tag, value)
+    raise error.ProtocolError('Unsupported value type 0x%x' % tag)
+
+def encodeMessage(version, community, pduType, pduData):
+    """Encode SNMP v1/v2c message given as Python values into octets"""
+    if version not in pduTypes or pduType not in pduTypes[version]:
+        raise error.ProtocolError(
+            'Unsupported SNMP version %s PDU type 0x%x' % (version, pduType)
+            )
+    varBinds = bytearray()
+    for name, (tag, value) in pduData[-1]:
+        varBinds.extend(
+            _encodeTlv(
+                0x30,
+                _encodeOid(OBJECT_IDENTIFIER, name) + \
+                _encodeValue(tag, value)
+                )
+            )
+    if pduType == V1_TRAP:
+        pdu = _encodeOid(OBJECT_IDENTIFIER, pduData[0]) + \
+              _encodeTlv(IP_ADDRESS, pduData[1]) + \
+              _encodeInt(INTEGER, pduData[2]) + \
+              _encodeInt(INTEGER, pduData[3]) + \
+              _encodeInt(TIME_TICKS, pduData[4])
+    else:
+        pdu = _encodeInt(INTEGER, pduData[0]) + \
+              _encodeInt(INTEGER, pduData[1]) + \
+              _encodeInt(INTEGER, pduData[2])
+    pdu.extend(_encodeTlv(0x30, varBinds))
+    return toOctets(
+        _encodeTlv(
+            0x30,
+            _encodeInt(INTEGER, version) + \
+            _encodeTlv(OCTET_STRING, community) + \
+            _encodeTlv(pduType, pdu)
+            )
+        )
+
+# pyasn1 objects conversion
+
+class _TypeMap:
+    def __init__(self, valueTypes, pduTypes, messageType):
+        self.valueTypes = valueTypes  # tag octet -> pyasn1 type
+        self.valueTags = {}           # tagSet -> tag octet
+        for tag, valueType in valueTypes.items():
+            self.valueTags[valueType.getTagSet()] = tag
+        self.pduTypes = pduTypes      # tag octet -> PDU type
+        self.pduTags = {}             # tagSet -> tag octet
+        for tag, pduType in pduTypes.items():
+            self.pduTags[pduType.getTagSet()] = tag
+        self.messageType = messageType
+
+# Some SNMP types share tags with more generic ones (e.g. Unsigned32
+# vs Gauge32, Bits vs OCTET STRING)
+_aliasTypes = ( (rfc1902.Integer32, INTEGER),
+                (rfc1902.Unsigned32, GAUGE32),
+                (rfc1902.Bits, OCTET_STRING),
+                (rfc1902.OctetString, OCTET_STRING),
+                (rfc1902.Integer, INTEGER),
+                (univ.Integer, INTEGER),
+                (univ.OctetString, OCTET_STRING) )
+
+# Built on first use so that importing this module costs nothing
+# to those not using it
+_typeMaps = {}
+
+def _buildTypeMaps():
+    typeMaps = {
+        0: _TypeMap(
+            { INTEGER: univ.Integer(),
+              OCTET_STRING: univ.OctetString(),
+              NULL: univ.Null(''),
+              OBJECT_IDENTIFIER: univ.ObjectIdentifier(),
+              IP_ADDRESS: rfc1155.IpAddress(),
+              COUNTER32: rfc1155.Counter(),
+              GAUGE32: rfc1155.Gauge(),
+              TIME_TICKS: rfc1155.TimeTicks(),
+              OPAQUE: rfc1155.Opaque() },
+            { 0xa0: rfc1157.GetRequestPDU(),
+              0xa1: rfc1157.GetNextRequestPDU(),
+              0xa2: rfc1157.GetResponsePDU(),
+              0xa3: rfc1157.SetRequestPDU(),
+              0xa4: rfc1157.TrapPDU() },
+            rfc1157.Message()
+            ),
+        1: _TypeMap(
+            { INTEGER: rfc1902.Integer(),
+              OCTET_STRING: rfc1902.OctetString(),
+              NULL: univ.Null(''),
+              OBJECT_IDENTIFIER: univ.ObjectIdentifier(),
+              IP_ADDRESS: rfc1902.IpAddress(),
+              COUNTER32: rfc1902.Counter32(),
+              GAUGE32: rfc1902.Gauge32(),
+              TIME_TICKS: rfc1902.TimeTicks(),
+              OPAQUE: rfc1902.Opaque(),
+              COUNTER64: rfc1902.Counter64(),
+              NO_SUCH_OBJECT: rfc1905.noSuchObject,
+              NO_SUCH_INSTANCE: rfc1905.noSuchInstance,
+              END_OF_MIB_VIEW: rfc1905.endOfMibView },
+            { 0xa0: rfc1905.GetRequestPDU(),
+              0xa1: rfc1905.GetNextRequestPDU(),
+              0xa2: rfc1905.ResponsePDU(),
+              0xa3: rfc1905.SetRequestPDU(),
+              0xa5: rfc1905.GetBulkRequestPDU(),
+              0xa6: rfc1905.InformRequestPDU(),
+              0xa7: rfc1905.SNMPv2TrapPDU(),
+              0xa8: rfc1905.ReportPDU() },
+            rfc1901.Message()
+            )
+        }
+    for valueType, tag in _aliasTypes:
+        for typeMap in typeMaps.values():
+            typeMap.valueTags.setdefault(valueType.tagSet, tag)
+    return typeMaps
+
+def _getTypeMap(version):
+    if not _typeMaps:
+        _typeMaps.update(_buildTypeMaps())
+    if version not in _typeMaps:
+        raise error.ProtocolError('Unsupported SNMP version %s' % version)
+    return _typeMaps[version]
+
+def encodeAsn1Message(msg):
+    """Encode pyasn1 v1/v2c Message object into octets"""
+    version = int(msg.getComponentByPosition(0))
+    typeMap = _getTypeMap(version)
+    pdu = msg.getComponentByPosition(2).getComponent()
+    pduType = typeMap.pduTags.get(pdu.getTagSet())
+    if pduType is None:
+        raise error.ProtocolError('Unsupported PDU %r' % (pdu,))
+    varBinds = []
+    valueTags = typeMap.valueTags
+    if pduType == V1_TRAP:
+        varBindList = pdu.getComponentByPosition(5)
+    else:
+        varBindList = pdu.getComponentByPosition(3)
+    for varBind in varBindList:
+        value = varBind.getComponentByPosition(1).getComponent(1)
+        tag = valueTags.get(value.getTagSet())
+        if tag is None:
+            raise error.ProtocolError('Unsupported value %r' % (value,))
+        if tag in intTypes:
+            value = int(value)
+        elif tag in octetsTypes:
+            value = value.asOctets()
+        elif tag in nullTypes:
+            value = None
+        else:
+            value = tuple(value)
+        varBinds.append(
+            (tuple(varBind.getComponentByPosition(0)), (tag, value))
+            )
+    if pduType == V1_TRAP:
+        pduData = ( tuple(pdu.getComponentByPosition(0)),
+                    pdu.getComponentByPosition(1).getComponent().asOctets(),
+                    int(pdu.getComponentByPosition(2)),
+                    int(pdu.getComponentByPosition(3)),
+                    int(pdu.getComponentByPosition(4)),
+                    varBinds )
+    else:
+        pduData = ( int(pdu.getComponentByPosition(0)),
+                    int(pdu.getComponentByPosition(1)),
+                    int(pdu.getComponentByPosition(2)),
+                    varBinds )
+    return encodeMessage(
+        version, msg.getComponentByPosition(1).asOctets(), pduType, pduData
+        )
+
+def pduToAsn1(version, pduType, pduData):
+    """Build pyasn1 PDU object of given SNMP version from Python values"""
+    typeMap = _getTypeMap(version)
+    valueTypes = typeMap.valueTypes
+    if pduType not in typeMap.pduTypes:
+        raise error.ProtocolError('Unsupported PDU type 0x%x' % pduType)
+    pdu = typeMap.pduTypes[pduType].clone()
+    if pduType == V1_TRAP:
+        pdu.setComponentByPosition(0, pduData[0])
+        pdu.setComponentByPosition(1)
+        pdu.getComponentByPosition(1).setComponentByPosition(
+            0, pduData[1]
+            )
+        pdu.setComponentByPosition(2, pduData[2], verifyConstraints=False)
+        pdu.setComponentByPosition(3, pduData[3], verifyConstraints=False)
+        pdu.setComponentByPosition(4, pduData[4], verifyConstraints=False)
+    else:
+        pdu.setComponentByPosition(0, pduData[0], verifyConstraints=False)
+        pdu.setComponentByPosition(1, pduData[1], verifyConstraints=False)
+        pdu.setComponentByPosition(2, pduData[2], verifyConstraints=False)
+    if pduType == V1_TRAP:
+        idx = 5
+    else:
+        idx = 3
+    varBindList = pdu.setComponentByPosition(idx).getComponentByPosition(idx)
+    idx = 0
+    for name, (tag, value) in pduData[-1]:
+        if tag not in valueTypes:
+            raise error.ProtocolError('Unsupported value type 0x%x' % tag)
+        if value is not None:
+            value = valueTypes[tag].clone(value)
+        else:
+            value = valueTypes[tag]
+        varBind = varBindList.setComponentByPosition(idx).getComponentByPosition(idx)
+        varBind.setComponentByPosition(0, name)
+        varBind.setComponentByPosition(1).getComponentByPosition(1).setComponentByType(value.getTagSet(), value, 1, verifyConstraints=False)
+        idx += 1
+    return pdu
+
+def decodeAsn1Message(wholeMsg, version):
+    """Decode octets into pyasn1 Message object of given SNMP version"""
+    msgVersion, community, pduType, pduData = decodeMessage(wholeMsg)
+    if msgVersion != version:
+        raise error.ProtocolError('Unexpected SNMP version %s' % msgVersion)
+    pdu = pduToAsn1(version, pduType, pduData)
+    msg = _getTypeMap(version).messageType.clone()
+    msg.setComponentByPosition(0, version)
+    msg.setComponentByPosition(1, community)
+    msg.setComponentByPosition(2)
+    msg.getComponentByPosition(2).setComponentByType(
+        pdu.getTagSet(), pdu, 1, verifyConstraints=False
+        )
+    return msg
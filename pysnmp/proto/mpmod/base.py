@@ -1,5 +1,6 @@
 # MP-specific cache management
 from pysnmp.proto.mpmod import cache
+from pysnmp.proto import error
 
 class AbstractMessageProcessingModel:
     def __init__(self):
@@ -46,7 +47,8 @@ class AbstractMessageProcessingModel:
         snmpEngine,
         transportDomain,
         transportAddress,
-        wholeMsg
+        wholeMsg,
+        msg=None
         ):
         raise error.ProtocolError('method not implemented')
 
@@ -58,3 +60,13 @@ class AbstractMessageProcessingModel:
     
     def receiveTimerTick(self, snmpEngine, timeNow):
         self._cache.expireCaches()
+
+    def setCacheLifetimes(self, stateReferenceLifetime=None,
+                          msgIdLifetime=None):
+        self._cache.setLifetimes(stateReferenceLifetime, msgIdLifetime)
+
+    def setCacheMaxEntries(self, maxEntries):
+        self._cache.setMaxEntries(maxEntries)
+
+    def getCacheStatistics(self):
+        return self._cache.getStatistics()
@@ -1,9 +1,25 @@
+from collections import deque
+from threading import Lock
 from pysnmp.proto import error
 from pysnmp import nextid
 
 class Cache:
-    __stateReference = nextid.Integer(0xffffff)
-    __msgID = nextid.Integer(0xffffff)
+    """Message processing model cache.
+
+       Indices are guarded by a lock so that the cache could be used
+       from dispatcher thread and engine worker threads at once (see
+       SnmpEngine.setReceiveExecutor()). No callbacks are ever invoked
+       while the lock is held.
+
+       Entries expire after stateReferenceLifetime or msgIdLifetime
+       timer ticks depending on their kind. Once maxEntries entries are
+       cached, the oldest one is evicted to make room for a new one.
+    """
+    __stateReference = nextid.counter(0xffffff)
+    __msgID = nextid.counter(0xffffff)
+    stateReferenceLifetime = 600
+    msgIdLifetime = 600
+    maxEntries = 100000
     def __init__(self):
         self.__msgIdIndex = {}
         self.__stateReferenceIndex = {}
@@ -11,88 +27,174 @@ class Cache:
         # Message expiration mechanics
         self.__expirationQueue = {}
         self.__expirationTimer = 0
-        
-    # Server mode cache handling
+        # Entries in order of arrival, popped ones are dropped lazily
+        self.__arrivalQueue = deque()
+        self.__hits = self.__misses = 0
+        self.__evictions = self.__expirations = 0
+        self.__lock = Lock()
 
-    def newStateReference(self): return self.__stateReference()
+    def setLifetimes(self, stateReferenceLifetime=None, msgIdLifetime=None):
+        """Set time (in timer ticks) incoming requests (stateReference)
+           and outgoing requests (msgId) are kept for. Entries already
+           cached are not affected."""
+        if stateReferenceLifetime is not None:
+            self.stateReferenceLifetime = stateReferenceLifetime
+        if msgIdLifetime is not None:
+            self.msgIdLifetime = msgIdLifetime
 
-    def pushByStateRef(self, stateReference, **msgInfo):
-        if stateReference in self.__stateReferenceIndex:
-            raise error.ProtocolError(
-                'Cache dup for stateReference=%s at %s' %
-                (stateReference, self)
-                )
-        expireAt = self.__expirationTimer+600
-        self.__stateReferenceIndex[stateReference] = ( msgInfo, expireAt )
+    def setMaxEntries(self, maxEntries):
+        """Set maximum number of cached entries, None means no limit"""
+        self.__lock.acquire()
+        try:
+            self.maxEntries = maxEntries
+            self.__evictEntries()
+        finally:
+            self.__lock.release()
+
+    def getStatistics(self):
+        self.__lock.acquire()
+        try:
+            return {
+                'hits': self.__hits,
+                'misses': self.__misses,
+                'evictions': self.__evictions,
+                'expirations': self.__expirations,
+                'cachedEntries': len(self.__stateReferenceIndex) + \
+                                 len(self.__msgIdIndex)
+                }
+        finally:
+            self.__lock.release()
+
+    def __getIndex(self, kind):
+        if kind == 'msgId':
+            return self.__msgIdIndex
+        else:
+            return self.__stateReferenceIndex
+
+    def __pushEntry(self, kind, key, msgInfo, lifetime):
+        self.__evictEntries(1)
+        expireAt = self.__expirationTimer + lifetime
+        cacheInfo = ( msgInfo, expireAt )
+        self.__getIndex(kind)[key] = cacheInfo
 
         # Schedule to expire
         if expireAt not in self.__expirationQueue:
             self.__expirationQueue[expireAt] = {}
-        if 'stateReference' not in self.__expirationQueue[expireAt]:
-            self.__expirationQueue[expireAt]['stateReference'] = {}
-        self.__expirationQueue[expireAt]['stateReference'][stateReference] = 1
-        
-    def popByStateRef(self, stateReference):
-        if stateReference in self.__stateReferenceIndex:
-            cacheInfo = self.__stateReferenceIndex[stateReference]
-        else:
-            raise error.ProtocolError(
-                'Cache miss for stateReference=%s at %s' %
-                (stateReference, self)
+        if kind not in self.__expirationQueue[expireAt]:
+            self.__expirationQueue[expireAt][kind] = {}
+        self.__expirationQueue[expireAt][kind][key] = 1
+
+        self.__arrivalQueue.append((kind, key, cacheInfo))
+        if len(self.__arrivalQueue) > 1024 and \
+               len(self.__arrivalQueue) > 2 * (len(self.__stateReferenceIndex) + len(self.__msgIdIndex)):
+            self.__arrivalQueue = deque(
+                [ x for x in self.__arrivalQueue
+                  if self.__getIndex(x[0]).get(x[1]) is x[2] ]
                 )
-        del self.__stateReferenceIndex[stateReference]
-        cacheEntry, expireAt = cacheInfo
-        del self.__expirationQueue[expireAt]['stateReference'][stateReference]
+
+    def __popEntry(self, kind, key):
+        cacheEntry, expireAt = self.__getIndex(kind).pop(key)
+        if kind == 'msgId':
+            del self.__sendPduHandleIdx[cacheEntry['sendPduHandle']]
+        del self.__expirationQueue[expireAt][kind][key]
         return cacheEntry
 
+    def __evictEntries(self, room=0):
+        if self.maxEntries is None:
+            return
+        maxEntries = max(0, self.maxEntries - room)
+        while len(self.__stateReferenceIndex) + \
+                  len(self.__msgIdIndex) > maxEntries:
+            kind, key, cacheInfo = self.__arrivalQueue.popleft()
+            if self.__getIndex(kind).get(key) is cacheInfo:
+                self.__popEntry(kind, key)
+                self.__evictions += 1
+
+    # Server mode cache handling
+
+    def newStateReference(self): return self.__stateReference()
+
+    def pushByStateRef(self, stateReference, **msgInfo):
+        self.__lock.acquire()
+        try:
+            if stateReference in self.__stateReferenceIndex:
+                raise error.ProtocolError(
+                    'Cache dup for stateReference=%s at %s' %
+                    (stateReference, self)
+                    )
+            self.__pushEntry(
+                'stateReference', stateReference, msgInfo,
+                self.stateReferenceLifetime
+                )
+        finally:
+            self.__lock.release()
+        
+    def popByStateRef(self, stateReference):
+        self.__lock.acquire()
+        try:
+            if stateReference not in self.__stateReferenceIndex:
+                self.__misses += 1
+                raise error.ProtocolError(
+                    'Cache miss for stateReference=%s at %s' %
+                    (stateReference, self)
+                    )
+            self.__hits += 1
+            return self.__popEntry('stateReference', stateReference)
+        finally:
+            self.__lock.release()
+
     # Client mode cache handling
 
     def newMsgID(self): return self.__msgID()
 
     def pushByMsgId(self, msgId, **msgInfo):
-        if msgId in self.__msgIdIndex:
-            raise error.ProtocolError(
-                'Cache dup for msgId=%s at %s' % (msgId, self)
-                )
-        expireAt = self.__expirationTimer+600
-        self.__msgIdIndex[msgId] = ( msgInfo, expireAt )
-
-        self.__sendPduHandleIdx[msgInfo['sendPduHandle']] = msgId
-        
-        # Schedule to expire
-        if expireAt not in self.__expirationQueue:
-            self.__expirationQueue[expireAt] = {}
-        if 'msgId' not in self.__expirationQueue[expireAt]:
-            self.__expirationQueue[expireAt]['msgId'] = {}
-        self.__expirationQueue[expireAt]['msgId'][msgId] = 1
+        self.__lock.acquire()
+        try:
+            if msgId in self.__msgIdIndex:
+                raise error.ProtocolError(
+                    'Cache dup for msgId=%s at %s' % (msgId, self)
+                    )
+            self.__pushEntry('msgId', msgId, msgInfo, self.msgIdLifetime)
+            self.__sendPduHandleIdx[msgInfo['sendPduHandle']] = msgId
+        finally:
+            self.__lock.release()
         
     def popByMsgId(self, msgId):
-        if msgId in self.__msgIdIndex:
-            cacheInfo = self.__msgIdIndex[msgId]
-        else:
-            raise error.ProtocolError(
-                'Cache miss for msgId=%s at %s' % (msgId, self)
-                )
-        msgInfo, expireAt = cacheInfo
-        del self.__sendPduHandleIdx[msgInfo['sendPduHandle']]
-        del self.__msgIdIndex[msgId]
-        cacheEntry, expireAt = cacheInfo
-        del self.__expirationQueue[expireAt]['msgId'][msgId]
-        return cacheEntry
+        self.__lock.acquire()
+        try:
+            if msgId not in self.__msgIdIndex:
+                self.__misses += 1
+                raise error.ProtocolError(
+                    'Cache miss for msgId=%s at %s' % (msgId, self)
+                    )
+            self.__hits += 1
+            return self.__popEntry('msgId', msgId)
+        finally:
+            self.__lock.release()
 
     def popBySendPduHandle(self, sendPduHandle):
-        if sendPduHandle in self.__sendPduHandleIdx:
-            self.popByMsgId(self.__sendPduHandleIdx[sendPduHandle])
+        self.__lock.acquire()
+        try:
+            if sendPduHandle in self.__sendPduHandleIdx:
+                self.__popEntry(
+                    'msgId', self.__sendPduHandleIdx[sendPduHandle]
+                    )
+        finally:
+            self.__lock.release()
         
     def expireCaches(self):
         # Uses internal clock to expire pending messages
-        if self.__expirationTimer in self.__expirationQueue:
-            cacheInfo = self.__expirationQueue[self.__expirationTimer]
-            if 'stateReference' in cacheInfo:
-                for stateReference in cacheInfo['stateReference']:
-                    del self.__stateReferenceIndex[stateReference]
-            if 'msgId' in cacheInfo:
-                for msgId in cacheInfo['msgId']:
-                    del self.__msgIdIndex[msgId]
-            del self.__expirationQueue[self.__expirationTimer]
-        self.__expirationTimer = self.__expirationTimer + 1
+        self.__lock.acquire()
+        try:
+            if self.__expirationTimer in self.__expirationQueue:
+                cacheInfo = self.__expirationQueue.pop(self.__expirationTimer)
+                for kind in cacheInfo:
+                    index = self.__getIndex(kind)
+                    for key in cacheInfo[kind]:
+                        msgInfo, expireAt = index.pop(key)
+                        if kind == 'msgId':
+                            del self.__sendPduHandleIdx[msgInfo['sendPduHandle']]
+                        self.__expirations += 1
+            self.__expirationTimer = self.__expirationTimer + 1
+        finally:
+            self.__lock.release()
@@ -1,12 +1,13 @@
 # SNMP v1 & v2c message processing models implementation
 import sys
+from time import time
 from pyasn1.codec.ber import decoder
 from pyasn1.type import univ
 from pyasn1.compat.octets import null
 from pyasn1.error import PyAsn1Error
 from pysnmp.proto.mpmod.base import AbstractMessageProcessingModel
 from pysnmp.proto.secmod import rfc2576
-from pysnmp.proto import rfc3411, errind, error
+from pysnmp.proto import rfc3411, errind, error, fastber
 from pysnmp.proto.api import v1, v2c
 from pysnmp import debug
 
@@ -17,6 +18,14 @@ from pysnmp import debug
 class SnmpV1MessageProcessingModel(AbstractMessageProcessingModel):
     messageProcessingModelID = univ.Integer(0) # SNMPv1
     snmpMsgSpec = v1.Message
+    _fastCodec = 0
+
+    def setFastCodec(self, flag=1):
+        """Decode incoming messages with specialised BER codec (see
+           pysnmp.proto.fastber) falling back to pyasn1 for messages it
+           does not handle"""
+        self._fastCodec = flag and 1 or 0
+
     # rfc3412: 7.1
     def prepareOutgoingMessage(
         self,
@@ -216,17 +225,25 @@ class SnmpV1MessageProcessingModel(AbstractMessageProcessingModel):
         snmpEngine,
         transportDomain,
         transportAddress,
-        wholeMsg
+        wholeMsg,
+        msg=None
         ):
         # rfc3412: 7.2.2 
         try:
-            msg, restOfwholeMsg = decoder.decode(
-                wholeMsg, asn1Spec=self._snmpMsgSpec
-                )
+            if msg is None and self._fastCodec:
+                try:
+                    msg = fastber.decodeAsn1Message(
+                        wholeMsg, int(self.messageProcessingModelID)
+                        )
+                except error.ProtocolError:
+                    debug.logger & debug.flagMP and debug.logger('prepareDataElements: fast codec failed, falling back to pyasn1: %s' % (sys.exc_info()[1],))
+            if msg is None:
+                msg, restOfwholeMsg = decoder.decode(
+                    wholeMsg, asn1Spec=self._snmpMsgSpec
+                    )
         except PyAsn1Error:
             debug.logger & debug.flagMP and debug.logger('prepareDataElements: %s' % (sys.exc_info()[1],))
-            snmpInASNParseErrs, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInASNParseErrs')
-            snmpInASNParseErrs.syntax = snmpInASNParseErrs.syntax + 1
+            snmpEngine.msgAndPduDsp.statistics.snmpInASNParseErrs += 1
             raise error.StatusInformation(
                 errorIndication = errind.parseError
                 )
@@ -258,20 +275,25 @@ class SnmpV1MessageProcessingModel(AbstractMessageProcessingModel):
                 )
 
         # rfc3412: 7.2.6
-        ( securityEngineID,
-          securityName,
-          scopedPDU,
-          maxSizeResponseScopedPDU,
-          securityStateReference ) = smHandler.processIncomingMsg(
-            snmpEngine,
-            messageProcessingModel,
-            snmpEngineMaxMessageSize.syntax,
-            securityParameters,
-            securityModel,
-            securityLevel,
-            wholeMsg,
-            msg
-            )
+        latencyObserver = snmpEngine.latencyObserver
+        startedAt = latencyObserver and time()
+        try:
+            ( securityEngineID,
+              securityName,
+              scopedPDU,
+              maxSizeResponseScopedPDU,
+              securityStateReference ) = smHandler.processIncomingMsg(
+                snmpEngine,
+                messageProcessingModel,
+                snmpEngineMaxMessageSize.syntax,
+                securityParameters,
+                securityModel,
+                securityLevel,
+                wholeMsg,
+                msg
+                )
+        finally:
+            latencyObserver and latencyObserver(snmpEngine, 'processIncomingMsg', startedAt, time())
 
         debug.logger & debug.flagMP and debug.logger('prepareDataElements: SM returned securityEngineID %r securityName %r' % (securityEngineID, securityName))
 
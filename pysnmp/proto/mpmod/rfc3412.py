@@ -1,5 +1,7 @@
 # SNMP v3 message processing model implementation
 import sys
+from time import time
+from threading import Lock
 from pysnmp.proto.mpmod.base import AbstractMessageProcessingModel
 from pysnmp.proto.secmod import rfc3414
 from pysnmp.proto import rfc1905, rfc3411, api, errind, error
@@ -69,6 +71,7 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         self.__scopedPDU = ScopedPDU()
         self.__engineIDs = {}
         self.__engineIDsExpQueue = {}
+        self.__engineIDsLock = Lock()
         self.__expirationTimer = 0
         
     # 7.1.1a
@@ -97,10 +100,7 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         debug.logger & debug.flagMP and debug.logger('prepareOutgoingMessage: new msgID %s' % msgID)
 
         k = (transportDomain, transportAddress)
-        if k in self.__engineIDs:
-            peerSnmpEngineData = self.__engineIDs[k]
-        else:
-            peerSnmpEngineData = None
+        peerSnmpEngineData = self.__engineIDs.get(k)
 
         debug.logger & debug.flagMP and debug.logger('prepareOutgoingMessage: peer SNMP engine data %s for transport %s, address %s' % (peerSnmpEngineData, transportDomain, transportAddress))
         
@@ -453,17 +453,18 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         snmpEngine,
         transportDomain,
         transportAddress,
-        wholeMsg
+        wholeMsg,
+        msg=None
         ):
         # 7.2.2
         try:
-            msg, restOfwholeMsg = decoder.decode(
-                wholeMsg, asn1Spec=self._snmpMsgSpec
-                )
+            if msg is None:
+                msg, restOfwholeMsg = decoder.decode(
+                    wholeMsg, asn1Spec=self._snmpMsgSpec
+                    )
         except PyAsn1Error:
             debug.logger & debug.flagMP and debug.logger('prepareDataElements: %s' % (sys.exc_info()[1],))
-            snmpInASNParseErrs, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInASNParseErrs')
-            snmpInASNParseErrs.syntax = snmpInASNParseErrs.syntax + 1
+            snmpEngine.msgAndPduDsp.statistics.snmpInASNParseErrs += 1
             raise error.StatusInformation(
                 errorIndication = errind.parseError
                 )
@@ -483,8 +484,7 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         
         # 7.2.4
         if securityModel not in snmpEngine.securityModels:
-            snmpUnknownSecurityModels, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpUnknownSecurityModels')
-            snmpUnknownSecurityModels.syntax = snmpUnknownSecurityModels.syntax + 1
+            snmpEngine.msgAndPduDsp.statistics.snmpUnknownSecurityModels += 1
             raise error.StatusInformation(
                 errorIndication = errind.unsupportedSecurityModel
                 )
@@ -497,8 +497,7 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         elif (msgFlags & 0x03) == 0x03:
             securityLevel = 3
         else:
-            snmpInvalidMsgs = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInvalidMsgs')
-            snmpInvalidMsgs.syntax = snmpInvalidMsgs.syntax + 1
+            snmpEngine.msgAndPduDsp.statistics.snmpInvalidMsgs += 1
             raise error.StatusInformation(
                 errorIndication = errind.invalidMsg
                 )
@@ -511,20 +510,25 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
         # 7.2.6
         smHandler = snmpEngine.securityModels[securityModel]
         try:
-            ( securityEngineID,
-              securityName,
-              scopedPDU,
-              maxSizeResponseScopedPDU,
-              securityStateReference ) = smHandler.processIncomingMsg(
-                snmpEngine,
-                messageProcessingModel,
-                maxMessageSize,
-                securityParameters,
-                securityModel,
-                securityLevel,
-                wholeMsg,
-                msg
-                )
+            latencyObserver = snmpEngine.latencyObserver
+            startedAt = latencyObserver and time()
+            try:
+                ( securityEngineID,
+                  securityName,
+                  scopedPDU,
+                  maxSizeResponseScopedPDU,
+                  securityStateReference ) = smHandler.processIncomingMsg(
+                    snmpEngine,
+                    messageProcessingModel,
+                    maxMessageSize,
+                    securityParameters,
+                    securityModel,
+                    securityLevel,
+                    wholeMsg,
+                    msg
+                    )
+            finally:
+                latencyObserver and latencyObserver(snmpEngine, 'processIncomingMsg', startedAt, time())
             debug.logger & debug.flagMP and debug.logger('prepareDataElements: SM succeeded')
         except error.StatusInformation:
             statusInformation, origTraceback = sys.exc_info()[1:3]
@@ -606,16 +610,21 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
                 # Here we assume that authentic/default EngineIDs
                 # come only in the course of engine-to-engine communication.
                 if pdu.tagSet in rfc3411.internalClassPDUs:
-                    self.__engineIDs[k] = {
-                        'securityEngineID': securityEngineID,
-                        'contextEngineId': contextEngineId,
-                        'contextName': contextName
-                        }
-
-                    expireAt = int(self.__expirationTimer + 300 / snmpEngine.transportDispatcher.getTimerResolution())
-                    if expireAt not in self.__engineIDsExpQueue:
-                        self.__engineIDsExpQueue[expireAt] = []
-                    self.__engineIDsExpQueue[expireAt].append(k)
+                    self.__engineIDsLock.acquire()
+                    try:
+                        if k not in self.__engineIDs:
+                            self.__engineIDs[k] = {
+                                'securityEngineID': securityEngineID,
+                                'contextEngineId': contextEngineId,
+                                'contextName': contextName
+                                }
+
+                            expireAt = int(self.__expirationTimer + 300 / snmpEngine.transportDispatcher.getTimerResolution())
+                            if expireAt not in self.__engineIDsExpQueue:
+                                self.__engineIDsExpQueue[expireAt] = []
+                            self.__engineIDsExpQueue[expireAt].append(k)
+                    finally:
+                        self.__engineIDsLock.release()
                     
                     debug.logger & debug.flagMP and debug.logger('prepareDataElements: cache securityEngineID %r for %r %r' % (securityEngineID, transportDomain, transportAddress))
 
@@ -783,13 +792,20 @@ class SnmpV3MessageProcessingModel(AbstractMessageProcessingModel):
             errorIndication = errind.unsupportedPDUtype
             )
 
+    # Peer engines cache entries are replaced as a whole so readers go
+    # unlocked, the lock serializes writers and expiration
+    
     def __expireEnginesInfo(self):
-        if self.__expirationTimer in self.__engineIDsExpQueue:
-            for engineKey in self.__engineIDsExpQueue[self.__expirationTimer]:
-                del self.__engineIDs[engineKey]
-                debug.logger & debug.flagMP and debug.logger('__expireEnginesInfo: expiring %r' % (engineKey,))
-            del self.__engineIDsExpQueue[self.__expirationTimer]
-        self.__expirationTimer = self.__expirationTimer + 1
+        self.__engineIDsLock.acquire()
+        try:
+            if self.__expirationTimer in self.__engineIDsExpQueue:
+                for engineKey in self.__engineIDsExpQueue[self.__expirationTimer]:
+                    del self.__engineIDs[engineKey]
+                    debug.logger & debug.flagMP and debug.logger('__expireEnginesInfo: expiring %r' % (engineKey,))
+                del self.__engineIDsExpQueue[self.__expirationTimer]
+            self.__expirationTimer = self.__expirationTimer + 1
+        finally:
+            self.__engineIDsLock.release()
         
     def receiveTimerTick(self, snmpEngine, timeNow):
         self.__expireEnginesInfo()
@@ -1,8 +1,10 @@
 """SNMP v3 Message Processing and Dispatching (RFC3412)"""
 import sys
+from time import time
+from threading import Lock
 from pyasn1.compat.octets import null
 from pysnmp.smi import builder, instrum
-from pysnmp.proto import errind, error, cache
+from pysnmp.proto import errind, error, cache, statistics
 from pysnmp.proto.api import verdec # XXX
 from pysnmp.error import PySnmpError
 from pysnmp import nextid, debug
@@ -24,6 +26,14 @@ class MsgAndPduDispatcher:
             'SNMP-TARGET-MIB', 'SNMP-USER-BASED-SM-MIB'
             )
 
+        # LCD statistics counters, reported by their MIB instances
+        self.statistics = statistics.Statistics()
+        self.statistics.bindMibInstances(self.mibInstrumController.mibBuilder)
+
+        # MIB instances consulted per message
+        self.__snmpUnknownPDUHandlers, = self.mibInstrumController.mibBuilder.importSymbols('__SNMP-MPD-MIB', 'snmpUnknownPDUHandlers')
+        self.__snmpEngineMaxMessageSize, = self.mibInstrumController.mibBuilder.importSymbols('__SNMP-FRAMEWORK-MIB', 'snmpEngineMaxMessageSize')
+
         # Requests cache
         self.__cache = cache.Cache()
         
@@ -31,11 +41,22 @@ class MsgAndPduDispatcher:
         self.__appsRegistration = {}
 
         # Source of sendPduHandle and cache of requesting apps
-        self.__sendPduHandle = nextid.Integer(0xffffff)
+        self.__sendPduHandle = nextid.counter(0xffffff)
 
         # To pass transport info to app
         self.__transportInfo = {}
 
+        # MP and security modules build outgoing messages over
+        # per-module ASN.1 objects, it takes one thread at a time
+        self.__outgoingLock = Lock()
+
+    def __prepareMessage(self, prepareFun, *args):
+        self.__outgoingLock.acquire()
+        try:
+            return prepareFun(*args)
+        finally:
+            self.__outgoingLock.release()
+
     def getTransportInfo(self, stateReference):
         if stateReference in self.__transportInfo:
             return self.__transportInfo[stateReference]
@@ -123,15 +144,18 @@ class MsgAndPduDispatcher:
         # 4.1.1.3
         sendPduHandle = self.__sendPduHandle()
         if expectResponse:
+            transportDispatcher = snmpEngine.transportDispatcher
             self.__cache.add(
                 sendPduHandle,
                 messageProcessingModel=messageProcessingModel,
                 sendPduHandle=sendPduHandle,
-                timeout=timeout+snmpEngine.transportDispatcher.getTimerTicks(),
+                timerHandle=transportDispatcher.callLater(
+                    timeout*transportDispatcher.getTimerResolution(),
+                    self.__expireRequestTimer, sendPduHandle, snmpEngine
+                    ),
                 cbFun=cbFun,
                 cbCtx=cbCtx
                 )
-            debug.logger & debug.flagDsp and debug.logger('sendPdu: current time in ticks %d' % (snmpEngine.transportDispatcher.getTimerTicks(),))
 
         debug.logger & debug.flagDsp and debug.logger('sendPdu: new sendPduHandle %s, timeout %s, cbFun %s' % (sendPduHandle, timeout, cbFun))
 
@@ -139,7 +163,8 @@ class MsgAndPduDispatcher:
         try:
             ( destTransportDomain,
               destTransportAddress,
-              outgoingMessage ) = mpHandler.prepareOutgoingMessage(
+              outgoingMessage ) = self.__prepareMessage(
+                mpHandler.prepareOutgoingMessage,
                 snmpEngine,
                 transportDomain,
                 transportAddress,
@@ -166,6 +191,7 @@ class MsgAndPduDispatcher:
         snmpEngine.transportDispatcher.sendMessage(
             outgoingMessage, destTransportDomain, destTransportAddress
             )
+        self.statistics.snmpOutPkts += 1
         
         # Update cache with orignal req params (used for retrying)
         if expectResponse:
@@ -201,6 +227,41 @@ class MsgAndPduDispatcher:
         statusInformation
         ):
         """PDU dispatcher -- prepare and serialize a response"""
+        latencyObserver = snmpEngine.latencyObserver
+        startedAt = latencyObserver and time()
+        try:
+            return self.__returnResponsePdu(
+                snmpEngine,
+                messageProcessingModel,
+                securityModel,
+                securityName,
+                securityLevel,
+                contextEngineId,
+                contextName,
+                pduVersion,
+                PDU,
+                maxSizeResponseScopedPDU,
+                stateReference,
+                statusInformation
+                )
+        finally:
+            latencyObserver and latencyObserver(snmpEngine, 'returnResponsePdu', startedAt, time())
+
+    def __returnResponsePdu(
+        self,
+        snmpEngine,
+        messageProcessingModel,
+        securityModel,
+        securityName,
+        securityLevel,
+        contextEngineId,
+        contextName,
+        pduVersion,
+        PDU,
+        maxSizeResponseScopedPDU,
+        stateReference,
+        statusInformation
+        ):
         # Extract input values and initialize defaults
         k = int(messageProcessingModel)
         if k in snmpEngine.messageProcessingSubsystems:
@@ -216,7 +277,8 @@ class MsgAndPduDispatcher:
         try:
             ( destTransportDomain,
               destTransportAddress,
-              outgoingMessage ) = mpHandler.prepareResponseMessage(
+              outgoingMessage ) = self.__prepareMessage(
+                mpHandler.prepareResponseMessage,
                 snmpEngine,
                 messageProcessingModel,
                 securityModel,
@@ -236,11 +298,10 @@ class MsgAndPduDispatcher:
             raise
 
         # Handle oversized messages XXX transport constrains?
-        snmpEngineMaxMessageSize, = self.mibInstrumController.mibBuilder.importSymbols('__SNMP-FRAMEWORK-MIB', 'snmpEngineMaxMessageSize')
-        if snmpEngineMaxMessageSize.syntax and \
-               len(outgoingMessage) > snmpEngineMaxMessageSize.syntax:
-            snmpSilentDrops, = self.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpSilentDrops')
-            snmpSilentDrops.syntax = snmpSilentDrops.syntax + 1
+        snmpEngineMaxMessageSize = self.__snmpEngineMaxMessageSize.syntax
+        if snmpEngineMaxMessageSize and \
+               len(outgoingMessage) > snmpEngineMaxMessageSize:
+            self.statistics.snmpSilentDrops += 1
             raise error.MessageTooBigError()
         
         # 4.1.2.4
@@ -249,6 +310,7 @@ class MsgAndPduDispatcher:
             destTransportDomain,
             destTransportAddress
             )
+        self.statistics.snmpOutPkts += 1
 
     # 4.2.1    
     def receiveMessage(
@@ -256,22 +318,41 @@ class MsgAndPduDispatcher:
         snmpEngine,
         transportDomain,
         transportAddress,
-        wholeMsg
+        wholeMsg,
+        msg=None
+        ):
+        """Message dispatcher -- de-serialize message into PDU. Message
+           already decoded against MP module's snmpMsgSpec may be passed
+           as msg so that it would not be decoded again."""
+        latencyObserver = snmpEngine.latencyObserver
+        startedAt = latencyObserver and time()
+        try:
+            return self.__receiveMessage(
+                snmpEngine, transportDomain, transportAddress, wholeMsg, msg
+                )
+        finally:
+            latencyObserver and latencyObserver(snmpEngine, 'receiveMessage', startedAt, time())
+
+    def __receiveMessage(
+        self,
+        snmpEngine,
+        transportDomain,
+        transportAddress,
+        wholeMsg,
+        msg
         ):
-        """Message dispatcher -- de-serialize message into PDU"""
         # 4.2.1.1
-        snmpInPkts, = self.mibInstrumController.mibBuilder.importSymbols(
-            '__SNMPv2-MIB', 'snmpInPkts'
-            )
-        snmpInPkts.syntax = snmpInPkts.syntax + 1
+        self.statistics.snmpInPkts += 1
 
         # 4.2.1.2
         try:
             restOfWholeMsg = null # XXX fix decoder non-recursive return
-            msgVersion = verdec.decodeMessageVersion(wholeMsg)
+            if msg is None:
+                msgVersion = verdec.peekMessageVersion(wholeMsg)
+            else:
+                msgVersion = int(msg.getComponentByPosition(0))
         except error.ProtocolError:
-            snmpInASNParseErrs, = self.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInASNParseErrs')
-            snmpInASNParseErrs.syntax = snmpInASNParseErrs.syntax + 1
+            self.statistics.snmpInASNParseErrs += 1
             return null  # n.b the whole buffer gets dropped
 
         debug.logger & debug.flagDsp and debug.logger('receiveMessage: msgVersion %s, msg decoded' % msgVersion)
@@ -282,32 +363,41 @@ class MsgAndPduDispatcher:
         if k in snmpEngine.messageProcessingSubsystems:
             mpHandler = snmpEngine.messageProcessingSubsystems[k]
         else:
-            snmpInBadVersions, = self.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInBadVersions')
-            snmpInBadVersions.syntax = snmpInBadVersions.syntax + 1
+            self.statistics.snmpInBadVersions += 1
             return restOfWholeMsg
 
         # 4.2.1.3 -- no-op
 
         # 4.2.1.4
+        if msg is None:
+            mpArgs = {}
+        else:
+            mpArgs = { 'msg': msg }
         try:
-            ( messageProcessingModel,
-              securityModel,
-              securityName,
-              securityLevel,
-              contextEngineId,
-              contextName,
-              pduVersion,
-              PDU,
-              pduType,
-              sendPduHandle,
-              maxSizeResponseScopedPDU,
-              statusInformation,
-              stateReference ) = mpHandler.prepareDataElements(
-                snmpEngine,
-                transportDomain,
-                transportAddress,
-                wholeMsg
-                )
+            latencyObserver = snmpEngine.latencyObserver
+            startedAt = latencyObserver and time()
+            try:
+                ( messageProcessingModel,
+                  securityModel,
+                  securityName,
+                  securityLevel,
+                  contextEngineId,
+                  contextName,
+                  pduVersion,
+                  PDU,
+                  pduType,
+                  sendPduHandle,
+                  maxSizeResponseScopedPDU,
+                  statusInformation,
+                  stateReference ) = mpHandler.prepareDataElements(
+                    snmpEngine,
+                    transportDomain,
+                    transportAddress,
+                    wholeMsg,
+                    **mpArgs
+                    )
+            finally:
+                latencyObserver and latencyObserver(snmpEngine, 'prepareDataElements', startedAt, time())
             debug.logger & debug.flagDsp and debug.logger('receiveMessage: MP succeded')
         except error.StatusInformation:
             statusInformation = sys.exc_info()[1]
@@ -315,12 +405,16 @@ class MsgAndPduDispatcher:
                 # Dropped REPORT -- re-run pending reqs queue as some
                 # of them may be waiting for this REPORT
                 debug.logger & debug.flagDsp and debug.logger('receiveMessage: MP failed, statusInformation %s, forcing a retry' % statusInformation)
-                self.__expireRequest(
-                    statusInformation['sendPduHandle'],
-                    self.__cache.pop(statusInformation['sendPduHandle']),
-                    snmpEngine,
-                    statusInformation
+                cachedParams = self.__popRequest(
+                    statusInformation['sendPduHandle']
                     )
+                if cachedParams is not None:
+                    self.__expireRequest(
+                        statusInformation['sendPduHandle'],
+                        cachedParams,
+                        snmpEngine,
+                        statusInformation
+                        )
             return restOfWholeMsg
 
         debug.logger & debug.flagDsp and debug.logger('receiveMessage: PDU %s' % PDU.prettyPrint())
@@ -336,14 +430,13 @@ class MsgAndPduDispatcher:
             # 4.2.2.1.2
             if processPdu is None:
                 # 4.2.2.1.2.a
-                snmpUnknownPDUHandlers, = self.mibInstrumController.mibBuilder.importSymbols('__SNMP-MPD-MIB', 'snmpUnknownPDUHandlers')
-                snmpUnknownPDUHandlers.syntax = snmpUnknownPDUHandlers.syntax+1
+                self.statistics.snmpUnknownPDUHandlers += 1
 
                 # 4.2.2.1.2.b
                 statusInformation = {
                     'errorIndication': errind.unknownPDUHandler,
-                    'oid': snmpUnknownPDUHandlers.name,
-                    'val': snmpUnknownPDUHandlers.syntax
+                    'oid': self.__snmpUnknownPDUHandlers.name,
+                    'val': self.__snmpUnknownPDUHandlers.getValue()
                     }                    
 
                 debug.logger & debug.flagDsp and debug.logger('receiveMessage: unhandled PDU type')
@@ -353,7 +446,8 @@ class MsgAndPduDispatcher:
                 try:
                     ( destTransportDomain,
                       destTransportAddress,
-                      outgoingMessage ) = mpHandler.prepareResponseMessage(
+                      outgoingMessage ) = self.__prepareMessage(
+                        mpHandler.prepareResponseMessage,
                         snmpEngine,
                         messageProcessingModel,
                         securityModel,
@@ -378,6 +472,7 @@ class MsgAndPduDispatcher:
                         destTransportDomain,
                         destTransportAddress
                         )
+                    self.statistics.snmpOutPkts += 1
                 except PySnmpError: # XXX
                     pass
 
@@ -413,12 +508,11 @@ class MsgAndPduDispatcher:
             # 4.2.2.2 (response)
             
             # 4.2.2.2.1
-            cachedParams = self.__cache.pop(sendPduHandle)
+            cachedParams = self.__popRequest(sendPduHandle)
 
             # 4.2.2.2.2
             if cachedParams is None:
-                snmpUnknownPDUHandlers, = self.mibInstrumController.mibBuilder.importSymbols('__SNMP-MPD-MIB', 'snmpUnknownPDUHandlers')
-                snmpUnknownPDUHandlers.syntax = snmpUnknownPDUHandlers.syntax+1
+                self.statistics.snmpUnknownPDUHandlers += 1
                 return restOfWholeMsg
 
             debug.logger & debug.flagDsp and debug.logger('receiveMessage: cache read by sendPduHandle %s' % sendPduHandle)
@@ -448,6 +542,7 @@ class MsgAndPduDispatcher:
     def releaseStateInformation(
         self, snmpEngine, sendPduHandle, messageProcessingModel
         ):
+        self.__popRequest(sendPduHandle)
         k = int(messageProcessingModel)
         if k in snmpEngine.messageProcessingSubsystems:
             mpHandler = snmpEngine.messageProcessingSubsystems[k]
@@ -455,14 +550,19 @@ class MsgAndPduDispatcher:
         
     # Cache expiration stuff
 
-    def __expireRequest(self, cacheKey, cachedParams, snmpEngine,
-                        statusInformation=None):
-        timeNow = snmpEngine.transportDispatcher.getTimerTicks()
-        timeoutAt = cachedParams['timeout']
+    def __popRequest(self, sendPduHandle):
+        cachedParams = self.__cache.pop(sendPduHandle)
+        if cachedParams is not None:
+            cachedParams['timerHandle'].cancel()
+        return cachedParams
 
-        if statusInformation is None and timeNow < timeoutAt:
-            return
+    def __expireRequestTimer(self, sendPduHandle, snmpEngine):
+        cachedParams = self.__cache.pop(sendPduHandle)
+        if cachedParams is not None:
+            self.__expireRequest(sendPduHandle, cachedParams, snmpEngine)
 
+    def __expireRequest(self, cacheKey, cachedParams, snmpEngine,
+                        statusInformation=None):
         processResponsePdu = cachedParams['cbFun']
 
         debug.logger & debug.flagDsp and debug.logger('__expireRequest: req cachedParams %s' % cachedParams)
@@ -491,7 +591,7 @@ class MsgAndPduDispatcher:
             cachedParams['sendPduHandle'],
             cachedParams['cbCtx']
             )
-        return 1
         
     def receiveTimerTick(self, snmpEngine, timeNow):
-        self.__cache.expire(self.__expireRequest, snmpEngine)
+        # pending requests are expired by their own dispatcher timers
+        pass
@@ -2,7 +2,7 @@ from pysnmp import nextid
 from pysnmp.proto import error
 
 class Cache:
-    __stateReference = nextid.Integer(0xffffff)
+    __stateReference = nextid.counter(0xffffff)
     def __init__(self):
         self.__cacheEntries = {}
 
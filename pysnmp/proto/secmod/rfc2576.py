@@ -1,9 +1,12 @@
 # SNMP v1 & v2c security models implementation
+import sys
+from threading import RLock
 from pyasn1.codec.ber import encoder
 from pysnmp.proto.secmod import base
 from pysnmp.carrier.asynsock.dgram import udp, udp6, unix
+from pysnmp.carrier.asynsock.stream import tcp
 from pysnmp.smi.error import NoSuchInstanceError
-from pysnmp.proto import errind, error
+from pysnmp.proto import errind, error, fastber
 from pysnmp import debug
 
 class SnmpV1SecurityModel(base.AbstractSecurityModel):
@@ -16,9 +19,45 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
 
     def __init__(self):
         self.__transportBranchId = self.__paramsBranchId = self.__communityBranchId = self.__securityBranchId = -1
+        # maps below are re-built on configuration change by whichever
+        # thread notices it first, others wait for it to finish
+        self.__mapsLock = RLock()
+        self.__fastCodec = 0
         base.AbstractSecurityModel.__init__(self)
 
+    def setFastCodec(self, flag=1):
+        """Encode outgoing messages with specialised BER codec (see
+           pysnmp.proto.fastber) falling back to pyasn1 for messages it
+           does not handle"""
+        self.__fastCodec = flag and 1 or 0
+
+    def __encodeMessage(self, msg):
+        if self.__fastCodec:
+            try:
+                return fastber.encodeAsn1Message(msg)
+            except error.ProtocolError:
+                debug.logger & debug.flagSM and debug.logger('__encodeMessage: fast codec failed, falling back to pyasn1: %s' % (sys.exc_info()[1],))
+        return encoder.encode(msg)
+
     def _sec2com(self, snmpEngine, securityName, contextEngineId, contextName):
+        self.__mapsLock.acquire()
+        try:
+            return self.__sec2com(
+                snmpEngine, securityName, contextEngineId, contextName
+                )
+        finally:
+            self.__mapsLock.release()
+
+    def _com2sec(self, snmpEngine, communityName, transportInformation):
+        self.__mapsLock.acquire()
+        try:
+            return self.__com2sec(
+                snmpEngine, communityName, transportInformation
+                )
+        finally:
+            self.__mapsLock.release()
+
+    def __sec2com(self, snmpEngine, securityName, contextEngineId, contextName):
         snmpTargetParamsSecurityName, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('SNMP-TARGET-MIB', 'snmpTargetParamsSecurityName')
         if self.__paramsBranchId != snmpTargetParamsSecurityName.branchVersionId:
             snmpTargetParamsSecurityModel, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('SNMP-TARGET-MIB', 'snmpTargetParamsSecurityModel')
@@ -106,7 +145,7 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
                 errorIndication = errind.unknownCommunityName
             )
 
-    def _com2sec(self, snmpEngine, communityName, transportInformation):
+    def __com2sec(self, snmpEngine, communityName, transportInformation):
         snmpTargetAddrTAddress, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('SNMP-TARGET-MIB', 'snmpTargetAddrTAddress')
         if self.__transportBranchId != snmpTargetAddrTAddress.branchVersionId:
             ( SnmpTagValue,
@@ -150,6 +189,11 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
                     targetAddrTAddress = tuple(
                         TransportAddressIPv6(targetAddrTAddress)
                         )
+                elif targetAddrTDomain[:len(tcp.snmpTCPDomain)] == tcp.snmpTCPDomain:
+                    TransportAddressIPv4, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('TRANSPORT-ADDRESS-MIB', 'TransportAddressIPv4')
+                    targetAddrTAddress = tuple(
+                        TransportAddressIPv4(targetAddrTAddress)
+                        )
                 elif targetAddrTDomain[:len(unix.snmpLocalDomain)] == unix.snmpLocalDomain:
                     targetAddrTAddress = str(targetAddrTAddress)
                 targetAddr = targetAddrTDomain, targetAddrTAddress
@@ -311,7 +355,7 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
 
         debug.logger & debug.flagMP and debug.logger('generateRequestMsg: %s' % (msg.prettyPrint(),))
 
-        wholeMsg = encoder.encode(msg)
+        wholeMsg = self.__encodeMessage(msg)
         return securityParameters, wholeMsg
 
         raise error.StatusInformation(
@@ -347,7 +391,7 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
         
         debug.logger & debug.flagMP and debug.logger('generateResponseMsg: %s' % (msg.prettyPrint(),))
 
-        wholeMsg = encoder.encode(msg)
+        wholeMsg = self.__encodeMessage(msg)
         return ( communityName, wholeMsg )
 
 
@@ -370,8 +414,7 @@ class SnmpV1SecurityModel(base.AbstractSecurityModel):
                 snmpEngine, communityName, transportInformation
             )
         except error.StatusInformation:
-            snmpInBadCommunityNames, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInBadCommunityNames')
-            snmpInBadCommunityNames.syntax = snmpInBadCommunityNames.syntax+1
+            snmpEngine.msgAndPduDsp.statistics.snmpInBadCommunityNames += 1
             raise error.StatusInformation(
                 errorIndication = errind.unknownCommunityName
             )
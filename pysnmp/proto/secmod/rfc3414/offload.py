@@ -0,0 +1,244 @@
+# Out-of-process authentication & decryption of incoming USM messages
+import sys
+from pysnmp.proto.secmod.rfc3414.service import SnmpUSMSecurityModel, \
+     UsmSecurityParameters
+from pysnmp.proto.mpmod.rfc3412 import SNMPv3Message, ScopedPDU
+from pysnmp.proto import fastber, error
+from pysnmp import debug
+from pyasn1.type import univ
+from pyasn1.compat.octets import oct2int
+from pyasn1.error import PyAsn1Error
+
+# Runs at worker process, takes and returns plain Python values only
+
+def authenticateAndDecrypt(cryptoKeys, authParameters,
+                           privParameters, wholeMsg, msgData):
+    """Verify message digest, decrypt and decode scopedPDU. Returns
+       a tuple of authentication status, decrypted scopedPDU octets
+       (None if message is not encrypted or on failure) and scopedPDU
+       as plain values (see fastber.decodeScopedPdu(), None if it could
+       not be decoded)."""
+    authProtocol, authKey, privProtocol, privKey = cryptoKeys
+
+    authHandler = SnmpUSMSecurityModel.authServices[authProtocol]
+    try:
+        authHandler.authenticateIncomingMsg(
+            univ.OctetString(authKey),
+            univ.OctetString(authParameters),
+            wholeMsg
+            )
+    except error.StatusInformation:
+        return 0, None, None
+
+    msgDataTag, scopedPduData = msgData
+
+    if msgDataTag == fastber.OCTET_STRING:
+        privHandler = SnmpUSMSecurityModel.privServices[privProtocol]
+        snmpEngineBoots, snmpEngineTime, salt = privParameters
+        try:
+            decryptedData = privHandler.decryptData(
+                univ.OctetString(privKey),
+                ( snmpEngineBoots, snmpEngineTime, univ.OctetString(salt) ),
+                univ.OctetString(scopedPduData)
+                )
+        except error.StatusInformation:
+            return 1, None, None
+        scopedPduData = decryptedData
+    else:
+        decryptedData = None
+
+    try:
+        scopedPDU, size = fastber.decodeScopedPdu(scopedPduData)
+    except error.ProtocolError:
+        return 1, decryptedData, None  # let engine's codec handle it
+
+    if decryptedData is not None:
+        # strip cipher padding off decoded scopedPDU
+        decryptedData = decryptedData[:size]
+
+    return 1, decryptedData, scopedPDU
+
+class CryptoOffload:
+    """Hands authentication and decryption of incoming SNMPv3 USM
+       messages over to executor (such as
+       concurrent.futures.ProcessPoolExecutor).
+
+       Message header and security parameters are decoded into plain
+       values at engine, just enough to look up user keys. Worker
+       verifies, decrypts and decodes scopedPDU. Engine then builds
+       message objects from these values so that nothing gets decoded
+       twice; the rest of message processing (timeliness checks,
+       caches, MIB) takes place at engine. Messages the stage can't
+       handle go to engine as usual.
+    """
+    def __init__(self, snmpEngine, executor):
+        self.__snmpEngine = snmpEngine
+        self.__executor = executor
+        self.__msgSpec = SNMPv3Message()
+        self.__securityParametersSpec = UsmSecurityParameters()
+        self.__scopedPduSpec = ScopedPDU()
+        self.__pendingMessages = 0
+        self.__offloadedMessages = 0
+
+    def getStatistics(self):
+        return {
+            'pendingMessages': self.__pendingMessages,
+            'offloadedMessages': self.__offloadedMessages
+            }
+
+    def processMessage(self, transportDispatcher, transportDomain,
+                       transportAddress, wholeMsg):
+        """Returns true if message was taken for processing"""
+        # quick check for SNMPv3 message
+        if len(wholeMsg) < 5 or oct2int(wholeMsg[0]) != 0x30:
+            return 0
+        try:
+            headerData = fastber.decodeV3Message(wholeMsg)
+        except error.ProtocolError:
+            return 0
+        ( msgID, msgMaxSize, msgFlags, msgSecurityModel,
+          msgSecurityParameters, msgData ) = headerData
+        if msgSecurityModel != SnmpUSMSecurityModel.securityModelID:
+            return 0
+        if len(msgFlags) != 1:
+            return 0
+        msgFlags = oct2int(msgFlags[0])
+        if not msgFlags & 0x01:  # authentication needed
+            return 0
+        try:
+            securityParameters = fastber.decodeUsmSecurityParameters(
+                msgSecurityParameters
+                )
+        except error.ProtocolError:
+            return 0
+
+        usmHandler = self.__snmpEngine.securityModels[
+            SnmpUSMSecurityModel.securityModelID
+            ]
+        cryptoKeys = usmHandler._getCryptoKeys(
+            self.__snmpEngine, securityParameters[0], securityParameters[3]
+            )
+        if cryptoKeys is None or \
+               cryptoKeys[0] not in SnmpUSMSecurityModel.authServices:
+            return 0
+
+        if msgFlags & 0x02:  # encrypted
+            if msgData[0] != fastber.OCTET_STRING or \
+                   cryptoKeys[2] not in SnmpUSMSecurityModel.privServices:
+                return 0
+        elif msgData[0] == fastber.OCTET_STRING:
+            return 0
+
+        future = self.__executor.submit(
+            authenticateAndDecrypt,
+            cryptoKeys,
+            securityParameters[4],
+            ( securityParameters[1],
+              securityParameters[2],
+              securityParameters[5] ),
+            wholeMsg,
+            msgData
+            )
+
+        transportDispatcher.jobStarted(id(self))
+        self.__pendingMessages += 1
+
+        debug.logger & debug.flagSM and debug.logger('processMessage: offloaded message from %s:%s' % (transportDomain, transportAddress))
+
+        # called back by executor's thread
+        future.add_done_callback(
+            lambda future: transportDispatcher.callFromThread(
+                self.__processResult, future, transportDispatcher,
+                transportDomain, transportAddress, wholeMsg,
+                headerData, securityParameters, cryptoKeys
+                )
+            )
+        return 1
+
+    def __buildMessage(self, headerData, securityParameters, scopedPDU):
+        ( msgID, msgMaxSize, msgFlags, msgSecurityModel,
+          msgSecurityParameters, msgData ) = headerData
+        msgDataTag, scopedPduData = msgData
+
+        if scopedPDU is None:
+            contextEngineId = contextName = pdu = None
+        else:
+            contextEngineId, contextName, pduType, pduData = scopedPDU
+            pdu = fastber.pduToAsn1(1, pduType, pduData)
+
+        msg = self.__msgSpec.clone()
+        msg.setComponentByPosition(0, 3)
+        msg.setComponentByPosition(1)
+        header = msg.getComponentByPosition(1)
+        header.setComponentByPosition(0, msgID)
+        header.setComponentByPosition(1, msgMaxSize)
+        header.setComponentByPosition(2, msgFlags)
+        header.setComponentByPosition(3, msgSecurityModel)
+        msg.setComponentByPosition(2, msgSecurityParameters)
+        msg.setComponentByPosition(3)
+        if msgDataTag == fastber.OCTET_STRING:
+            msg.getComponentByPosition(3).setComponentByPosition(
+                1, scopedPduData
+                )
+            if pdu is None:
+                scopedPDU = None
+            else:
+                scopedPDU = self.__scopedPduSpec.clone()
+        elif pdu is None:
+            # no plaintext scopedPDU, engine would decode message
+            msg = None
+        else:
+            msg.getComponentByPosition(3).setComponentByPosition(0)
+            scopedPDU = msg.getComponentByPosition(3).getComponentByPosition(0)
+
+        if pdu is not None:
+            scopedPDU.setComponentByPosition(0, contextEngineId)
+            scopedPDU.setComponentByPosition(1, contextName)
+            scopedPDU.setComponentByPosition(2)
+            scopedPDU.getComponentByPosition(2).setComponentByType(
+                pdu.getTagSet(), pdu, 1, verifyConstraints=False
+                )
+
+        usmSecurityParameters = self.__securityParametersSpec.clone()
+        for idx in range(len(securityParameters)):
+            usmSecurityParameters.setComponentByPosition(
+                idx, securityParameters[idx]
+                )
+
+        return msg, usmSecurityParameters, scopedPDU
+
+    def __processResult(self, future, transportDispatcher, transportDomain,
+                        transportAddress, wholeMsg, headerData,
+                        securityParameters, cryptoKeys):
+        self.__pendingMessages -= 1
+        usmHandler = self.__snmpEngine.securityModels[
+            SnmpUSMSecurityModel.securityModelID
+            ]
+        msg = None
+        try:
+            authenticated, decryptedData, scopedPDU = future.result()
+        except Exception:
+            # engine would run into the same failure and handle it
+            debug.logger & debug.flagSM and debug.logger('__processResult: offloaded processing failed: %s' % (sys.exc_info()[1],))
+        else:
+            self.__offloadedMessages += 1
+            try:
+                msg, securityParameters, scopedPDU = self.__buildMessage(
+                    headerData, securityParameters, scopedPDU
+                    )
+            except (PyAsn1Error, error.ProtocolError):
+                # engine would decode message and report the failure
+                debug.logger & debug.flagSM and debug.logger('__processResult: message objects not built: %s' % (sys.exc_info()[1],))
+                securityParameters = scopedPDU = None
+            usmHandler._setCryptoResult(
+                wholeMsg, cryptoKeys, authenticated, decryptedData,
+                securityParameters, scopedPDU
+                )
+        try:
+            self.__snmpEngine.msgAndPduDsp.receiveMessage(
+                self.__snmpEngine, transportDomain, transportAddress,
+                wholeMsg, msg
+                )
+        finally:
+            usmHandler._clearCryptoResult(wholeMsg)
+            transportDispatcher.jobFinished(id(self))
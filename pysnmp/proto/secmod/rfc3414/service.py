@@ -1,5 +1,6 @@
 # SNMP v3 USM model services
 import time, sys
+from threading import Lock
 from pysnmp.proto.secmod.base import AbstractSecurityModel
 from pysnmp.proto.secmod.rfc3414.auth import hmacmd5, hmacsha, noauth
 from pysnmp.proto.secmod.rfc3414.priv import des, nopriv
@@ -45,7 +46,10 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
         self.__securityParametersSpec = UsmSecurityParameters()
         self.__timeline = {}
         self.__timelineExpQueue = {}
+        self.__timelineLock = Lock()
         self.__expirationTimer = 0
+        # wholeMsg -> (cryptoKeys, authenticated, decryptedData)
+        self.__cryptoResults = {}
 
     def __getUserInfo(
         self, mibInstrumController, securityEngineID, securityName
@@ -84,6 +88,58 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
             pysnmpUsmKeyPrivLocalized
             )
 
+    # Message authentication & decryption done out of process (see
+    # rfc3414.offload). Results are only trusted when produced with the
+    # same protocols and keys USM would use.
+
+    def __getCryptoKeys(self, usmUserAuthProtocol, usmUserAuthKeyLocalized,
+                        usmUserPrivProtocol, usmUserPrivKeyLocalized):
+        if usmUserAuthKeyLocalized is None:
+            return
+        if usmUserPrivKeyLocalized is None:
+            privKey = None
+        else:
+            privKey = usmUserPrivKeyLocalized.asOctets()
+        return ( tuple(usmUserAuthProtocol),
+                 usmUserAuthKeyLocalized.asOctets(),
+                 tuple(usmUserPrivProtocol),
+                 privKey )
+
+    def _getCryptoKeys(self, snmpEngine, securityEngineID, userName):
+        """Protocols and localized keys of known user as plain values"""
+        try:
+            ( usmUserSecurityName,
+              usmUserAuthProtocol,
+              usmUserAuthKeyLocalized,
+              usmUserPrivProtocol,
+              usmUserPrivKeyLocalized ) = self.__getUserInfo(
+                snmpEngine.msgAndPduDsp.mibInstrumController,
+                securityEngineID,
+                userName
+                )
+        except NoSuchInstanceError:
+            return
+        if usmUserAuthProtocol == noauth.NoAuth.serviceID:
+            return
+        return self.__getCryptoKeys(
+            usmUserAuthProtocol, usmUserAuthKeyLocalized,
+            usmUserPrivProtocol, usmUserPrivKeyLocalized
+            )
+
+    def _setCryptoResult(self, wholeMsg, cryptoKeys, authenticated,
+                         decryptedData, securityParameters=None,
+                         scopedPDU=None):
+        """Pre-computed results for incoming message. Optional
+           securityParameters and scopedPDU objects spare decoding."""
+        self.__cryptoResults[wholeMsg] = (
+            cryptoKeys, authenticated, decryptedData,
+            securityParameters, scopedPDU
+            )
+
+    def _clearCryptoResult(self, wholeMsg):
+        if wholeMsg in self.__cryptoResults:
+            del self.__cryptoResults[wholeMsg]
+
     def __cloneUserInfo(
         self, mibInstrumController, securityEngineID, securityName
         ):
@@ -290,13 +346,12 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
         if securityStateReference is None and (  # request type check added
             securityLevel == 3 or securityLevel == 2
             ):
-            if securityEngineID in self.__timeline:
+            timelineInfo = self.__timeline.get(securityEngineID)
+            if timelineInfo is not None:
                 ( snmpEngineBoots,
                   snmpEngineTime,
                   latestReceivedEngineTime,
-                  latestUpdateTimestamp) = self.__timeline[
-                    securityEngineID
-                    ]
+                  latestUpdateTimestamp) = timelineInfo
                 debug.logger & debug.flagSM and debug.logger('__generateRequestOrResponseMsg: read snmpEngineBoots, snmpEngineTime from timeline')
             else:
                 # 2.3 XXX is this correct?
@@ -491,19 +546,23 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
 
         debug.logger & debug.flagSM and debug.logger('processIncomingMsg: securityParameters %s' % debug.hexdump(securityParameters))
 
+        cryptoResult = self.__cryptoResults.get(wholeMsg)
+
         # 3.2.1 
-        try:
-            securityParameters, rest = decoder.decode(
-                securityParameters,
-                asn1Spec=self.__securityParametersSpec
-                )
-        except PyAsn1Error:
-            debug.logger & debug.flagSM and debug.logger('processIncomingMsg: %s' % (sys.exc_info()[1],))
-            snmpInASNParseErrs, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMPv2-MIB', 'snmpInASNParseErrs')
-            snmpInASNParseErrs.syntax = snmpInASNParseErrs.syntax + 1
-            raise error.StatusInformation(
-                errorIndication=errind.parseError
-                )
+        if cryptoResult is not None and cryptoResult[3] is not None:
+            securityParameters = cryptoResult[3]
+        else:
+            try:
+                securityParameters, rest = decoder.decode(
+                    securityParameters,
+                    asn1Spec=self.__securityParametersSpec
+                    )
+            except PyAsn1Error:
+                debug.logger & debug.flagSM and debug.logger('processIncomingMsg: %s' % (sys.exc_info()[1],))
+                snmpEngine.msgAndPduDsp.statistics.snmpInASNParseErrs += 1
+                raise error.StatusInformation(
+                    errorIndication=errind.parseError
+                    )
 
         debug.logger & debug.flagSM and debug.logger('processIncomingMsg: %s' % (securityParameters.prettyPrint(),))
 
@@ -667,6 +726,15 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                     maxSizeResponseScopedPDU=maxSizeResponseScopedPDU
                     )
 
+        if cryptoResult is not None:
+            if cryptoResult[0] == self.__getCryptoKeys(
+                    usmUserAuthProtocol, usmUserAuthKeyLocalized,
+                    usmUserPrivProtocol, usmUserPrivKeyLocalized
+                    ):
+                debug.logger & debug.flagSM and debug.logger('processIncomingMsg: using out-of-process crypto results')
+            else:
+                cryptoResult = None
+
         # 3.2.6
         if securityLevel == 3 or securityLevel == 2:
             if usmUserAuthProtocol in self.authServices:
@@ -676,11 +744,16 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                     errorIndication = errind.authenticationFailure
                     )
             try:
-                authenticatedWholeMsg = authHandler.authenticateIncomingMsg(
-                    usmUserAuthKeyLocalized,
-                    securityParameters.getComponentByPosition(4),
-                    wholeMsg
-                    )
+                if cryptoResult is None:
+                    authenticatedWholeMsg = authHandler.authenticateIncomingMsg(
+                        usmUserAuthKeyLocalized,
+                        securityParameters.getComponentByPosition(4),
+                        wholeMsg
+                        )
+                elif not cryptoResult[1]:
+                    raise error.StatusInformation(
+                        errorIndication=errind.authenticationError
+                        )
             except error.StatusInformation:
                 usmStatsWrongDigests, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMP-USER-BASED-SM-MIB', 'usmStatsWrongDigests')
                 usmStatsWrongDigests.syntax = usmStatsWrongDigests.syntax+1
@@ -699,18 +772,10 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
 
             if msgAuthoritativeEngineID:
                 # 3.2.3a moved down here to execute only for authed msg
-                self.__timeline[msgAuthoritativeEngineID] = (
+                self.__storeTimeline(
+                    snmpEngine, msgAuthoritativeEngineID,
                     securityParameters.getComponentByPosition(1),
-                    securityParameters.getComponentByPosition(2),
-                    securityParameters.getComponentByPosition(2),
-                    int(time.time())
-                    )
-                
-                expireAt = int(self.__expirationTimer + 300 / snmpEngine.transportDispatcher.getTimerResolution())
-                if expireAt not in self.__timelineExpQueue:
-                    self.__timelineExpQueue[expireAt] = []
-                self.__timelineExpQueue[expireAt].append(
-                    msgAuthoritativeEngineID
+                    securityParameters.getComponentByPosition(2)
                     )
                     
                 debug.logger & debug.flagSM and debug.logger('processIncomingMsg: store timeline for securityEngineID %r' % (msgAuthoritativeEngineID,))
@@ -727,13 +792,12 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                 debug.logger & debug.flagSM and debug.logger('processIncomingMsg: read snmpEngineBoots (%s), snmpEngineTime (%s) from LCD' % (snmpEngineBoots, snmpEngineTime))
             else:
                 # Non-authoritative SNMP engine: use cached estimates
-                if msgAuthoritativeEngineID in self.__timeline:
+                timelineInfo = self.__timeline.get(msgAuthoritativeEngineID)
+                if timelineInfo is not None:
                     ( snmpEngineBoots,
                       snmpEngineTime,
                       latestReceivedEngineTime,
-                      latestUpdateTimestamp ) = self.__timeline[
-                        msgAuthoritativeEngineID
-                        ]
+                      latestUpdateTimestamp ) = timelineInfo
                     # time passed since last talk with this SNMP engine
                     idleTime = int(time.time())-latestUpdateTimestamp
                     debug.logger & debug.flagSM and debug.logger('processIncomingMsg: read timeline snmpEngineBoots %s snmpEngineTime %s for msgAuthoritativeEngineID %r, idle time %s secs' % (snmpEngineBoots, snmpEngineTime, msgAuthoritativeEngineID, idleTime))
@@ -767,17 +831,10 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                 if msgAuthoritativeEngineBoots > snmpEngineBoots or \
                    msgAuthoritativeEngineBoots == snmpEngineBoots and \
                    msgAuthoritativeEngineTime > latestReceivedEngineTime:
-                    self.__timeline[msgAuthoritativeEngineID] = (
+                    self.__storeTimeline(
+                        snmpEngine, msgAuthoritativeEngineID,
                         msgAuthoritativeEngineBoots,
-                        msgAuthoritativeEngineTime,
-                        msgAuthoritativeEngineTime,
-                        int(time.time())
-                        )
-                    expireAt = int(self.__expirationTimer + 300 / snmpEngine.transportDispatcher.getTimerResolution())
-                    if expireAt not in self.__timelineExpQueue:
-                        self.__timelineExpQueue[expireAt] = []
-                    self.__timelineExpQueue[expireAt].append(
-                        msgAuthoritativeEngineID
+                        msgAuthoritativeEngineTime
                         )
 
                     debug.logger & debug.flagSM and debug.logger('processIncomingMsg: stored timeline msgAuthoritativeEngineBoots %s msgAuthoritativeEngineTime %s for msgAuthoritativeEngineID %r' % (msgAuthoritativeEngineBoots, msgAuthoritativeEngineTime, msgAuthoritativeEngineID))
@@ -807,13 +864,20 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                     )
 
             try:
-               decryptedData = privHandler.decryptData(
-                    usmUserPrivKeyLocalized,
-                    ( securityParameters.getComponentByPosition(1),
-                      securityParameters.getComponentByPosition(2),
-                      securityParameters.getComponentByPosition(5) ),
-                    encryptedPDU
-                    )
+               if cryptoResult is None:
+                   decryptedData = privHandler.decryptData(
+                       usmUserPrivKeyLocalized,
+                       ( securityParameters.getComponentByPosition(1),
+                         securityParameters.getComponentByPosition(2),
+                         securityParameters.getComponentByPosition(5) ),
+                       encryptedPDU
+                       )
+               elif cryptoResult[2] is None:
+                   raise error.StatusInformation(
+                       errorIndication=errind.decryptionError
+                       )
+               else:
+                   decryptedData = cryptoResult[2]
                debug.logger & debug.flagSM and debug.logger('processIncomingMsg: PDU deciphered into %s' % debug.hexdump(decryptedData))
             except error.StatusInformation:
                 usmStatsDecryptionErrors, = snmpEngine.msgAndPduDsp.mibInstrumController.mibBuilder.importSymbols('__SNMP-USER-BASED-SM-MIB', 'usmStatsDecryptionErrors')
@@ -828,16 +892,19 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                     contextName=contextName,
                     maxSizeResponseScopedPDU=maxSizeResponseScopedPDU
                     )
-            scopedPduSpec = scopedPduData.setComponentByPosition(0).getComponentByPosition(0)
-            try:
-                scopedPDU, rest = decoder.decode(
-                    decryptedData, asn1Spec=scopedPduSpec
-                    )
-            except PyAsn1Error:
-                debug.logger & debug.flagSM and debug.logger('processIncomingMsg: scopedPDU decoder failed %s' % sys.exc_info()[0])                
-                raise error.StatusInformation(
-                    errorIndication = errind.decryptionError
-                    )
+            if cryptoResult is not None and cryptoResult[4] is not None:
+                scopedPDU = cryptoResult[4]
+            else:
+                scopedPduSpec = scopedPduData.setComponentByPosition(0).getComponentByPosition(0)
+                try:
+                    scopedPDU, rest = decoder.decode(
+                        decryptedData, asn1Spec=scopedPduSpec
+                        )
+                except PyAsn1Error:
+                    debug.logger & debug.flagSM and debug.logger('processIncomingMsg: scopedPDU decoder failed %s' % sys.exc_info()[0])                
+                    raise error.StatusInformation(
+                        errorIndication = errind.decryptionError
+                        )
         else:
             # 3.2.8b
             scopedPDU = scopedPduData.getComponentByPosition(0)
@@ -877,14 +944,38 @@ class SnmpUSMSecurityModel(AbstractSecurityModel):
                  maxSizeResponseScopedPDU,
                  securityStateReference )
 
+    # Timeline entries are replaced as a whole so readers go unlocked,
+    # the lock serializes writers and expiration queue maintenance
+    
+    def __storeTimeline(self, snmpEngine, snmpEngineID,
+                        snmpEngineBoots, snmpEngineTime):
+        self.__timelineLock.acquire()
+        try:
+            self.__timeline[snmpEngineID] = (
+                snmpEngineBoots,
+                snmpEngineTime,
+                snmpEngineTime,
+                int(time.time())
+                )
+            expireAt = int(self.__expirationTimer + 300 / snmpEngine.transportDispatcher.getTimerResolution())
+            if expireAt not in self.__timelineExpQueue:
+                self.__timelineExpQueue[expireAt] = []
+            self.__timelineExpQueue[expireAt].append(snmpEngineID)
+        finally:
+            self.__timelineLock.release()
+
     def __expireTimelineInfo(self):
-        if self.__expirationTimer in self.__timelineExpQueue:
-            for engineIdKey in self.__timelineExpQueue[self.__expirationTimer]:
-                if engineIdKey in self.__timeline:
-                    del self.__timeline[engineIdKey]
-                    debug.logger & debug.flagSM and debug.logger('__expireTimelineInfo: expiring %r' % (engineIdKey,))
-            del self.__timelineExpQueue[self.__expirationTimer]
-        self.__expirationTimer = self.__expirationTimer + 1
+        self.__timelineLock.acquire()
+        try:
+            if self.__expirationTimer in self.__timelineExpQueue:
+                for engineIdKey in self.__timelineExpQueue[self.__expirationTimer]:
+                    if engineIdKey in self.__timeline:
+                        del self.__timeline[engineIdKey]
+                        debug.logger & debug.flagSM and debug.logger('__expireTimelineInfo: expiring %r' % (engineIdKey,))
+                del self.__timelineExpQueue[self.__expirationTimer]
+            self.__expirationTimer = self.__expirationTimer + 1
+        finally:
+            self.__timelineLock.release()
         
     def receiveTimerTick(self, snmpEngine, timeNow):
         self.__expireTimelineInfo()
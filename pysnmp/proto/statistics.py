@@ -0,0 +1,78 @@
+# SNMP engine LCD statistics counters
+
+class Statistics:
+    """SNMPv2-MIB and SNMP-MPD-MIB counters of SNMP engine.
+
+       Counters are plain integers bumped in place on the message
+       processing path (e.g. statistics.snmpInPkts += 1). MIB instances
+       of these counters read them only when queried.
+
+       Statistics object is owned by MsgAndPduDispatcher.
+    """
+    # counters by MIB instance modules
+    mibCounterNames = (
+        ('__SNMPv2-MIB', (
+            'snmpInPkts',
+            'snmpOutPkts',
+            'snmpInBadVersions',
+            'snmpInBadCommunityNames',
+            'snmpInBadCommunityUses',
+            'snmpInASNParseErrs',
+            'snmpInTooBigs',
+            'snmpInNoSuchNames',
+            'snmpInBadValues',
+            'snmpInReadOnlys',
+            'snmpInGenErrs',
+            'snmpInTotalReqVars',
+            'snmpInTotalSetVars',
+            'snmpInGetRequests',
+            'snmpInGetNexts',
+            'snmpInSetRequests',
+            'snmpInGetResponses',
+            'snmpInTraps',
+            'snmpOutTooBigs',
+            'snmpOutNoSuchNames',
+            'snmpOutBadValues',
+            'snmpOutGenErrs',
+            'snmpOutSetRequests',
+            'snmpOutGetResponses',
+            'snmpOutTraps',
+            'snmpSilentDrops',
+            'snmpProxyDrops',
+            )),
+        ('__SNMP-MPD-MIB', (
+            'snmpUnknownSecurityModels',
+            'snmpInvalidMsgs',
+            'snmpUnknownPDUHandlers',
+            ))
+        )
+    counterNames = mibCounterNames[0][1] + mibCounterNames[1][1]
+
+    def __init__(self):
+        for counterName in self.counterNames:
+            setattr(self, counterName, 0)
+
+    def getCounters(self):
+        counters = {}
+        for counterName in self.counterNames:
+            counters[counterName] = getattr(self, counterName)
+        return counters
+
+    def bindMibInstances(self, mibBuilder):
+        """Make counters MIB instances report these statistics"""
+        for modName, counterNames in self.mibCounterNames:
+            mibInstances = mibBuilder.importSymbols(modName, *counterNames)
+            for counterName, mibInstance in zip(counterNames, mibInstances):
+                mibInstance.counterName = counterName
+                mibInstance.statistics = self
+
+class StatisticsCounterMixIn:
+    """MIB scalar instance reading its value off bound Statistics"""
+    statistics = None
+    counterName = None
+    def getValue(self):
+        if self.statistics is None:
+            return self.syntax.clone(0)
+        return self.syntax.clone(
+            getattr(self.statistics, self.counterName) & 0xffffffff
+            )
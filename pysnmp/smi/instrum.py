@@ -1,5 +1,6 @@
 # MIB modules management
 import sys
+from threading import Lock
 from pysnmp.smi import error
 from pysnmp import debug
 
@@ -43,6 +44,7 @@ class MibInstrumController:
         self.mibBuilder = mibBuilder
         self.lastBuildId = -1
         self.lastBuildSyms = {}
+        self.__indexLock = Lock()
             
     # MIB indexing
 
@@ -50,6 +52,15 @@ class MibInstrumController:
         # Build a tree from MIB objects found at currently loaded modules
         if self.lastBuildId == self.mibBuilder.lastBuildId:
             return
+        # one thread re-builds the tree while others wait for it
+        self.__indexLock.acquire()
+        try:
+            if self.lastBuildId != self.mibBuilder.lastBuildId:
+                self.__buildMibTree()
+        finally:
+            self.__indexLock.release()
+
+    def __buildMibTree(self):
 
         ( MibScalarInstance,
           MibScalar,
@@ -1,21 +1,24 @@
 # PySNMP SMI module. Autogenerated from smidump -f python PYSNMP-MIB
-# by libsmi2pysnmp-0.1.3 at Mon Apr  2 20:50:10 2012,
-# Python version sys.version_info(major=2, minor=7, micro=2, releaselevel='final', serial=0)
+# by libsmi2pysnmp-0.1.3 at Sun Oct 18 07:26:27 2026,
+# Python version sys.version_info(major=3, minor=11, micro=7, releaselevel='final', serial=0)
 
 # Imports
 
 ( Integer, ObjectIdentifier, OctetString, ) = mibBuilder.importSymbols("ASN1", "Integer", "ObjectIdentifier", "OctetString")
 ( NamedValues, ) = mibBuilder.importSymbols("ASN1-ENUMERATION", "NamedValues")
 ( ConstraintsIntersection, ConstraintsUnion, SingleValueConstraint, ValueRangeConstraint, ValueSizeConstraint, ) = mibBuilder.importSymbols("ASN1-REFINEMENT", "ConstraintsIntersection", "ConstraintsUnion", "SingleValueConstraint", "ValueRangeConstraint", "ValueSizeConstraint")
-( Bits, Integer32, ModuleIdentity, MibIdentifier, TimeTicks, enterprises, ) = mibBuilder.importSymbols("SNMPv2-SMI", "Bits", "Integer32", "ModuleIdentity", "MibIdentifier", "TimeTicks", "enterprises")
+( Bits, Counter32, Integer32, ModuleIdentity, MibIdentifier, MibScalar, MibTable, MibTableRow, MibTableColumn, TimeTicks, enterprises, ) = mibBuilder.importSymbols("SNMPv2-SMI", "Bits", "Counter32", "Integer32", "ModuleIdentity", "MibIdentifier", "MibScalar", "MibTable", "MibTableRow", "MibTableColumn", "TimeTicks", "enterprises")
 
 # Objects
 
-pysnmp = ModuleIdentity((1, 3, 6, 1, 4, 1, 20408)).setRevisions(("2005-05-14 00:00",))
+pysnmp = ModuleIdentity((1, 3, 6, 1, 4, 1, 20408)).setRevisions(("2026-10-18 00:00","2005-05-14 00:00",))
 if mibBuilder.loadTexts: pysnmp.setOrganization("pysnmp.sf.net")
 if mibBuilder.loadTexts: pysnmp.setContactInfo("email: ilya@glas.net")
 if mibBuilder.loadTexts: pysnmp.setDescription("Top-level infrastructure of the PySNMP project enterprise MIB tree")
 pysnmpObjects = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 1))
+pysnmpTransportStats = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 1, 1))
+pysnmpInKernelDrops = MibScalar((1, 3, 6, 1, 4, 1, 20408, 1, 1, 1), Counter32()).setMaxAccess("readonly")
+if mibBuilder.loadTexts: pysnmpInKernelDrops.setDescription("The total number of incoming datagrams dropped by the\nkernel for socket receive buffer overflow at transports\nmonitoring receive drops.")
 pysnmpExamples = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 2))
 pysnmpEnumerations = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 3))
 pysnmpModuleIDs = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 3, 1))
@@ -37,5 +40,5 @@ pysnmpExperimental = MibIdentifier((1, 3, 6, 1, 4, 1, 20408, 9999))
 mibBuilder.exportSymbols("PYSNMP-MIB", PYSNMP_MODULE_ID=pysnmp)
 
 # Objects
-mibBuilder.exportSymbols("PYSNMP-MIB", pysnmp=pysnmp, pysnmpObjects=pysnmpObjects, pysnmpExamples=pysnmpExamples, pysnmpEnumerations=pysnmpEnumerations, pysnmpModuleIDs=pysnmpModuleIDs, pysnmpAgentOIDs=pysnmpAgentOIDs, pysnmpDomains=pysnmpDomains, pysnmpNotificationPrefix=pysnmpNotificationPrefix, pysnmpNotifications=pysnmpNotifications, pysnmpNotificationObjects=pysnmpNotificationObjects, pysnmpConformance=pysnmpConformance, pysnmpCompliances=pysnmpCompliances, pysnmpGroups=pysnmpGroups, pysnmpExperimental=pysnmpExperimental)
+mibBuilder.exportSymbols("PYSNMP-MIB", pysnmp=pysnmp, pysnmpObjects=pysnmpObjects, pysnmpTransportStats=pysnmpTransportStats, pysnmpInKernelDrops=pysnmpInKernelDrops, pysnmpExamples=pysnmpExamples, pysnmpEnumerations=pysnmpEnumerations, pysnmpModuleIDs=pysnmpModuleIDs, pysnmpAgentOIDs=pysnmpAgentOIDs, pysnmpDomains=pysnmpDomains, pysnmpNotificationPrefix=pysnmpNotificationPrefix, pysnmpNotifications=pysnmpNotifications, pysnmpNotificationObjects=pysnmpNotificationObjects, pysnmpConformance=pysnmpConformance, pysnmpCompliances=pysnmpCompliances, pysnmpGroups=pysnmpGroups, pysnmpExperimental=pysnmpExperimental)
 
@@ -0,0 +1,30 @@
+( MibScalarInstance, ) = mibBuilder.importSymbols(
+    'SNMPv2-SMI',
+    'MibScalarInstance'
+    )
+
+( pysnmpInKernelDrops, ) = mibBuilder.importSymbols(
+    'PYSNMP-MIB',
+    'pysnmpInKernelDrops'
+    )
+
+class TransportStatsInstance(MibScalarInstance):
+    # value is read from transports of the dispatcher set by SnmpEngine
+    statName = None
+    transportDispatcher = None
+    def getValue(self):
+        if self.transportDispatcher is None:
+            return self.syntax.clone(0)
+        return self.syntax.clone(
+            self.transportDispatcher.getTransportStatistics().get(
+                self.statName, 0
+                ) & 0xffffffff
+            )
+
+__pysnmpInKernelDrops = TransportStatsInstance(pysnmpInKernelDrops.name, (0,), pysnmpInKernelDrops.syntax.clone(0))
+__pysnmpInKernelDrops.statName = 'kernelRecvDrops'
+
+mibBuilder.exportSymbols(
+    "__PYSNMP-MIB",
+    pysnmpInKernelDrops = __pysnmpInKernelDrops
+    )
@@ -1,3 +1,5 @@
+from pysnmp.proto.statistics import StatisticsCounterMixIn
+
 ( MibScalarInstance, ) = mibBuilder.importSymbols(
     'SNMPv2-SMI',
     'MibScalarInstance'
@@ -11,9 +13,12 @@
     'snmpUnknownPDUHandlers',
     )
 
-__snmpUnknownSecurityModels = MibScalarInstance(snmpUnknownSecurityModels.name, (0,), snmpUnknownSecurityModels.syntax.clone(0))
-__snmpInvalidMsgs = MibScalarInstance(snmpInvalidMsgs.name, (0,), snmpInvalidMsgs.syntax.clone(0))
-__snmpUnknownPDUHandlers = MibScalarInstance(snmpUnknownPDUHandlers.name, (0,), snmpUnknownPDUHandlers.syntax.clone(0))
+class StatisticsCounterInstance(StatisticsCounterMixIn, MibScalarInstance):
+    pass
+
+__snmpUnknownSecurityModels = StatisticsCounterInstance(snmpUnknownSecurityModels.name, (0,), snmpUnknownSecurityModels.syntax.clone(0))
+__snmpInvalidMsgs = StatisticsCounterInstance(snmpInvalidMsgs.name, (0,), snmpInvalidMsgs.syntax.clone(0))
+__snmpUnknownPDUHandlers = StatisticsCounterInstance(snmpUnknownPDUHandlers.name, (0,), snmpUnknownPDUHandlers.syntax.clone(0))
 
 mibBuilder.exportSymbols(
     '__SNMP-MPD-MIB',
@@ -106,8 +106,14 @@ params.update( {
                   'pysnmp.carrier',
                   'pysnmp.carrier.asynsock',
                   'pysnmp.carrier.asynsock.dgram',
+                  'pysnmp.carrier.asynsock.stream',
                   'pysnmp.carrier.twisted',
                   'pysnmp.carrier.twisted.dgram',                   
+                  'pysnmp.carrier.twisted.stream',
+                  'pysnmp.carrier.asyncio',
+                  'pysnmp.carrier.asyncio.dgram',
+                  'pysnmp.carrier.loopback',
+                  'pysnmp.carrier.loopback.dgram',
                   'pysnmp.entity',
                   'pysnmp.entity.rfc3413',
                   'pysnmp.entity.rfc3413.oneliner',
@@ -125,7 +131,8 @@ params.update( {
                   'pysnmp.proto.acmod',
                   'pysnmp.proto.proxy',
                   'pysnmp.proto.api' ],
-    'scripts': [ 'tools/libsmi2pysnmp', 'tools/build-pysnmp-mib' ]
+    'scripts': [ 'tools/libsmi2pysnmp', 'tools/build-pysnmp-mib',
+                 'tools/pysnmp-replay' ]
     } )
 
 setup(**params)